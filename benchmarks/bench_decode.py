@@ -0,0 +1,78 @@
+"""
+Micro-benchmark for the bar decoder behind ``get_hist``.
+
+Compares ``decode.create_df`` against the original regex/row-loop parser on
+synthetic ``timescale_update`` frames. Run from the repository root:
+
+    python -m benchmarks.bench_decode
+"""
+import datetime
+import json
+import re
+import timeit
+
+import pandas as pd
+
+from src.stock_data_realtime.decode import create_df
+
+
+def legacy_create_df(raw_data, symbol):
+    out = re.search(r'"s":\[(.+?)\}\]', raw_data).group(1)
+    x = out.split(',{"')
+    data = list()
+    volume_data = True
+
+    for xi in x:
+        xi = re.split(r"\[|:|,|\]", xi)
+        timestamp = float(xi[4])
+        dt = datetime.datetime.fromtimestamp(timestamp)
+        row = [dt.date(), dt.time()]
+        for i in range(5, 10):
+            if not volume_data and i == 9:
+                row.append(0.0)
+                continue
+            try:
+                row.append(float(xi[i]))
+            except ValueError:
+                volume_data = False
+                row.append(0.0)
+        data.append(row)
+
+    data = pd.DataFrame(
+        data, columns=["Date", "Time", "Open", "High", "Low", "Close", "Volume"]
+    )
+    data["Date"] = pd.to_datetime(data["Date"])
+    data["Time"] = pd.to_datetime(data["Time"], format="%H:%M:%S").dt.time
+    data.set_index("Date", inplace=True)
+    data.insert(0, "symbol", value=symbol)
+    return data
+
+
+def make_frame(n_bars, step=5, start=1719800000):
+    bars = []
+    for i in range(n_bars):
+        price = 18000 + (i % 97) * 0.25
+        bars.append(
+            {"i": i, "v": [start + i * step, price, price + 1.5, price - 1.25, price + 0.5, 100.0 + i]}
+        )
+    return json.dumps(
+        {"m": "timescale_update", "p": ["cs_bench", {"s1": {"node": "n", "s": bars}}]},
+        separators=(",", ":"),
+    )
+
+
+def main():
+    print(f"{'bars':>6} {'legacy ms':>10} {'decoder ms':>11} {'speedup':>8}")
+    for n_bars in (100, 1000, 5000, 20000):
+        frame = make_frame(n_bars)
+        pd.testing.assert_frame_equal(
+            legacy_create_df(frame, "CME_MINI:NQ1!"), create_df([frame], "CME_MINI:NQ1!")
+        )
+        number = max(1, 20000 // n_bars)
+        legacy = min(timeit.repeat(lambda: legacy_create_df(frame, "X"), number=number, repeat=5)) / number
+        new = min(timeit.repeat(lambda: create_df([frame], "X"), number=number, repeat=5)) / number
+        print(f"{n_bars:>6} {legacy * 1e3:>10.2f} {new * 1e3:>11.2f} {legacy / new:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
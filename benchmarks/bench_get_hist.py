@@ -0,0 +1,158 @@
+"""
+End-to-end benchmarks for ``get_hist`` against a local fake TradingView server.
+
+Measures, for several bar counts:
+
+- single-fetch latency (median ``get_hist`` wall time over warm runs)
+- parse CPU per 1k bars (process time of decoding one ``timescale_update``)
+- peak memory allocated during one ``get_hist`` (tracemalloc; the fake
+  server runs in the same process, so its allocations are included)
+
+and the throughput of one ``get_hist_many`` batch. Run from the repository root:
+
+    python -m benchmarks.bench_get_hist
+    python -m benchmarks.bench_get_hist --save baseline.json
+    python -m benchmarks.bench_get_hist --compare baseline.json --tolerance 0.25
+
+With ``--compare`` the run exits with status 1 if any metric is worse than
+the baseline by more than the tolerance, so it can gate changes to the hot paths.
+"""
+import argparse
+import json
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.fake_server import FakeTradingViewServer, bar_rows
+from src.stock_data_realtime.decode import bars_to_df, decode_bars
+from src.stock_data_realtime.cache import SymbolCache
+from src.stock_data_realtime.limits import ConnectionLimits
+from src.stock_data_realtime.protocol import create_message
+from src.stock_data_realtime.stock_data import Interval, TvDatafeed
+from src.stock_data_realtime.token_store import TokenStore
+
+BAR_COUNTS = (100, 1000, 5000, 20000)
+# Metrics where a larger value is better; every other metric is a cost
+HIGHER_IS_BETTER = {"batch_series_per_s", "batch_bars_per_s"}
+
+
+def single_fetch(tv, n_bars, runs):
+    tv.get_hist("BENCH", "NASDAQ", Interval.in_1_minute, n_bars=n_bars)  # warm up
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        tv.get_hist("BENCH", "NASDAQ", Interval.in_1_minute, n_bars=n_bars)
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def parse_cpu(n_bars, runs):
+    frame = create_message(
+        "timescale_update", ["cs_bench", {"s1": {"node": "n", "s": bar_rows(n_bars)}}]
+    )
+    payload = [frame.split("~m~", 2)[2]]
+    # decode at least ~50k bars in total so small sizes are not lost in timer noise
+    runs = max(runs, 50000 // n_bars)
+    started = time.process_time()
+    for _ in range(runs):
+        bars_to_df(decode_bars(payload), "NASDAQ:BENCH")
+    return (time.process_time() - started) / runs
+
+
+def peak_memory(tv, n_bars):
+    tracemalloc.start()
+    try:
+        tv.get_hist("BENCH", "NASDAQ", Interval.in_1_minute, n_bars=n_bars)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def batch(tv, n_symbols, n_bars):
+    specs = [(f"SYM{i}", "NASDAQ", Interval.in_1_minute, n_bars) for i in range(n_symbols)]
+    started = time.perf_counter()
+    results = tv.get_hist_many(specs, n_connections=4, max_concurrent_series=10)
+    elapsed = time.perf_counter() - started
+    if len(results) != n_symbols:
+        raise RuntimeError(f"Batch returned {len(results)}/{n_symbols} series")
+    return n_symbols / elapsed, n_symbols * n_bars / elapsed
+
+
+def run(runs=5, n_symbols=50):
+    results = {}
+    limits = ConnectionLimits(create_series_rate=None)
+    # fresh stores keep the run out of the user's cache dir and independent of it
+    with tempfile.TemporaryDirectory() as tmp, FakeTradingViewServer(heartbeat_interval=1) as server:
+        with TvDatafeed(
+            limits=limits,
+            ws_url=server.url,
+            token_store=TokenStore(os.path.join(tmp, "tokens.json")),
+            symbol_cache=SymbolCache(os.path.join(tmp, "symbols.json")),
+        ) as tv:
+            for n_bars in BAR_COUNTS:
+                results[f"latency_ms_{n_bars}"] = single_fetch(tv, n_bars, runs) * 1e3
+                results[f"parse_cpu_ms_per_1k_{n_bars}"] = (
+                    parse_cpu(n_bars, runs) * 1e3 / (n_bars / 1000)
+                )
+                results[f"peak_mib_{n_bars}"] = peak_memory(tv, n_bars) / 2**20
+            series, bars = batch(tv, n_symbols, 1000)
+            results["batch_series_per_s"] = series
+            results["batch_bars_per_s"] = bars
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Return the metrics that regressed beyond ``tolerance`` against ``baseline``."""
+    regressions = []
+    for name, value in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        change = (base - value) / base if name in HIGHER_IS_BETTER else (value - base) / base
+        if change > tolerance:
+            regressions.append((name, base, value, change))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=5, help="timed runs per measurement")
+    parser.add_argument("--symbols", type=int, default=50, help="series in the batch benchmark")
+    parser.add_argument("--save", help="write results to this JSON file")
+    parser.add_argument("--compare", help="baseline JSON file to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative regression")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.ERROR)
+
+    results = run(args.runs, args.symbols)
+    print(f"{'bars':>6} {'latency ms':>11} {'parse CPU ms/1k':>16} {'peak MiB':>9}")
+    for n_bars in BAR_COUNTS:
+        print(
+            f"{n_bars:>6} {results[f'latency_ms_{n_bars}']:>11.2f}"
+            f" {results[f'parse_cpu_ms_per_1k_{n_bars}']:>16.2f}"
+            f" {results[f'peak_mib_{n_bars}']:>9.2f}"
+        )
+    print(
+        f"batch: {results['batch_series_per_s']:.1f} series/s, "
+        f"{results['batch_bars_per_s']:.0f} bars/s"
+    )
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for name, base, value, change in regressions:
+            print(f"REGRESSION {name}: {base:.3f} -> {value:.3f} ({change:+.0%})")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
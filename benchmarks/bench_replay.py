@@ -0,0 +1,74 @@
+"""
+Profile the protocol reader and bar decoding against captured traffic.
+
+Takes a log written by ``WireRecorder`` (``TvDatafeed(recorder=...)``) and
+runs its received messages through the same code the connections use, at
+full CPU speed and without a network:
+
+- reader: ``FrameDecoder`` framing plus ``json.loads`` of every frame
+- decode: ``decode_bars`` and ``bars_to_df`` of every ``timescale_update``
+
+Run from the repository root, optionally under a profiler:
+
+    python -m benchmarks.bench_replay wire.log
+    python -m cProfile -s cumtime -m benchmarks.bench_replay wire.log --runs 20
+"""
+import argparse
+import json
+import sys
+import time
+
+from src.stock_data_realtime.decode import bars_to_df, decode_bars
+from src.stock_data_realtime.wire_log import WireLog
+
+
+def reader(log, runs):
+    messages = [log.text(i) for i in log.received()]
+    started = time.process_time()
+    for _ in range(runs):
+        frames = list(log.frames())
+        for frame in frames:
+            if not frame.startswith("~h~"):
+                json.loads(frame)
+    elapsed = (time.process_time() - started) / runs
+    return elapsed, sum(len(m) for m in messages), len(frames)
+
+
+def decode(log, runs):
+    series = [f for f in log.frames() if f.startswith('{"m":"timescale_update"')]
+    started = time.process_time()
+    for _ in range(runs):
+        n_bars = 0
+        for frame in series:
+            values = decode_bars([frame])
+            if values is not None:
+                bars_to_df(values, "REPLAY")
+                n_bars += len(values)
+    return (time.process_time() - started) / runs, n_bars
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("log", help="wire log written by WireRecorder")
+    parser.add_argument("--runs", type=int, default=5, help="passes over the log")
+    args = parser.parse_args(argv)
+
+    with WireLog(args.log) as log:
+        seconds, size, n_frames = reader(log, args.runs)
+        print(
+            f"reader: {n_frames} frames, {size / 2**20:.2f} MiB in {seconds * 1e3:.2f} ms"
+            f" ({size / 2**20 / seconds:.0f} MiB/s)"
+        )
+        seconds, n_bars = decode(log, args.runs)
+        if n_bars:
+            print(
+                f"decode: {n_bars} bars in {seconds * 1e3:.2f} ms"
+                f" ({seconds * 1e3 / (n_bars / 1000):.3f} ms per 1k bars)"
+            )
+        else:
+            print("decode: no timescale_update frames in the log")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,296 @@
+"""
+Local stand-in for the TradingView websocket, for offline benchmarks.
+
+``FakeTradingViewServer`` accepts plain ``ws://`` connections, speaks the
+``~m~`` framed protocol and answers ``create_series`` with a synthetic
+``timescale_update`` of the requested size followed by ``series_completed``.
+``request_more_data`` returns older bars the same way, ``quote_add_symbols``
+gets a ``qsd`` and ``quote_completed`` per symbol, and heartbeats are sent
+on a timer. Only the standard library is used, so the client under
+test runs its real websocket-client/aiohttp code paths.
+
+    with FakeTradingViewServer() as server:
+        tv = TvDatafeed(ws_url=server.url)
+        tv.get_hist("AAPL", "NASDAQ", n_bars=5000)
+"""
+import base64
+import hashlib
+import json
+import socket
+import struct
+import threading
+import time
+
+from src.stock_data_realtime.protocol import (
+    construct_message,
+    create_message,
+    is_heartbeat,
+    prepend_header,
+    split_frames,
+)
+
+_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+# placeholders for the ids spliced into cached pages
+_CS, _SERIES = "@chart_session@", "@series_id@"
+_TEXT, _CLOSE, _PING, _PONG = 0x1, 0x8, 0x9, 0xA
+
+
+def bar_rows(n_bars, end=1719800000, step=60, offset=0):
+    """``n_bars`` synthetic bars ending ``offset`` bars before ``end``."""
+    rows = []
+    first = end - (offset + n_bars - 1) * step
+    for i in range(n_bars):
+        price = 18000 + ((offset + i) % 97) * 0.25
+        rows.append(
+            {"i": i, "v": [first + i * step, price, price + 1.5, price - 1.25, price + 0.5, 100.0 + i]}
+        )
+    return rows
+
+
+class FakeTradingViewServer:
+    """
+    Threaded websocket server imitating TradingView's chart data feed.
+
+    Args:
+        host (str): Interface to listen on
+        port (int): Port, 0 picks a free one
+        heartbeat_interval (float): Seconds between ``~h~`` heartbeats, None to disable
+        max_bars (int): Bars available per symbol; pages stop once they run out
+        step (int): Seconds between synthetic bars
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, heartbeat_interval=None, max_bars=1_000_000, step=60):
+        self.heartbeat_interval = heartbeat_interval
+        self.max_bars = max_bars
+        self.step = step
+        self.connections = 0
+        self.received = []
+        self.__sock = socket.create_server((host, port))
+        self.__sock.settimeout(0.2)
+        self.__running = False
+        self.__threads = []
+        self.__payloads = {}
+        self.__lock = threading.Lock()
+
+    @property
+    def url(self):
+        host, port = self.__sock.getsockname()[:2]
+        return f"ws://{host}:{port}/socket.io/websocket"
+
+    def start(self):
+        self.__running = True
+        thread = threading.Thread(target=self.__accept_loop, name="fake-tv-server", daemon=True)
+        thread.start()
+        self.__threads.append(thread)
+        return self
+
+    def stop(self):
+        self.__running = False
+        for thread in self.__threads:
+            thread.join(timeout=2)
+        self.__sock.close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def methods(self):
+        return [method for method, _ in self.received]
+
+    def __accept_loop(self):
+        while self.__running:
+            try:
+                conn, _ = self.__sock.accept()
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            # without it Nagle and delayed ACKs add ~40ms to every small reply
+            conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self.connections += 1
+            thread = threading.Thread(target=self.__serve, args=(conn,), daemon=True)
+            thread.start()
+            self.__threads.append(thread)
+
+    def __serve(self, conn):
+        conn.settimeout(0.2)
+        try:
+            if not self.__handshake(conn):
+                return
+            state = {"symbols": {}, "served": {}, "send_lock": threading.Lock(), "open": True}
+            if self.heartbeat_interval:
+                threading.Thread(
+                    target=self.__heartbeat_loop, args=(conn, state), daemon=True
+                ).start()
+            buffer = b""
+            while self.__running and state["open"]:
+                try:
+                    chunk = conn.recv(65536)
+                except socket.timeout:
+                    continue
+                if not chunk:
+                    break
+                buffer += chunk
+                while True:
+                    frame = _read_frame(buffer)
+                    if frame is None:
+                        break
+                    opcode, payload, buffer = frame
+                    if opcode == _CLOSE:
+                        state["open"] = False
+                        self.__send(conn, state, b"", _CLOSE)
+                        break
+                    if opcode == _PING:
+                        self.__send(conn, state, payload, _PONG)
+                    elif opcode == _TEXT:
+                        self.__on_text(conn, state, payload.decode())
+        except OSError:
+            pass
+        finally:
+            conn.close()
+
+    def __handshake(self, conn):
+        request = b""
+        deadline = time.monotonic() + 5
+        while b"\r\n\r\n" not in request:
+            if time.monotonic() > deadline:
+                return False
+            try:
+                chunk = conn.recv(4096)
+            except socket.timeout:
+                continue
+            if not chunk:
+                return False
+            request += chunk
+        headers = {}
+        for line in request.decode("latin-1").split("\r\n")[1:]:
+            if ":" in line:
+                name, value = line.split(":", 1)
+                headers[name.strip().lower()] = value.strip()
+        accept = base64.b64encode(
+            hashlib.sha1((headers["sec-websocket-key"] + _GUID).encode()).digest()
+        ).decode()
+        conn.sendall(
+            (
+                "HTTP/1.1 101 Switching Protocols\r\n"
+                "Upgrade: websocket\r\n"
+                "Connection: Upgrade\r\n"
+                f"Sec-WebSocket-Accept: {accept}\r\n\r\n"
+            ).encode()
+        )
+        return True
+
+    def __heartbeat_loop(self, conn, state):
+        n = 0
+        while self.__running and state["open"]:
+            time.sleep(self.heartbeat_interval)
+            n += 1
+            try:
+                self.__send(conn, state, prepend_header(f"~h~{n}").encode())
+            except OSError:
+                return
+
+    def __on_text(self, conn, state, text):
+        for frame in split_frames(text):
+            if is_heartbeat(frame):
+                continue
+            msg = json.loads(frame)
+            method, params = msg["m"], msg["p"]
+            with self.__lock:
+                self.received.append((method, params))
+            if method == "resolve_symbol":
+                state["symbols"][params[1]] = json.loads(params[2][1:])["symbol"]
+                self.__send(conn, state, create_message(
+                    "symbol_resolved",
+                    [params[0], params[1], {"name": state["symbols"][params[1]], "pricescale": 100}],
+                ).encode())
+            elif method == "create_series":
+                cs, series_id, n_bars = params[0], params[1], params[5]
+                state["served"][series_id] = 0
+                self.__send_page(conn, state, cs, series_id, n_bars)
+            elif method == "request_more_data":
+                cs, series_id, n_bars = params
+                self.__send_page(conn, state, cs, series_id, n_bars)
+            elif method == "remove_series":
+                state["served"].pop(params[1], None)
+            elif method == "quote_add_symbols":
+                self.__send_quotes(conn, state, params[0], [p for p in params[1:] if isinstance(p, str)])
+
+    def __send_page(self, conn, state, cs, series_id, n_bars):
+        offset = state["served"].get(series_id, 0)
+        n_bars = max(0, min(n_bars, self.max_bars - offset))
+        state["served"][series_id] = offset + n_bars
+        self.__send(conn, state, self.__page(cs, series_id, n_bars, offset))
+        self.__send(conn, state, create_message(
+            "series_completed", [cs, series_id, "streaming"]
+        ).encode())
+
+    def __send_quotes(self, conn, state, session, symbols):
+        for symbol in symbols:
+            price = 100 + sum(map(ord, symbol)) % 900 + 0.25
+            fields = {"lp": price, "ch": 0.5, "chp": 0.5 / price * 100, "volume": 1e6, "lp_time": 1719800000}
+            self.__send(conn, state, create_message(
+                "qsd", [session, {"n": symbol, "s": "ok", "v": fields}]
+            ).encode())
+            self.__send(conn, state, create_message("quote_completed", [session, symbol]).encode())
+
+    def __page(self, cs, series_id, n_bars, offset):
+        # pages are rendered once per size and offset, with the session and
+        # series ids spliced in per request, so the benchmark measures the
+        # client rather than the server's JSON encoding
+        key = (n_bars, offset)
+        with self.__lock:
+            parts = self.__payloads.get(key)
+            if parts is None:
+                rows = bar_rows(n_bars, step=self.step, offset=offset)
+                template = construct_message(
+                    "timescale_update", [_CS, {_SERIES: {"node": "n", "s": rows}}]
+                ).encode()
+                head, rest = template.split(_CS.encode())
+                parts = self.__payloads[key] = (head, *rest.split(_SERIES.encode()))
+        head, middle, tail = parts
+        body = b"".join((head, cs.encode(), middle, series_id.encode(), tail))
+        return b"~m~%d~m~" % len(body) + body
+
+    def __send(self, conn, state, payload, opcode=_TEXT):
+        length = len(payload)
+        if length < 126:
+            header = struct.pack("!BB", 0x80 | opcode, length)
+        elif length < 1 << 16:
+            header = struct.pack("!BBH", 0x80 | opcode, 126, length)
+        else:
+            header = struct.pack("!BBQ", 0x80 | opcode, 127, length)
+        with state["send_lock"]:
+            conn.sendall(header + payload)
+
+
+def _read_frame(buffer):
+    """Parse one masked client frame, returning (opcode, payload, rest) or None."""
+    if len(buffer) < 2:
+        return None
+    opcode = buffer[0] & 0x0F
+    masked = buffer[1] & 0x80
+    length = buffer[1] & 0x7F
+    pos = 2
+    if length == 126:
+        if len(buffer) < 4:
+            return None
+        length = struct.unpack("!H", buffer[2:4])[0]
+        pos = 4
+    elif length == 127:
+        if len(buffer) < 10:
+            return None
+        length = struct.unpack("!Q", buffer[2:10])[0]
+        pos = 10
+    mask = b""
+    if masked:
+        mask = buffer[pos:pos + 4]
+        pos += 4
+    if len(buffer) < pos + length:
+        return None
+    payload = buffer[pos:pos + length]
+    if masked:
+        payload = bytes(b ^ mask[i % 4] for i, b in enumerate(payload))
+    return opcode, payload, buffer[pos + length:]
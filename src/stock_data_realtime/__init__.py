@@ -1,2 +1,25 @@
-from .stock_data import TvDatafeed, Interval
-__all__ = ["TvDatafeed", "Interval"]
\ No newline at end of file
+import importlib
+
+# Submodules are imported on first attribute access, so importing the package
+# does not pull in pandas, requests or websocket-client
+_exports = {
+    "TvDatafeed": ".stock_data",
+    "Interval": ".stock_data",
+    "AsyncTvDatafeed": ".async_stock_data",
+    "StreamEvent": ".streaming",
+    "Bars": ".bars",
+    "Panel": ".panel",
+}
+__all__ = ["TvDatafeed", "AsyncTvDatafeed", "Interval", "StreamEvent", "Bars", "Panel"]
+
+
+def __getattr__(name):
+    if name not in _exports:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_exports[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
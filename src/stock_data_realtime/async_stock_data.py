@@ -0,0 +1,813 @@
+import asyncio
+import json
+import logging
+import time
+from typing import TYPE_CHECKING, Optional
+
+try:
+    import aiohttp
+except ImportError:  # optional dependency, installed with the "async" extra
+    aiohttp = None
+
+from . import web
+from .cache import SearchCache, SymbolCache, default_symbol_cache
+from .limits import ConnectionLimits
+from .metrics import get_metrics
+from .panel import Panel
+from .parse_pool import ParsePool
+from .connection import QUOTE_BATCH_SIZE, AuthError, QuoteSnapshot, SeriesRouter
+from .decode import decode_bars
+from .protocol import create_message, format_symbol, generate_session, prepare_symbol
+from .streaming import AsyncSubscription
+from .stock_data import (
+    Interval,
+    batch_stat,
+    batch_stats_frame,
+    build_output,
+    build_panel,
+    check_fill,
+    check_output,
+    concat_batch,
+    has_credentials,
+    quotes_frame,
+)
+from .token_store import TokenStore, default_token_store, token_key
+from .wire_log import RECEIVED, SENT, WireRecorder
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+if aiohttp is not None:
+    _closed_types = (
+        aiohttp.WSMsgType.CLOSE,
+        aiohttp.WSMsgType.CLOSING,
+        aiohttp.WSMsgType.CLOSED,
+        aiohttp.WSMsgType.ERROR,
+    )
+
+
+class AsyncTvConnection(SeriesRouter):
+    """asyncio counterpart of TvConnection built on an aiohttp websocket."""
+
+    def __init__(
+        self,
+        http,
+        token: str,
+        session: str,
+        chart_session: str,
+        timeout: float = None,
+        limits: ConnectionLimits = None,
+        url: str = None,
+        recorder: WireRecorder = None,
+    ) -> None:
+        super().__init__(token, session, chart_session)
+        self.http = http
+        self.recorder = recorder
+        self.__record_id = None
+        self.url = url or web.WS_URL
+        self.limits = limits or ConnectionLimits()
+        self.timeout = self.limits.timeout if timeout is None else timeout
+        self.ws_debug = False
+        self.ws = None
+        self.reconnects = 0
+        self.__lock = asyncio.Lock()
+        self.__waiters = {}
+        self.__tasks = set()
+
+    @property
+    def connected(self) -> bool:
+        return self.ws is not None
+
+    async def connect(self):
+        async with self.__lock:
+            if self.ws is not None:
+                return
+            await self.__open()
+            self.__background(self.__read_loop(self.ws))
+
+    async def close(self):
+        ws, self.ws = self.ws, None
+        if ws is not None:
+            try:
+                await ws.close()
+            except Exception as e:
+                logger.debug(f"Error while closing WebSocket: {e}")
+        for request in list(self._series.values()):
+            self._finish(request, ConnectionError("Connection closed"))
+
+    async def set_token(self, token: str):
+        """Use ``token`` from now on, re-authenticating an open socket right away."""
+        self.token = token
+        if self.ws is not None:
+            try:
+                await self.send("set_auth_token", [token])
+            except Exception as e:
+                logger.debug(f"Could not send the new token: {e}")
+
+    async def send(self, func, args):
+        m = create_message(func, args)
+        if self.ws_debug:
+            print(m)
+        ws = self.ws
+        if ws is None:
+            raise ConnectionError("WebSocket connection is not open")
+        await ws.send_str(m)
+        self.__record(m, SENT)
+
+    async def request_series(
+        self,
+        symbol: str,
+        resolve_payload: str,
+        interval: str,
+        n_bars: int,
+        callback=None,
+        listener=None,
+    ):
+        await self.connect()
+        request = self._new_request(
+            symbol, resolve_payload, interval, n_bars, callback, listener
+        )
+        self.__waiters[request.series_id] = asyncio.get_running_loop().create_future()
+        try:
+            await self.__subscribe(request)
+        except Exception as e:
+            logger.warning(f"Failed to send series request for {symbol}: {e}")
+        return request
+
+    async def wait(self, request, timeout: float = None):
+        timeout = self.timeout if timeout is None else timeout
+        waiter = self.__waiters.get(request.series_id)
+        while waiter is not None and not request.completed.is_set():
+            try:
+                await asyncio.wait_for(asyncio.shield(waiter), timeout)
+            except asyncio.TimeoutError:
+                if time.monotonic() - request.last_activity >= timeout:
+                    logger.error(
+                        f"Timed out waiting for {request.symbol} ({request.series_id})"
+                    )
+                    self.cancel(request, TimeoutError("Timed out waiting for series"))
+        return request
+
+    def cancel(self, request, error: Exception = None):
+        self._finish(request, error)
+
+    async def subscribe_quotes(self, symbols, handler):
+        await self.connect()
+        added = self._add_quote_handler(symbols, handler)
+        if added:
+            for func, args in self._quote_add_messages(added):
+                await self.send(func, args)
+
+    async def snapshot_quotes(self, symbols, timeout: float = None, batch_size: int = QUOTE_BATCH_SIZE):
+        """Collect the current quote of many symbols; see ``TvConnection.snapshot_quotes``."""
+        snapshot = QuoteSnapshot(symbols, asyncio.Event())
+        await self.connect()
+        added = self._add_snapshot(snapshot)
+        try:
+            for func, args in self._quote_snapshot_messages(added, batch_size):
+                await self.send(func, args)
+            await asyncio.wait_for(
+                snapshot.done.wait(), self.timeout if timeout is None else timeout
+            )
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            await self.unsubscribe_quotes(snapshot.symbols, snapshot)
+        return snapshot
+
+    async def unsubscribe_quotes(self, symbols, handler):
+        removed = self._remove_quote_handler(symbols, handler)
+        if removed and self.ws is not None:
+            for func, args in self._quote_remove_messages(removed):
+                await self.send(func, args)
+
+    def __background(self, coro):
+        task = asyncio.ensure_future(coro)
+        self.__tasks.add(task)
+        task.add_done_callback(self.__tasks.discard)
+
+    async def __create_connection(self):
+        breaker = self.limits.breaker
+        attempts = self.limits.connect_attempts
+        for attempt in range(attempts):
+            if not breaker.allow():
+                raise ConnectionError(
+                    f"Too many failed connections, retry in {breaker.retry_after():.0f}s"
+                )
+            try:
+                logger.debug(f"Creating websocket connection (attempt {attempt + 1})")
+                ws = await asyncio.wait_for(
+                    self.http.ws_connect(self.url, headers={"Origin": web.WS_ORIGIN}),
+                    self.timeout,
+                )
+                logger.debug("WebSocket connection established successfully")
+                breaker.record_success()
+                return ws
+            except Exception as e:
+                logger.error(f"Failed to establish WebSocket connection: {e}")
+                get_metrics().increment("tv_connect_failures_total")
+                breaker.record_failure()
+                if attempt < attempts - 1:
+                    await asyncio.sleep(self.limits.backoff.delay(attempt))
+        raise ConnectionError(
+            f"Failed to establish WebSocket connection after {attempts} attempts"
+        )
+
+    async def __open(self):
+        metrics = get_metrics()
+        with metrics.timer("tv_connect_seconds"):
+            self.ws = await self.__create_connection()
+        if self.recorder is not None:
+            self.__record_id = self.recorder.open()
+        self._decoder.reset()
+        with metrics.timer("tv_session_setup_seconds"):
+            for func, args in self._session_messages():
+                await self.send(func, args)
+
+    async def __reconnect(self, old_ws):
+        async with self.__lock:
+            if self.ws is not old_ws:
+                return None
+            try:
+                await old_ws.close()
+            except Exception:
+                pass
+            try:
+                await self.__open()
+            except ConnectionError as e:
+                self.ws = None
+                for request in list(self._series.values()):
+                    self._finish(request, e)
+                return None
+            self.reconnects += 1
+            get_metrics().increment("tv_reconnects_total")
+            for request in list(self._series.values()):
+                request.frames.clear()
+                request.last_activity = time.monotonic()
+                await self.__subscribe(request)
+            logger.info(
+                f"Reconnected and re-subscribed {len(self._series)} pending series"
+            )
+            return self.ws
+
+    async def __subscribe(self, request):
+        if self.limits.rate_limiter is not None:
+            await asyncio.sleep(self.limits.rate_limiter.reserve())
+        for func, args in self._subscribe_messages(request):
+            await self.send(func, args)
+
+    async def __release(self, request):
+        try:
+            for func, args in self._release_messages(request):
+                await self.send(func, args)
+        except Exception as e:
+            logger.debug(f"Could not release {request.series_id}: {e}")
+
+    def _send_raw(self, text):
+        self.__background(self.__send_raw(text))
+
+    async def __send_raw(self, text):
+        ws = self.ws
+        if ws is None:
+            return
+        try:
+            await ws.send_str(text)
+        except Exception as e:
+            logger.debug(f"Could not send {text!r}: {e}")
+            return
+        self.__record(text, SENT)
+
+    def __record(self, text, direction):
+        if self.recorder is not None:
+            self.recorder.record(text, self.__record_id, direction)
+
+    def _finish(self, request, error=None):
+        if not self._take(request):
+            return
+        request.error = error
+        request.completed.set()
+        waiter = self.__waiters.pop(request.series_id, None)
+        if waiter is not None and not waiter.done():
+            waiter.set_result(request)
+        if self.ws is not None:
+            self.__background(self.__release(request))
+        if request.callback is not None:
+            request.callback(request)
+
+    async def __read_loop(self, ws):
+        while self.ws is ws:
+            try:
+                msg = await ws.receive()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                msg = None
+                logger.debug(f"Error while receiving: {e}")
+            if msg is not None and msg.type == aiohttp.WSMsgType.TEXT:
+                self.__record(msg.data, RECEIVED)
+                try:
+                    self._dispatch(msg.data)
+                except Exception as e:
+                    # a malformed frame must not stop the reader of a shared socket
+                    logger.error(f"Error while routing message: {e}")
+                continue
+            if msg is not None and msg.type not in _closed_types:
+                continue
+            if self.ws is not ws:
+                break
+            logger.warning("WebSocket connection lost")
+            ws = await self.__reconnect(ws)
+            if ws is None:
+                break
+
+
+class AsyncTvDatafeed:
+    """
+    asyncio-native counterpart of TvDatafeed.
+
+    Authentication, symbol search and history requests are coroutines that
+    share one aiohttp session and one multiplexed websocket, so many
+    concurrent ``get_hist`` calls run on a single event loop without threads.
+    """
+
+    def __init__(
+        self,
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+        sessionid: Optional[str] = None,
+        sessionid_sign: Optional[str] = None,
+        search_cache: Optional[SearchCache] = None,
+        limits: Optional[ConnectionLimits] = None,
+        ws_url: Optional[str] = None,
+        parse_pool: Optional[ParsePool] = None,
+        token_store: Optional[TokenStore] = None,
+        symbol_cache: Optional[SymbolCache] = None,
+        recorder: Optional[WireRecorder] = None,
+    ) -> None:
+        if aiohttp is None:
+            raise ImportError(
+                "AsyncTvDatafeed requires aiohttp, install it with `pip install aiohttp`"
+            )
+        self.username = username
+        self.password = password
+        self.sessionid = sessionid
+        self.sessionid_sign = sessionid_sign
+        self.token = None
+        self.ws_debug = False
+        self.batch_stats = None
+        self.search_cache = search_cache if search_cache is not None else SearchCache()
+        self.limits = limits or ConnectionLimits()
+        self.ws_url = ws_url
+        self.parse_pool = parse_pool
+        self.token_store = token_store or default_token_store()
+        self.symbol_cache = symbol_cache or default_symbol_cache()
+        self.recorder = recorder
+        self.__http = None
+        self.__connections = []
+        self.__load = {}
+        self.__slots = asyncio.Condition()
+        self.__searches = {}
+        self.__auth_lock = asyncio.Lock()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def close(self):
+        """Close the websocket connections and the HTTP session."""
+        for connection in self.__connections:
+            await connection.close()
+        if self.__http is not None:
+            await self.__http.close()
+            self.__http = None
+        await asyncio.to_thread(self.symbol_cache.flush)
+
+    def __get_http(self):
+        if self.__http is None:
+            self.__http = aiohttp.ClientSession()
+        return self.__http
+
+    async def auth(self) -> str:
+        """
+        Load a stored token or authenticate, once per instance.
+
+        Returns:
+            str: The auth token, or the unauthorized token when no credentials work
+        """
+        async with self.__auth_lock:
+            if not self.token:
+                self.token = await self.__get_token()
+            return self.token
+
+    async def refresh_token(self, rejected: str = None) -> str:
+        """
+        Replace a token the server rejected; see ``TvDatafeed.refresh_token``.
+        """
+        async with self.__auth_lock:
+            if rejected is not None and self.token and self.token != rejected:
+                return self.token
+            self.token = await self.__get_token(stale=rejected or self.token)
+            for connection in self.__connections:
+                await connection.set_token(self.token)
+            return self.token
+
+    async def __get_token(self, stale=None):
+        if not has_credentials(self.username, self.password, self.sessionid, self.sessionid_sign):
+            return await self.__sign_in() or web.UNAUTHORIZED_TOKEN
+        key = token_key(self.username, self.sessionid)
+        token = None if stale else await asyncio.to_thread(self.token_store.get, key)
+        if token:
+            logger.info("Loaded saved token.")
+        else:
+            loop = asyncio.get_running_loop()
+
+            def sign_in():
+                # runs in a worker thread while it holds the store's file lock
+                return asyncio.run_coroutine_threadsafe(self.__sign_in(), loop).result()
+
+            token = await asyncio.to_thread(self.token_store.refresh, key, sign_in, stale)
+        return token or web.UNAUTHORIZED_TOKEN
+
+    async def __sign_in(self):
+        with get_metrics().timer("tv_auth_seconds"):
+            token = await self.__auth()
+        return None if token == web.UNAUTHORIZED_TOKEN else token
+
+    async def __auth(self):
+        if self.sessionid and self.sessionid_sign:
+            return await self.__auth_with_session()
+        elif self.username and self.password:
+            return await self.__auth_with_credentials()
+        else:
+            logger.warning(
+                "No valid credentials or session cookies provided. Using unauthorized access."
+            )
+            return web.UNAUTHORIZED_TOKEN
+
+    async def __auth_with_session(self):
+        headers = web.session_headers(self.sessionid, self.sessionid_sign)
+        http = self.__get_http()
+        try:
+            response = await http.get(
+                web.CHART_URL, headers=headers, allow_redirects=False
+            )
+            if response.status == 302:
+                redirect_url = response.headers.get("Location")
+                response.release()
+                response = await http.get(
+                    f"https://www.tradingview.com{redirect_url}", headers=headers
+                )
+            response.raise_for_status()
+            text = await response.text()
+        except aiohttp.ClientError as e:
+            logger.error(f"Error during session authentication: {e}")
+            return web.UNAUTHORIZED_TOKEN
+
+        token = web.parse_session_token(text)
+        if token:
+            logger.info("Authentication successful with session cookies.")
+            return token
+        logger.error("Failed to extract auth token from response.")
+        return web.UNAUTHORIZED_TOKEN
+
+    async def __auth_with_credentials(self):
+        data = {"username": self.username, "password": self.password, "remember": "on"}
+        try:
+            async with self.__get_http().post(
+                web.SIGN_IN_URL, data=data, headers=web.SIGNIN_HEADERS
+            ) as response:
+                response.raise_for_status()
+                text = await response.text()
+        except aiohttp.ClientError as e:
+            logger.error(f"Error during credentials authentication: {e}")
+            return web.UNAUTHORIZED_TOKEN
+
+        try:
+            token = web.parse_credentials_token(json.loads(text))
+        except json.JSONDecodeError:
+            logger.error("Failed to parse authentication response as JSON.")
+            return web.UNAUTHORIZED_TOKEN
+        if token:
+            logger.info("Authentication successful with credentials.")
+            return token
+        logger.error("Unexpected response format during authentication.")
+        return web.UNAUTHORIZED_TOKEN
+
+    async def __get_connections(self, n_connections):
+        token = await self.auth()
+        n_connections = min(n_connections, self.limits.max_connections)
+        while len(self.__connections) < n_connections:
+            self.__open(token)
+        for connection in self.__connections:
+            connection.ws_debug = self.ws_debug
+        return self.__connections[:n_connections]
+
+    async def __acquire(self, max_connections: int = None, max_series: int = None):
+        """Reserve a series slot on a connection; see ``ConnectionPool.acquire``."""
+        token = await self.auth()
+        limits = self.limits
+        max_connections = min(max_connections or limits.max_connections, limits.max_connections)
+        max_series = min(max_series or limits.max_series_per_connection, limits.max_series_per_connection)
+        async with self.__slots:
+            while True:
+                connection = self.__choose(token, max_connections, max_series)
+                if connection is not None:
+                    self.__load[connection] += 1
+                    connection.ws_debug = self.ws_debug
+                    return connection
+                await self.__slots.wait()
+
+    async def __release(self, connection):
+        async with self.__slots:
+            self.__load[connection] -= 1
+            self.__slots.notify()
+
+    def __choose(self, token, max_connections, max_series):
+        usable = self.__connections[:max_connections]
+        for connection in usable:
+            if self.__load[connection] == 0:
+                return connection
+        if len(usable) < max_connections:
+            return self.__open(token)
+        connection = min(usable, key=self.__load.get)
+        return connection if self.__load[connection] < max_series else None
+
+    def __open(self, token):
+        connection = AsyncTvConnection(
+            self.__get_http(),
+            token,
+            generate_session("qs_"),
+            generate_session("cs_"),
+            limits=self.limits,
+            url=self.ws_url,
+            recorder=self.recorder,
+        )
+        self.__connections.append(connection)
+        self.__load[connection] = 0
+        return connection
+
+    async def __fetch(
+        self,
+        symbol,
+        resolve_payload,
+        interval,
+        n_bars,
+        timeout=None,
+        max_connections=None,
+        max_series=None,
+        retry_auth=True,
+    ):
+        connection = await self.__acquire(max_connections, max_series)
+        try:
+            token = connection.token
+            request = await connection.request_series(
+                symbol, resolve_payload, interval.value, n_bars
+            )
+            await connection.wait(request, timeout)
+        finally:
+            await self.__release(connection)
+        if isinstance(request.error, AuthError) and retry_auth:
+            logger.warning(f"Token rejected while fetching {symbol}, refreshing it")
+            await self.refresh_token(rejected=token)
+            return await self.__fetch(
+                symbol,
+                resolve_payload,
+                interval,
+                n_bars,
+                timeout,
+                max_connections,
+                max_series,
+                retry_auth=False,
+            )
+        await self.__remember(request)
+        return request
+
+    async def get_hist(
+        self,
+        symbol: str,
+        exchange: str = "NSE",
+        interval: Interval = Interval.in_daily,
+        n_bars: int = 5000,
+        fut_contract: int = None,
+        extended_session: bool = False,
+        output: str = "pandas",
+    ) -> "pd.DataFrame":
+        check_output(output)
+        if await self.auth() == web.UNAUTHORIZED_TOKEN:
+            logger.warning("Using unauthorized access, data may be limited")
+
+        symbol, resolve_payload = prepare_symbol(
+            symbol, exchange, fut_contract, extended_session
+        )
+
+        logger.debug(f"Getting data for {symbol}...")
+        request = await self.__fetch(symbol, resolve_payload, interval, n_bars)
+
+        values = decode_bars(request.frames)
+        if values is None:
+            logger.error("No data, please check the exchange and symbol")
+        return build_output(values, symbol, interval, output, request.symbol_info)
+
+    async def symbol_info(
+        self,
+        symbol: str,
+        exchange: str = "NSE",
+        fut_contract: int = None,
+        extended_session: bool = False,
+    ) -> dict:
+        """Instrument metadata of a symbol; see ``TvDatafeed.symbol_info``."""
+        symbol, resolve_payload = prepare_symbol(
+            symbol, exchange, fut_contract, extended_session
+        )
+        info = await asyncio.to_thread(self.symbol_cache.get, resolve_payload)
+        if info is None:
+            (connection,) = await self.__get_connections(1)
+            request = await connection.request_series(
+                symbol, resolve_payload, Interval.in_daily.value, 1
+            )
+            await connection.wait(request)
+            await self.__remember(request)
+            info = request.symbol_info
+        return info
+
+    async def __remember(self, request):
+        if request.symbol_info is not None:
+            # a put may flush the cache file once flush_interval has passed
+            await asyncio.to_thread(
+                self.symbol_cache.put, request.resolve_payload, request.symbol_info
+            )
+
+    async def subscribe(self, callback=None, maxsize: int = 10000) -> AsyncSubscription:
+        """
+        Open a live subscription on the shared connection.
+
+        Add symbols with ``add_quotes``/``add_bars`` and consume the updates
+        with ``async for`` or through ``callback``.
+        """
+        (connection,) = await self.__get_connections(1)
+        return AsyncSubscription(connection, callback, maxsize)
+
+    async def get_quotes(
+        self,
+        symbols: list,
+        exchange: str = "",
+        timeout: float = None,
+        batch_size: int = QUOTE_BATCH_SIZE,
+    ) -> "pd.DataFrame":
+        """Snapshot the latest quote of many symbols; see ``TvDatafeed.get_quotes``."""
+        (connection,) = await self.__get_connections(1)
+        symbols = [format_symbol(s, exchange) if exchange else s for s in symbols]
+        symbols = list(dict.fromkeys(symbols))
+        snapshot = await connection.snapshot_quotes(symbols, timeout, batch_size)
+        return quotes_frame(snapshot)
+
+    async def get_hist_many(
+        self,
+        specs: list,
+        n_connections: int = 1,
+        max_concurrent_series: int = 10,
+        concat: bool = False,
+        extended_session: bool = False,
+        timeout: float = None,
+        output: str = "pandas",
+    ):
+        """
+        Fetch history for many symbols concurrently on the event loop.
+
+        Takes the same arguments and returns the same shapes as
+        ``TvDatafeed.get_hist_many``; per-symbol latency and errors are stored
+        in ``self.batch_stats``. With ``self.parse_pool`` set, decoding runs
+        in the pool instead of blocking the event loop.
+        """
+        check_output(output)
+        if concat and output == "bars":
+            raise ValueError("concat=True needs output 'pandas' or 'pandas_tz'")
+        await self.auth()
+        specs = list(dict.fromkeys(tuple(spec) for spec in specs))
+        results = {}
+        stats = []
+
+        async def fetch(spec):
+            started = time.perf_counter()
+            try:
+                symbol, exchange, interval, n_bars = spec
+                symbol, resolve_payload = prepare_symbol(
+                    symbol, exchange, None, extended_session
+                )
+                request = await self.__fetch(
+                    symbol,
+                    resolve_payload,
+                    interval,
+                    n_bars,
+                    timeout,
+                    n_connections,
+                    max_concurrent_series,
+                )
+                if request.error is not None:
+                    raise request.error
+                if self.parse_pool is not None:
+                    bars = await asyncio.wrap_future(
+                        self.parse_pool.submit(request.frames, symbol)
+                    )
+                    values = None if bars is None else bars.to_numpy()
+                else:
+                    values = decode_bars(request.frames)
+                data = build_output(
+                    values, symbol, interval, output, request.symbol_info
+                )
+                if data is None:
+                    raise ValueError("No data")
+            except Exception as e:
+                stats.append(batch_stat(spec, started, error=e))
+                return
+            stats.append(batch_stat(spec, started, bars=len(data)))
+            results[spec] = data
+
+        await asyncio.gather(*(fetch(spec) for spec in specs))
+        await asyncio.to_thread(self.symbol_cache.flush)
+        self.batch_stats = batch_stats_frame(stats)
+        n_used = min(len(self.__connections), n_connections, self.limits.max_connections)
+        logger.info(
+            f"Fetched {len(results)}/{len(stats)} series over {n_used} connection(s)"
+        )
+        return concat_batch(results) if concat else results
+
+    async def get_panel(
+        self,
+        symbols: list,
+        exchange: str = "NSE",
+        interval: Interval = Interval.in_daily,
+        n_bars: int = 5000,
+        fill: str = "ffill",
+        limit: int = None,
+        n_connections: int = 1,
+        max_concurrent_series: int = 10,
+        extended_session: bool = False,
+        timeout: float = None,
+    ) -> Panel:
+        """
+        Fetch a universe of symbols as one aligned ``Panel``; takes the same
+        arguments as ``TvDatafeed.get_panel``.
+        """
+        check_fill(fill)
+        specs = [(symbol, exchange, interval, n_bars) for symbol in symbols]
+        results = await self.get_hist_many(
+            specs,
+            n_connections=n_connections,
+            max_concurrent_series=max_concurrent_series,
+            extended_session=extended_session,
+            timeout=timeout,
+            output="bars",
+        )
+        return build_panel(specs, results, interval, fill, limit, extended_session)
+
+    async def search_symbol(self, text: str, exchange: str = "", type: str = None):
+        """
+        Search for symbols on TradingView.
+
+        Args:
+            text (str): Search query
+            exchange (str, optional): Exchange to filter by
+            type (str, optional): Asset type (e.g., stock, futures, crypto)
+
+        Returns:
+            list: List of symbol dictionaries
+        """
+        key = (text, exchange, type)
+        symbols_list = self.search_cache.get(key)
+        if symbols_list is None:
+            task = self.__searches.get(key)
+            if task is None:
+                task = self.__searches[key] = asyncio.ensure_future(self.__search(*key))
+                task.add_done_callback(lambda _: self.__searches.pop(key, None))
+            symbols_list = await asyncio.shield(task)
+        return list(symbols_list or [])
+
+    async def __search(self, text, exchange, type):
+        await self.auth()
+        params = web.search_params(text, exchange, type)
+        headers = web.search_headers(self.token)
+        cookies = web.search_cookies(self.sessionid, self.sessionid_sign)
+
+        try:
+            with get_metrics().timer("tv_search_seconds"):
+                async with self.__get_http().get(
+                    web.SEARCH_URL, params=params, headers=headers, cookies=cookies
+                ) as resp:
+                    body = await resp.text()
+                    resp.raise_for_status()
+            symbols_list = web.parse_search_results(body)
+            logger.debug(f"Search successful for '{text}' on '{exchange}'")
+        except aiohttp.ClientResponseError as e:
+            logger.error(f"HTTP error during symbol search: {e} - Response: {body}")
+            return None
+        except Exception as e:
+            logger.error(f"Error during symbol search: {e}")
+            return None
+
+        self.search_cache.put((text, exchange, type), symbols_list)
+        return symbols_list
@@ -0,0 +1,127 @@
+import numpy as np
+
+FIELDS = ("open", "high", "low", "close", "volume")
+
+
+def exchange_timezone(info: dict = None) -> str:
+    """Exchange timezone from ``symbol_resolved`` metadata, UTC when unknown."""
+    return (info or {}).get("timezone") or "UTC"
+
+
+def localize(seconds, timezone: str = "UTC"):
+    """
+    tz-aware ``DatetimeIndex`` named ``Date`` from epoch seconds, built in
+    one vectorized step. The values stay int64 UTC instants, so indexes in
+    different timezones sort and join on the same clock.
+    """
+    import pandas as pd
+
+    seconds = np.asarray(seconds).astype(np.int64, copy=False)
+    index = pd.DatetimeIndex(seconds.view("datetime64[s]"), name="Date")
+    return index.tz_localize("UTC").tz_convert(timezone)
+
+
+class Bars:
+    """
+    Columnar OHLCV bars for one symbol and interval.
+
+    Timestamps are epoch seconds in a contiguous int64 array; open, high,
+    low, close and volume are rows of one contiguous float64 block, so every
+    column is a view and ``to_pandas``/``to_arrow`` reuse the buffers
+    instead of copying them. The symbol and interval are stored once, with
+    the instrument metadata from ``symbol_resolved`` in ``info`` when known.
+    """
+
+    __slots__ = ("symbol", "interval", "time", "_block", "info")
+
+    def __init__(self, symbol: str, interval: str, time, block, info: dict = None):
+        self.symbol = symbol
+        self.interval = interval
+        self.time = time
+        self._block = block
+        self.info = info
+
+    @classmethod
+    def from_values(cls, values, symbol: str, interval: str = None, info: dict = None):
+        """Build from an (n, 6) time/open/high/low/close/volume array."""
+        time = values[:, 0].astype(np.int64)
+        block = np.ascontiguousarray(values[:, 1:6].T, dtype=np.float64)
+        return cls(symbol, interval, time, block, info)
+
+    @property
+    def open(self):
+        return self._block[0]
+
+    @property
+    def high(self):
+        return self._block[1]
+
+    @property
+    def low(self):
+        return self._block[2]
+
+    @property
+    def close(self):
+        return self._block[3]
+
+    @property
+    def volume(self):
+        return self._block[4]
+
+    @property
+    def nbytes(self) -> int:
+        return self.time.nbytes + self._block.nbytes
+
+    def __len__(self):
+        return len(self.time)
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            raise TypeError("Bars only support slicing, e.g. bars[-100:]")
+        return Bars(
+            self.symbol, self.interval, self.time[index], self._block[:, index], self.info
+        )
+
+    def __repr__(self):
+        return f"Bars({self.symbol!r}, {self.interval!r}, {len(self)} bars)"
+
+    def to_numpy(self):
+        """Return an (n, 6) float64 array in ``decode_bars`` layout (a copy)."""
+        return np.column_stack([self.time.astype(np.float64), self._block.T])
+
+    def to_pandas(self, timezone: str = None):
+        """
+        DataFrame with a UTC-naive ``datetime64[s]`` index and one float64
+        column per field, sharing memory with this container. ``info`` is
+        kept in ``attrs["symbol_info"]``.
+
+        Args:
+            timezone (str, optional): Make the index tz-aware in this
+                timezone; ``"exchange"`` uses ``info["timezone"]``
+        """
+        import pandas as pd
+
+        if timezone is None:
+            index = pd.DatetimeIndex(self.time.view("datetime64[s]"), name="Date", copy=False)
+        else:
+            if timezone == "exchange":
+                timezone = exchange_timezone(self.info)
+            index = localize(self.time, timezone)
+        frame = pd.DataFrame(
+            self._block.T, index=index, columns=[f.capitalize() for f in FIELDS], copy=False
+        )
+        if self.info is not None:
+            frame.attrs["symbol_info"] = self.info
+        return frame
+
+    def to_arrow(self):
+        """pyarrow Table sharing memory with this container (requires pyarrow)."""
+        try:
+            import pyarrow as pa
+        except ImportError:
+            raise ImportError(
+                "Bars.to_arrow requires pyarrow, install it with `pip install pyarrow`"
+            ) from None
+        columns = {"time": pa.array(self.time.view("datetime64[s]"))}
+        columns.update((f, pa.array(self._block[i])) for i, f in enumerate(FIELDS))
+        return pa.table(columns, metadata={"symbol": self.symbol, "interval": self.interval or ""})
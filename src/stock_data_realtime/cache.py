@@ -0,0 +1,433 @@
+import atexit
+import collections
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+
+import numpy as np
+
+from .metrics import get_metrics
+from .token_store import FileLock, user_cache_dir
+
+logger = logging.getLogger(__name__)
+
+_columns = ["time", "open", "high", "low", "close", "volume"]
+_extensions = {"parquet": ".parquet", "feather": ".feather", "npy": ".npy"}
+_unsafe = re.compile(r"[^A-Za-z0-9_.-]+")
+
+# symbol_resolved fields kept by SymbolCache; the full payload also lists
+# every subsession and is several kilobytes per symbol
+SYMBOL_INFO_FIELDS = (
+    "pro_name",
+    "description",
+    "exchange",
+    "type",
+    "currency_code",
+    "timezone",
+    "session",
+    "pricescale",
+    "minmov",
+    "fractional",
+)
+
+
+class BarCache:
+    """
+    Persistent on-disk store of decoded bars.
+
+    One file per (formatted symbol, interval, session, adjustment). The
+    session and adjustment come from the ``resolve_symbol`` payload, so
+    regular and extended hours or back-adjusted contracts never share an
+    entry. Files hold epoch seconds as int64 and OHLCV as float64.
+
+    Args:
+        directory (str): Where cache files are written
+        max_age (float): Seconds after which an entry is discarded, None to keep forever
+        max_bytes (int): Total size above which the oldest entries are evicted
+        format (str): ``"parquet"`` or ``"feather"`` (both need pyarrow), or ``"npy"``
+    """
+
+    def __init__(
+        self,
+        directory: str = "tv_cache",
+        max_age: float = None,
+        max_bytes: int = None,
+        format: str = "parquet",
+    ):
+        if format not in _extensions:
+            raise ValueError(f"Unsupported cache format: {format}")
+        self.directory = directory
+        self.max_age = max_age
+        self.max_bytes = max_bytes
+        self.format = format
+        self.hits = 0
+        self.misses = 0
+        self.__lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, symbol: str, resolve_payload: str, interval: str) -> str:
+        digest = hashlib.sha1(f"{resolve_payload}|{interval}".encode()).hexdigest()[:12]
+        name = f"{_unsafe.sub('_', symbol)}-{interval}-{digest}"
+        return os.path.join(self.directory, name + _extensions[self.format])
+
+    def get(self, symbol: str, resolve_payload: str, interval: str):
+        """
+        Return the cached (n, 6) bar array, or None if missing or expired.
+        """
+        path = self.path(symbol, resolve_payload, interval)
+        try:
+            if self.max_age is not None and time.time() - os.path.getmtime(path) > self.max_age:
+                self.__remove(path)
+                raise FileNotFoundError(path)
+            values = self.__read(path)
+        except FileNotFoundError:
+            self.__count(hit=False)
+            return None
+        except Exception as e:
+            logger.warning(f"Discarding unreadable cache entry {path}: {e}")
+            self.__remove(path)
+            self.__count(hit=False)
+            return None
+        self.__count(hit=True)
+        return values
+
+    def put(self, symbol: str, resolve_payload: str, interval: str, values):
+        """Replace the entry with ``values`` and enforce the size limit."""
+        path = self.path(symbol, resolve_payload, interval)
+        temp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            self.__write(temp, values)
+            os.replace(temp, path)
+        except Exception as e:
+            logger.error(f"Error writing cache entry {path}: {e}")
+            self.__remove(temp)
+            return
+        if self.max_bytes is not None:
+            self.evict()
+
+    def evict(self):
+        """Drop expired entries, then the oldest ones until under ``max_bytes``."""
+        with self.__lock:
+            now = time.time()
+            entries = []
+            for entry in os.scandir(self.directory):
+                if not entry.name.endswith(_extensions[self.format]):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                if self.max_age is not None and now - stat.st_mtime > self.max_age:
+                    self.__remove(entry.path)
+                else:
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+            if self.max_bytes is None:
+                return
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                self.__remove(path)
+                total -= size
+
+    def clear(self):
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(_extensions[self.format]):
+                self.__remove(entry.path)
+
+    def __count(self, hit):
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+        get_metrics().increment(
+            "tv_cache_requests_total", cache="bars", result="hit" if hit else "miss"
+        )
+
+    def __read(self, path):
+        if self.format == "npy":
+            return np.load(path)
+        import pandas as pd
+
+        if self.format == "parquet":
+            frame = pd.read_parquet(path)
+        else:
+            frame = pd.read_feather(path)
+        return frame[_columns].to_numpy(dtype=np.float64)
+
+    def __write(self, path, values):
+        if self.format == "npy":
+            with open(path, "wb") as f:
+                np.save(f, values)
+            return
+        import pandas as pd
+
+        frame = pd.DataFrame(values, columns=_columns)
+        frame["time"] = frame["time"].astype(np.int64)
+        if self.format == "parquet":
+            frame.to_parquet(path, index=False)
+        else:
+            frame.to_feather(path)
+
+    @staticmethod
+    def __remove(path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+class SearchCache:
+    """
+    In-memory LRU cache with TTL expiry for symbol search results.
+
+    Concurrent ``load`` calls for the same key share one in-flight lookup:
+    the first caller runs ``loader`` and the others wait for its result.
+    Failed lookups (``loader`` raising) are not cached.
+
+    Args:
+        maxsize (int): Number of results kept, least recently used evicted first
+        ttl (float): Seconds a result stays valid
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.__entries = collections.OrderedDict()
+        self.__inflight = {}
+        self.__lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.__entries)
+
+    def get(self, key):
+        """Return the cached value for ``key``, or None if missing or expired."""
+        with self.__lock:
+            return self.__lookup(key)
+
+    def put(self, key, value):
+        with self.__lock:
+            self.__store(key, value)
+
+    def load(self, key, loader):
+        """
+        Return the cached value for ``key``, calling ``loader()`` on a miss.
+
+        Exceptions raised by ``loader`` propagate to every waiting caller.
+        """
+        with self.__lock:
+            value = self.__lookup(key)
+            if value is not None:
+                return value
+            pending = self.__inflight.get(key)
+            owner = pending is None
+            if owner:
+                pending = self.__inflight[key] = [threading.Event(), None, None]
+
+        if not owner:
+            pending[0].wait()
+            if pending[2] is not None:
+                raise pending[2]
+            return pending[1]
+
+        try:
+            pending[1] = loader()
+            self.put(key, pending[1])
+            return pending[1]
+        except Exception as e:
+            pending[2] = e
+            raise
+        finally:
+            with self.__lock:
+                del self.__inflight[key]
+            pending[0].set()
+
+    def clear(self):
+        with self.__lock:
+            self.__entries.clear()
+
+    def __lookup(self, key):
+        entry = self.__entries.get(key)
+        if entry is not None and time.monotonic() - entry[0] <= self.ttl:
+            self.__entries.move_to_end(key)
+            self.hits += 1
+            get_metrics().increment("tv_cache_requests_total", cache="search", result="hit")
+            return entry[1]
+        if entry is not None:
+            del self.__entries[key]
+        self.misses += 1
+        get_metrics().increment("tv_cache_requests_total", cache="search", result="miss")
+        return None
+
+    def __store(self, key, value):
+        self.__entries[key] = (time.monotonic(), value)
+        self.__entries.move_to_end(key)
+        while len(self.__entries) > self.maxsize:
+            self.__entries.popitem(last=False)
+
+
+def default_symbol_cache_path() -> str:
+    """``$TV_SYMBOL_CACHE``, else ``symbols.json`` in the user cache directory."""
+    return os.environ.get("TV_SYMBOL_CACHE") or os.path.join(user_cache_dir(), "symbols.json")
+
+
+class SymbolCache:
+    """
+    Instrument metadata from ``symbol_resolved`` messages, shared by every
+    client and process on the machine.
+
+    Entries are keyed by the ``resolve_symbol`` payload, which holds the
+    formatted symbol, session and adjustment, and keep the
+    ``SYMBOL_INFO_FIELDS`` (pricescale, minmov, session, timezone, type,
+    ...). New entries are kept in memory and written out by ``flush``,
+    which clients call after a batch and on ``close``, or by the next
+    ``put`` once ``flush_interval`` seconds have passed. Like
+    ``TokenStore``, a flush takes a file lock, merges the entries other
+    processes stored and replaces the JSON file atomically. The file is
+    parsed again only when it changed.
+
+    Args:
+        path (str, optional): Cache file, defaults to ``default_symbol_cache_path()``
+        max_age (float): Seconds after which an entry is resolved again, None to keep forever
+        flush_interval (float): Seconds new entries may wait in memory, None to only flush explicitly
+    """
+
+    def __init__(self, path: str = None, max_age: float = 7 * 86400, flush_interval: float = 30):
+        self.path = path or default_symbol_cache_path()
+        self.max_age = max_age
+        self.flush_interval = flush_interval
+        self.hits = 0
+        self.misses = 0
+        self.lock = FileLock(self.path + ".lock")
+        self.__entries = {}
+        self.__pending = {}
+        self.__stamp = None
+        self.__flushed_at = time.monotonic()
+        self.__mutex = threading.RLock()
+
+    def get(self, resolve_payload: str):
+        """Return the metadata dict of a symbol, or None if missing or expired."""
+        with self.__mutex:
+            entry = self.__entries.get(resolve_payload)
+            if entry is None or not self.__valid(entry):
+                self.__load()
+                entry = self.__entries.get(resolve_payload)
+            if entry is None or not self.__valid(entry):
+                self.__count(hit=False)
+                return None
+            self.__count(hit=True)
+            return dict(entry["info"])
+
+    def put(self, resolve_payload: str, info: dict):
+        """Store the ``symbol_resolved`` payload of a symbol; unchanged entries are not rewritten."""
+        info = {k: info[k] for k in SYMBOL_INFO_FIELDS if k in info}
+        with self.__mutex:
+            entry = self.__entries.get(resolve_payload)
+            if entry is not None and entry["info"] == info and self.__valid(entry):
+                return
+            entry = {"info": info, "stored_at": time.time()}
+            self.__entries[resolve_payload] = self.__pending[resolve_payload] = entry
+            due = (
+                self.flush_interval is not None
+                and time.monotonic() - self.__flushed_at >= self.flush_interval
+            )
+        if due:
+            self.flush()
+
+    def flush(self):
+        """Write the entries stored since the last flush to the file."""
+        with self.__mutex:
+            self.__flushed_at = time.monotonic()
+            if not self.__pending:
+                return
+            try:
+                with self.lock:
+                    entries = self.__read()
+                    entries.update(self.__pending)
+                    entries = {k: e for k, e in entries.items() if self.__valid(e)}
+                    self.__dump(entries)
+                    self.__stamp = self.__file_stamp()
+            except OSError as e:
+                logger.error(f"Error writing symbol cache {self.path}: {e}")
+                return
+            self.__pending.clear()
+            self.__entries.update(entries)
+
+    def clear(self):
+        with self.__mutex, self.lock:
+            self.__dump({})
+            self.__entries.clear()
+            self.__pending.clear()
+            self.__stamp = self.__file_stamp()
+
+    def __load(self):
+        # a stat instead of parsing the whole file on every miss
+        stamp = self.__file_stamp()
+        if stamp == self.__stamp:
+            return
+        self.__stamp = stamp
+        self.__entries.update(self.__read())
+        self.__entries.update(self.__pending)
+
+    def __file_stamp(self):
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+    def __valid(self, entry):
+        return self.max_age is None or time.time() - entry["stored_at"] <= self.max_age
+
+    def __count(self, hit):
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+        get_metrics().increment(
+            "tv_cache_requests_total", cache="symbols", result="hit" if hit else "miss"
+        )
+
+    def __read(self):
+        try:
+            with open(self.path, "r") as f:
+                entries = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable symbol cache {self.path}: {e}")
+            return {}
+        if not isinstance(entries, dict):
+            return {}
+        return {
+            key: entry
+            for key, entry in entries.items()
+            if isinstance(entry, dict) and {"info", "stored_at"} <= entry.keys()
+        }
+
+    def __dump(self, entries):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(entries, f, separators=(",", ":"))
+        os.replace(tmp, self.path)
+
+
+_default_symbol_cache = None
+_default_lock = threading.Lock()
+
+
+def default_symbol_cache() -> SymbolCache:
+    """The process-wide cache used by clients created without ``symbol_cache``."""
+    global _default_symbol_cache
+    with _default_lock:
+        if _default_symbol_cache is None:
+            _default_symbol_cache = SymbolCache()
+            atexit.register(_default_symbol_cache.flush)
+        return _default_symbol_cache
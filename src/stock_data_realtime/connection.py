@@ -0,0 +1,789 @@
+import itertools
+import json
+import logging
+import queue
+import threading
+import time
+
+from . import web
+from .limits import ConnectionLimits
+from .metrics import get_metrics
+from .protocol import FrameDecoder, create_message, is_heartbeat, prepend_header
+from .streaming import StreamEvent, bar_values
+
+logger = logging.getLogger(__name__)
+
+
+def create_connection(url, **kwargs):
+    """``websocket.create_connection``; websocket-client is imported on first use."""
+    from websocket import create_connection
+
+    return create_connection(url, **kwargs)
+
+QUOTE_FIELDS = [
+    "ch",
+    "chp",
+    "current_session",
+    "description",
+    "local_description",
+    "language",
+    "exchange",
+    "fractional",
+    "is_tradable",
+    "lp",
+    "lp_time",
+    "minmov",
+    "minmove2",
+    "original_name",
+    "pricescale",
+    "pro_name",
+    "short_name",
+    "type",
+    "update_mode",
+    "volume",
+    "currency_code",
+    "rchp",
+    "rtc",
+]
+# Symbols per quote_add_symbols/quote_remove_symbols message
+QUOTE_BATCH_SIZE = 100
+# Error texts TradingView sends when it rejects the auth token
+AUTH_ERRORS = ("unauthorized", "invalid_token", "auth_token", "token expired")
+
+
+class AuthError(ConnectionError):
+    """A request failed because the server rejected the auth token."""
+
+
+def is_auth_error(params) -> bool:
+    text = json.dumps(params).lower()
+    return any(marker in text for marker in AUTH_ERRORS)
+
+
+class SeriesRequest:
+    """State of one chart series multiplexed over a TvConnection."""
+
+    def __init__(
+        self,
+        series_id,
+        symbol_id,
+        symbol,
+        resolve_payload,
+        interval,
+        n_bars,
+        callback=None,
+        listener=None,
+    ):
+        self.series_id = series_id
+        self.symbol_id = symbol_id
+        self.symbol = symbol
+        self.resolve_payload = resolve_payload
+        self.interval = interval
+        self.n_bars = n_bars
+        self.callback = callback
+        self.listener = listener
+        self.frames = []
+        # For paged requests, the frames of each completed page; None once finished
+        self.pages = None
+        self.error = None
+        self.completed = threading.Event()
+        self.created = self.last_activity = time.monotonic()
+        self.first_update = None
+        # symbol_resolved payload: pricescale, session, timezone, type, ...
+        self.symbol_info = None
+
+
+class QuoteSnapshot:
+    """
+    First complete quote of many symbols, collected on a quote session.
+
+    It is registered as a quote handler for ``symbols``. A symbol is
+    complete once the server sends ``quote_completed`` for it, or an error
+    ``qsd``. ``done`` (a ``threading.Event`` or ``asyncio.Event``) is set
+    when no symbol is pending any more.
+    """
+
+    def __init__(self, symbols, done):
+        self.symbols = list(symbols)
+        self.pending = set(self.symbols)
+        self.quotes = {}
+        self.errors = {}
+        self.done = done
+        if not self.pending:
+            done.set()
+
+    def __call__(self, event):
+        self.quotes[event.symbol] = event.data
+
+    def complete(self, symbol, error=None):
+        if symbol not in self.pending:
+            return
+        self.pending.discard(symbol)
+        if error is not None:
+            self.errors[symbol] = error
+        if not self.pending:
+            self.done.set()
+
+
+class SeriesRouter:
+    """
+    Transport-independent bookkeeping for multiplexed chart series.
+
+    Subclasses own the socket; this class builds the session and series
+    messages, decodes incoming frames (echoing ``~h~`` heartbeats through
+    ``_send_raw``) and routes them to the ``SeriesRequest`` that owns them,
+    calling ``_finish`` when a series completes or fails. Series with a
+    ``listener`` stay open after ``series_completed`` and receive every bar
+    update as a ``StreamEvent``; quote updates go to per-symbol handlers.
+
+    Symbols stay resolved on the chart session after their series is
+    removed, so a later request for the same ``resolve_symbol`` payload
+    reuses the symbol id and skips ``resolve_symbol``.
+    """
+
+    def __init__(self, token, session, chart_session):
+        self.token = token
+        self.session = session
+        self.chart_session = chart_session
+        self._ids = itertools.count(1)
+        self._series = {}
+        self._symbols = {}
+        # resolve_symbol payload -> (symbol id, symbol_resolved payload) on this session
+        self._resolved = {}
+        self._quote_handlers = {}
+        self._decoder = FrameDecoder()
+        self.quotes = {}
+        self.heartbeats = 0
+        self.__handlers = {}
+        self.__routes = {
+            "timescale_update": [self.__on_series_update],
+            "du": [self.__on_series_update],
+            "series_completed": [self.__on_series_completed],
+            "symbol_resolved": [self.__on_symbol_resolved],
+            "qsd": [self.__on_quote],
+            "quote_completed": [self.__on_quote_completed],
+            "series_error": [self.__on_series_error],
+            "symbol_error": [self.__on_symbol_error],
+            "critical_error": [self.__on_critical_error],
+            "protocol_error": [self.__on_critical_error],
+        }
+
+    def _new_request(
+        self, symbol, resolve_payload, interval, n_bars, callback=None, listener=None
+    ):
+        n = next(self._ids)
+        symbol_id, info = self._resolved.get(resolve_payload, (f"symbol_{n}", None))
+        request = SeriesRequest(
+            f"s{n}",
+            symbol_id,
+            symbol,
+            resolve_payload,
+            interval,
+            n_bars,
+            callback,
+            listener,
+        )
+        request.symbol_info = info
+        self._series[request.series_id] = request
+        if info is None:
+            self._symbols[request.symbol_id] = request
+        return request
+
+    def _take(self, request):
+        """Unregister a request, returning False if it already finished."""
+        if self._series.get(request.series_id) is not request:
+            return False
+        del self._series[request.series_id]
+        if self._symbols.get(request.symbol_id) is request:
+            del self._symbols[request.symbol_id]
+        if request.pages is not None:
+            request.pages.put(None)
+        metrics = get_metrics()
+        metrics.observe("tv_series_seconds", time.monotonic() - request.created)
+        metrics.observe("tv_series_frames", len(request.frames))
+        return True
+
+    def _add_quote_handler(self, symbols, handler):
+        """Register a quote handler, returning the symbols new to the session."""
+        added = []
+        for symbol in symbols:
+            handlers = self._quote_handlers.setdefault(symbol, [])
+            if not handlers:
+                added.append(symbol)
+            handlers.append(handler)
+        return added
+
+    def _remove_quote_handler(self, symbols, handler):
+        """Unregister a quote handler, returning the symbols nobody listens to."""
+        removed = []
+        for symbol in symbols:
+            handlers = self._quote_handlers.get(symbol, [])
+            if handler in handlers:
+                handlers.remove(handler)
+            if not handlers and self._quote_handlers.pop(symbol, None) is not None:
+                self.quotes.pop(symbol, None)
+                removed.append(symbol)
+        return removed
+
+    def _add_snapshot(self, snapshot):
+        """Register a QuoteSnapshot, returning the symbols new to the session."""
+        added = self._add_quote_handler(snapshot.symbols, snapshot)
+        new = set(added)
+        for symbol in snapshot.symbols:
+            # already streaming: the session holds its complete quote
+            if symbol not in new and symbol in self.quotes:
+                snapshot(StreamEvent("quote", symbol, None, dict(self.quotes[symbol])))
+                snapshot.complete(symbol)
+        return added
+
+    def _session_messages(self):
+        # a new session has no symbols resolved yet
+        self._resolved.clear()
+        messages = [
+            ("set_auth_token", [self.token]),
+            ("chart_create_session", [self.chart_session, ""]),
+            ("quote_create_session", [self.session]),
+            ("quote_set_fields", [self.session, *QUOTE_FIELDS]),
+            ("switch_timezone", [self.chart_session, "exchange"]),
+        ]
+        if self._quote_handlers:
+            messages += self._quote_add_messages(list(self._quote_handlers))
+        return messages
+
+    def _quote_add_messages(self, symbols):
+        return [
+            ("quote_add_symbols", [self.session, *symbols, {"flags": ["force_permission"]}]),
+            ("quote_fast_symbols", [self.session, *self._quote_handlers]),
+        ]
+
+    def _quote_snapshot_messages(self, symbols, batch_size=QUOTE_BATCH_SIZE):
+        flags = {"flags": ["force_permission"]}
+        return [
+            ("quote_add_symbols", [self.session, *symbols[i:i + batch_size], flags])
+            for i in range(0, len(symbols), batch_size)
+        ]
+
+    def _quote_remove_messages(self, symbols, batch_size=QUOTE_BATCH_SIZE):
+        return [
+            ("quote_remove_symbols", [self.session, *symbols[i:i + batch_size]])
+            for i in range(0, len(symbols), batch_size)
+        ]
+
+    def _subscribe_messages(self, request):
+        messages = []
+        if request.resolve_payload not in self._resolved:
+            self._symbols.setdefault(request.symbol_id, request)
+            messages.append((
+                "resolve_symbol",
+                [self.chart_session, request.symbol_id, request.resolve_payload],
+            ))
+        return messages + [
+            (
+                "create_series",
+                [
+                    self.chart_session,
+                    request.series_id,
+                    request.series_id,
+                    request.symbol_id,
+                    request.interval,
+                    request.n_bars,
+                ],
+            ),
+        ]
+
+    def _more_messages(self, request, n_bars):
+        return [("request_more_data", [self.chart_session, request.series_id, n_bars])]
+
+    def _release_messages(self, request):
+        return [
+            ("remove_series", [self.chart_session, request.series_id]),
+        ]
+
+    def _finish(self, request, error=None):
+        raise NotImplementedError
+
+    def _send_raw(self, text):
+        raise NotImplementedError
+
+    def on(self, method: str, handler):
+        """
+        Register ``handler(params, frame)`` for a server message type.
+
+        Handlers run on the reader after the built-in routing, e.g.
+        ``connection.on("symbol_resolved", handler)``.
+        """
+        self.__handlers.setdefault(method, []).append(handler)
+        return handler
+
+    def off(self, method: str, handler):
+        handlers = self.__handlers.get(method, [])
+        if handler in handlers:
+            handlers.remove(handler)
+
+    def _dispatch(self, message):
+        metrics = get_metrics()
+        metrics.increment("tv_received_bytes_total", len(message))
+        for frame in self._decoder.feed(message):
+            metrics.increment("tv_frames_total")
+            if is_heartbeat(frame):
+                self.heartbeats += 1
+                self._send_raw(prepend_header(frame))
+                continue
+            try:
+                msg = json.loads(frame)
+            except ValueError:
+                logger.debug(f"Ignoring undecodable frame: {frame[:80]}")
+                continue
+            if not isinstance(msg, dict) or "m" not in msg:
+                continue
+            method, params = msg["m"], msg.get("p", [])
+            for handler in self.__routes.get(method, ()):
+                try:
+                    handler(method, params, frame)
+                except Exception as e:
+                    logger.error(f"Error routing {method} frame {frame[:80]}: {e}")
+            for handler in list(self.__handlers.get(method, ())):
+                try:
+                    handler(params, frame)
+                except Exception as e:
+                    logger.error(f"Error in {method} handler: {e}")
+
+    def __on_series_update(self, method, params, frame):
+        updates = params[1] if len(params) > 1 else {}
+        for series_id in updates:
+            request = self._series.get(series_id)
+            if request is None:
+                continue
+            request.last_activity = time.monotonic()
+            if request.first_update is None:
+                request.first_update = request.last_activity
+                get_metrics().observe(
+                    "tv_series_first_update_seconds", request.first_update - request.created
+                )
+            if request.listener is not None:
+                for bar in updates[series_id].get("s", []):
+                    values = bar_values(bar["v"])
+                    request.listener(
+                        StreamEvent("bar", request.symbol, request.interval, values)
+                    )
+                continue
+            if len(updates) > 1:
+                frame = json.dumps(
+                    {"m": method, "p": [params[0], {series_id: updates[series_id]}]},
+                    separators=(",", ":"),
+                )
+            request.frames.append(frame)
+
+    def __on_series_completed(self, method, params, frame):
+        request = self._series.get(params[1]) if len(params) > 1 else None
+        if request is not None and request.pages is not None:
+            frames, request.frames = request.frames, []
+            request.pages.put(frames)
+        elif request is not None and request.listener is None:
+            self._finish(request)
+        elif request is not None:
+            request.completed.set()
+
+    def __on_symbol_resolved(self, method, params, frame):
+        request = self._symbols.get(params[1]) if len(params) > 2 else None
+        if request is None:
+            return
+        info = params[2]
+        self._resolved[request.resolve_payload] = (request.symbol_id, info)
+        for pending in self._series.values():
+            if pending.symbol_id == request.symbol_id:
+                pending.symbol_info = info
+
+    def __on_quote(self, method, params, frame):
+        quote = params[1] if len(params) > 1 else {}
+        symbol = quote.get("n")
+        handlers = self._quote_handlers.get(symbol)
+        if not handlers:
+            return
+        if quote.get("s") != "ok":
+            error = quote.get("errmsg") or quote.get("s")
+            for handler in list(handlers):
+                if isinstance(handler, QuoteSnapshot):
+                    handler.complete(symbol, error)
+            return
+        fields = self.quotes.setdefault(symbol, {})
+        fields.update(quote.get("v", {}))
+        event = StreamEvent("quote", symbol, None, dict(fields))
+        for handler in list(handlers):
+            handler(event)
+
+    def __on_quote_completed(self, method, params, frame):
+        symbol = params[1] if len(params) > 1 else None
+        for handler in list(self._quote_handlers.get(symbol, [])):
+            if isinstance(handler, QuoteSnapshot):
+                handler.complete(symbol)
+
+    def __on_series_error(self, method, params, frame):
+        request = self._series.get(params[1]) if len(params) > 1 else None
+        if request is not None:
+            logger.error(f"Series error for {request.symbol}: {params[2:]}")
+            error = AuthError if is_auth_error(params[2:]) else ValueError
+            self._finish(request, error(f"Series error: {params[2:]}"))
+
+    def __on_symbol_error(self, method, params, frame):
+        request = self._symbols.get(params[1]) if len(params) > 1 else None
+        if request is not None:
+            logger.error(f"Symbol error for {request.symbol}: {params[2:]}")
+            error = AuthError if is_auth_error(params[2:]) else ValueError
+            self._finish(request, error(f"Symbol error: {params[2:]}"))
+
+    def __on_critical_error(self, method, params, frame):
+        logger.error(f"TradingView {method}: {params}")
+        error = AuthError if is_auth_error(params) else ConnectionError
+        for request in list(self._series.values()):
+            self._finish(request, error(f"{method}: {params}"))
+
+
+class TvConnection(SeriesRouter):
+    """
+    Long-lived TradingView websocket shared by many series requests.
+
+    The connection authenticates and creates its chart/quote sessions once,
+    then multiplexes ``resolve_symbol``/``create_series`` requests under
+    unique series ids. A background reader routes every frame to the request
+    that owns it and, if the socket drops, reconnects and re-subscribes all
+    pending series.
+
+    ``transport`` replaces ``websocket.create_connection`` for opening the
+    socket (see ``wire_log.ReplayTransport``), and a ``WireRecorder`` passed
+    as ``recorder`` logs all traffic of every socket opened.
+    """
+
+    __ws_headers = json.dumps({"Origin": web.WS_ORIGIN})
+
+    def __init__(
+        self,
+        token: str,
+        session: str,
+        chart_session: str,
+        timeout: float = None,
+        limits: ConnectionLimits = None,
+        url: str = None,
+        transport=None,
+        recorder=None,
+    ) -> None:
+        super().__init__(token, session, chart_session)
+        self.url = url or web.WS_URL
+        self.transport = transport
+        self.recorder = recorder
+        self.limits = limits or ConnectionLimits()
+        self.timeout = self.limits.timeout if timeout is None else timeout
+        self.ws_debug = False
+        self.ws = None
+        self.reconnects = 0
+        self.__lock = threading.RLock()
+
+    @property
+    def connected(self) -> bool:
+        return self.ws is not None
+
+    def connect(self):
+        with self.__lock:
+            if self.ws is not None:
+                return
+            self.__open()
+            threading.Thread(
+                target=self.__read_loop,
+                args=(self.ws,),
+                name=f"tv-reader-{self.chart_session}",
+                daemon=True,
+            ).start()
+
+    def close(self):
+        with self.__lock:
+            ws, self.ws = self.ws, None
+            pending = list(self._series.values())
+        if ws is not None:
+            try:
+                ws.close()
+            except Exception as e:
+                logger.debug(f"Error while closing WebSocket: {e}")
+        for request in pending:
+            self._finish(request, ConnectionError("Connection closed"))
+
+    def set_token(self, token: str):
+        """Use ``token`` from now on, re-authenticating an open socket right away."""
+        with self.__lock:
+            self.token = token
+            if self.ws is not None:
+                try:
+                    self.send("set_auth_token", [token])
+                except Exception as e:
+                    logger.debug(f"Could not send the new token: {e}")
+
+    def send(self, func, args):
+        m = create_message(func, args)
+        if self.ws_debug:
+            print(m)
+        ws = self.ws
+        if ws is None:
+            raise ConnectionError("WebSocket connection is not open")
+        ws.send(m)
+
+    def request_series(
+        self,
+        symbol: str,
+        resolve_payload: str,
+        interval: str,
+        n_bars: int,
+        callback=None,
+        listener=None,
+        paged: bool = False,
+    ) -> SeriesRequest:
+        """
+        Subscribe a new chart series without waiting for it.
+
+        Args:
+            symbol (str): Formatted symbol, e.g. ``NASDAQ:AAPL``
+            resolve_payload (str): ``resolve_symbol`` argument for the symbol
+            interval (str): Interval value, e.g. ``1D``
+            n_bars (int): Number of bars to request
+            callback (callable, optional): Called with the request once it completes or fails
+            listener (callable, optional): Keep the series open and call this with
+                a ``StreamEvent`` for every bar update until it is cancelled
+            paged (bool): Keep the series open after ``series_completed`` so
+                older pages can be fetched with ``request_more``; read them
+                with ``next_page``
+
+        Returns:
+            SeriesRequest: Handle to pass to ``wait`` or ``cancel``
+        """
+        self.connect()
+        with self.__lock:
+            request = self._new_request(
+                symbol, resolve_payload, interval, n_bars, callback, listener
+            )
+            if paged:
+                request.pages = queue.Queue()
+        try:
+            self.__subscribe(request)
+        except Exception as e:
+            # The reader notices the broken socket and re-subscribes pending series
+            logger.warning(f"Failed to send series request for {symbol}: {e}")
+        return request
+
+    def wait(self, request: SeriesRequest, timeout: float = None) -> SeriesRequest:
+        """
+        Block until a series completes or stays idle for ``timeout`` seconds.
+
+        Args:
+            request (SeriesRequest): Request returned by ``request_series``
+            timeout (float, optional): Idle timeout, defaults to the socket timeout
+
+        Returns:
+            SeriesRequest: The same request, with its frames or error filled in
+        """
+        timeout = self.timeout if timeout is None else timeout
+        while not request.completed.wait(timeout):
+            if time.monotonic() - request.last_activity >= timeout:
+                logger.error(
+                    f"Timed out waiting for {request.symbol} ({request.series_id})"
+                )
+                self.cancel(request, TimeoutError("Timed out waiting for series"))
+        return request
+
+    def request_more(self, request: SeriesRequest, n_bars: int):
+        """Ask for ``n_bars`` more bars before the oldest one of a paged series."""
+        try:
+            for func, args in self._more_messages(request, n_bars):
+                self.send(func, args)
+        except Exception as e:
+            logger.error(f"Failed to request more data for {request.symbol}: {e}")
+            self.cancel(request, ConnectionError(f"Failed to request more data: {e}"))
+
+    def next_page(self, request: SeriesRequest, timeout: float = None):
+        """
+        Block until the next page of a paged series arrives.
+
+        Args:
+            request (SeriesRequest): Request created with ``paged=True``
+            timeout (float, optional): Idle timeout, defaults to the socket timeout
+
+        Returns:
+            list: Frame payloads of the page, or None once the series is
+            finished (check ``request.error``)
+        """
+        timeout = self.timeout if timeout is None else timeout
+        while True:
+            try:
+                return request.pages.get(timeout=timeout)
+            except queue.Empty:
+                if time.monotonic() - request.last_activity >= timeout:
+                    logger.error(
+                        f"Timed out waiting for {request.symbol} ({request.series_id})"
+                    )
+                    self.cancel(request, TimeoutError("Timed out waiting for series"))
+
+    def cancel(self, request: SeriesRequest, error: Exception = None):
+        """Stop a pending series and release it on the server."""
+        self._finish(request, error)
+
+    def subscribe_quotes(self, symbols, handler):
+        """Call ``handler`` with a ``StreamEvent`` for every quote update of ``symbols``."""
+        self.connect()
+        with self.__lock:
+            added = self._add_quote_handler(symbols, handler)
+            if added:
+                for func, args in self._quote_add_messages(added):
+                    self.send(func, args)
+
+    def snapshot_quotes(self, symbols, timeout: float = None, batch_size: int = QUOTE_BATCH_SIZE):
+        """
+        Collect the current quote of many symbols in one round trip.
+
+        All symbols are added to the quote session in ``quote_add_symbols``
+        batches of ``batch_size``, then removed again once every symbol is
+        complete or ``timeout`` expires. Symbols that are already streaming
+        are answered from the session without a request.
+
+        Returns:
+            QuoteSnapshot: ``quotes`` per symbol, ``errors`` of invalid symbols
+            and the symbols still ``pending`` when the timeout expired
+        """
+        snapshot = QuoteSnapshot(symbols, threading.Event())
+        self.connect()
+        try:
+            with self.__lock:
+                added = self._add_snapshot(snapshot)
+                for func, args in self._quote_snapshot_messages(added, batch_size):
+                    self.send(func, args)
+            snapshot.done.wait(self.timeout if timeout is None else timeout)
+        finally:
+            self.unsubscribe_quotes(snapshot.symbols, snapshot)
+        return snapshot
+
+    def unsubscribe_quotes(self, symbols, handler):
+        with self.__lock:
+            removed = self._remove_quote_handler(symbols, handler)
+            if removed and self.ws is not None:
+                for func, args in self._quote_remove_messages(removed):
+                    self.send(func, args)
+
+    def __create_connection(self):
+        breaker = self.limits.breaker
+        attempts = self.limits.connect_attempts
+        for attempt in range(attempts):
+            if not breaker.allow():
+                raise ConnectionError(
+                    f"Too many failed connections, retry in {breaker.retry_after():.0f}s"
+                )
+            try:
+                logger.debug(f"Creating websocket connection (attempt {attempt + 1})")
+                ws = (self.transport or create_connection)(
+                    self.url,
+                    headers=self.__ws_headers,
+                    timeout=self.timeout,
+                )
+                logger.debug("WebSocket connection established successfully")
+                breaker.record_success()
+                if self.recorder is not None:
+                    ws = self.recorder.wrap(ws)
+                return ws
+            except Exception as e:
+                logger.error(f"Failed to establish WebSocket connection: {e}")
+                get_metrics().increment("tv_connect_failures_total")
+                breaker.record_failure()
+                if attempt < attempts - 1:
+                    time.sleep(self.limits.backoff.delay(attempt))
+        raise ConnectionError(
+            f"Failed to establish WebSocket connection after {attempts} attempts"
+        )
+
+    def __open(self):
+        metrics = get_metrics()
+        with metrics.timer("tv_connect_seconds"):
+            self.ws = self.__create_connection()
+        self._decoder.reset()
+        with metrics.timer("tv_session_setup_seconds"):
+            for func, args in self._session_messages():
+                self.send(func, args)
+
+    def __reconnect(self, old_ws):
+        with self.__lock:
+            if self.ws is not old_ws:
+                return None
+            try:
+                old_ws.close()
+            except Exception:
+                pass
+            try:
+                self.__open()
+            except ConnectionError as e:
+                self.ws = None
+                for request in list(self._series.values()):
+                    self._finish(request, e)
+                return None
+            self.reconnects += 1
+            get_metrics().increment("tv_reconnects_total")
+            for request in list(self._series.values()):
+                if request.pages is not None:
+                    # a re-created series would start over from the newest bars
+                    self._finish(request, ConnectionError("Connection lost while paging"))
+                    continue
+                request.frames.clear()
+                request.last_activity = time.monotonic()
+                self.__subscribe(request)
+            logger.info(
+                f"Reconnected and re-subscribed {len(self._series)} pending series"
+            )
+            return self.ws
+
+    def __subscribe(self, request):
+        if self.limits.rate_limiter is not None:
+            self.limits.rate_limiter.acquire()
+        for func, args in self._subscribe_messages(request):
+            self.send(func, args)
+
+    def __release(self, request):
+        try:
+            for func, args in self._release_messages(request):
+                self.send(func, args)
+        except Exception as e:
+            logger.debug(f"Could not release {request.series_id}: {e}")
+
+    def _send_raw(self, text):
+        ws = self.ws
+        if ws is None:
+            return
+        try:
+            ws.send(text)
+        except Exception as e:
+            logger.debug(f"Could not send {text!r}: {e}")
+
+    def _finish(self, request, error=None):
+        with self.__lock:
+            if not self._take(request):
+                return
+        request.error = error
+        request.completed.set()
+        if self.ws is not None:
+            self.__release(request)
+        if request.callback is not None:
+            request.callback(request)
+
+    def __read_loop(self, ws):
+        from websocket import WebSocketTimeoutException
+
+        while self.ws is ws:
+            try:
+                message = ws.recv()
+            except WebSocketTimeoutException:
+                continue
+            except Exception as e:
+                if self.ws is not ws:
+                    break
+                logger.warning(f"WebSocket connection lost: {e}")
+                ws = self.__reconnect(ws)
+                if ws is None:
+                    break
+                continue
+            try:
+                self._dispatch(message)
+            except Exception as e:
+                # a malformed frame must not stop the reader of a shared socket
+                logger.error(f"Error while routing message: {e}")
@@ -0,0 +1,177 @@
+import json
+import logging
+import re
+import time
+
+import numpy as np
+
+from .bars import localize
+from .metrics import get_metrics
+from .protocol import split_frames
+
+logger = logging.getLogger(__name__)
+
+_series_fragment = re.compile(r'"s":\[(.+?)\}\]')
+_bucket_seconds = 900
+
+
+def iter_frames(raw_data):
+    """Yield JSON frame payloads from raw websocket text or a list of frames."""
+    if not isinstance(raw_data, str):
+        yield from raw_data
+    elif raw_data.startswith("~m~"):
+        yield from split_frames(raw_data)
+    else:
+        yield from raw_data.splitlines()
+
+
+def decode_bars(raw_data):
+    """
+    Decode every ``timescale_update``/``du`` bar into one float64 array.
+
+    Args:
+        raw_data (str | list): Raw websocket text, or the frame payloads of a series
+
+    Returns:
+        np.ndarray: (n, 6) array of time, open, high, low, close, volume.
+        Missing volume is 0. Bars repeated across frames keep their last
+        value. Returns None when there are no bars.
+    """
+    metrics = get_metrics()
+    with metrics.timer("tv_decode_seconds"):
+        values = _decode_bars(raw_data)
+    metrics.observe("tv_decoded_bars", 0 if values is None else len(values))
+    return values
+
+
+def _decode_bars(raw_data):
+    bars = []
+    pages = 0
+    for frame in iter_frames(raw_data):
+        if '"s":[' not in frame:
+            continue
+        try:
+            msg = json.loads(frame)
+            if msg["m"] not in ("timescale_update", "du"):
+                continue
+            series = msg["p"][1].values()
+        except (ValueError, KeyError, IndexError, TypeError, AttributeError):
+            continue
+        for update in series:
+            rows = update.get("s") if isinstance(update, dict) else None
+            if rows:
+                bars.extend(bar["v"] for bar in rows)
+                pages += 1
+
+    if not bars and isinstance(raw_data, str):
+        # Bare '"s":[...]' fragment without the surrounding message
+        match = _series_fragment.search(raw_data)
+        if match:
+            try:
+                bars = [bar["v"] for bar in json.loads("[" + match.group(1) + "}]")]
+            except (ValueError, KeyError, TypeError):
+                bars = []
+    if not bars:
+        return None
+
+    try:
+        values = np.array(bars, dtype=np.float64)
+    except ValueError:
+        values = None
+    if values is None or values.ndim != 2 or values.shape[1] < 6:
+        logger.debug("No volume data")
+        values = np.array(
+            [(list(bar) + [0.0] * 6)[:6] for bar in bars], dtype=np.float64
+        )
+    values = values[:, :6]
+    values[:, 5] = np.nan_to_num(values[:, 5])
+
+    if pages > 1:
+        # keep the last update of every bar, ordered by time
+        reversed_times = values[::-1, 0]
+        _, last = np.unique(reversed_times, return_index=True)
+        values = values[len(values) - 1 - last]
+    return values
+
+
+def local_seconds(timestamps):
+    """
+    Shift epoch seconds to host-local wall-clock seconds.
+
+    Offsets are looked up once per 15-minute bucket, which covers every
+    real-world DST transition, so the cost scales with the time span rather
+    than the number of bars.
+    """
+    buckets, inverse = np.unique(
+        np.floor_divide(timestamps, _bucket_seconds).astype(np.int64),
+        return_inverse=True,
+    )
+    offsets = np.array(
+        [time.localtime(b * _bucket_seconds).tm_gmtoff for b in buckets.tolist()],
+        dtype=np.float64,
+    )
+    return timestamps + offsets[inverse]
+
+
+def bars_to_df(values, symbol):
+    """
+    Build the ``get_hist`` DataFrame from an (n, 6) bar array.
+
+    The index holds host-local dates and the Time column host-local times.
+    """
+    import pandas as pd
+
+    local = local_seconds(values[:, 0])
+    stamps = pd.to_datetime(local, unit="s")
+    dates = pd.to_datetime(local - np.mod(local, 86400), unit="s")
+
+    data = pd.DataFrame(
+        {
+            "Time": stamps.time,
+            "Open": values[:, 1],
+            "High": values[:, 2],
+            "Low": values[:, 3],
+            "Close": values[:, 4],
+            "Volume": values[:, 5],
+        },
+        index=pd.DatetimeIndex(dates, name="Date"),
+    )
+    data.insert(0, "symbol", value=symbol)
+    return data
+
+
+def bars_to_tz_df(values, symbol, timezone="UTC"):
+    """
+    Build a DataFrame indexed by a tz-aware ``DatetimeIndex`` in ``timezone``
+    from an (n, 6) bar array, with the same columns as ``bars_to_df``
+    minus ``Time``.
+    """
+    import pandas as pd
+
+    data = pd.DataFrame(
+        {
+            "Open": values[:, 1],
+            "High": values[:, 2],
+            "Low": values[:, 3],
+            "Close": values[:, 4],
+            "Volume": values[:, 5],
+        },
+        index=localize(values[:, 0], timezone),
+    )
+    data.insert(0, "symbol", value=symbol)
+    return data
+
+
+def merge_bars(old, new):
+    """Union of two bar arrays ordered by time; bars in ``new`` win."""
+    values = np.concatenate([new, old])
+    _, first = np.unique(values[:, 0], return_index=True)
+    return values[first]
+
+
+def create_df(raw_data, symbol):
+    values = decode_bars(raw_data)
+    if values is None:
+        logger.error("No data, please check the exchange and symbol")
+        return None
+    return bars_to_df(values, symbol)
@@ -0,0 +1,393 @@
+import collections
+import copy
+import logging
+import threading
+
+import numpy as np
+
+from .resample import wall_seconds
+
+logger = logging.getLogger(__name__)
+
+# Column of each price field in (n, 6) time/open/high/low/close/volume bars
+_columns = {"open": 1, "high": 2, "low": 3, "close": 4, "volume": 5}
+_hour = 3600
+_day = 86400
+
+
+def _column(field):
+    if field not in _columns:
+        raise ValueError(f"Unknown field {field!r}, expected one of {list(_columns)}")
+    return _columns[field]
+
+
+def seeded_ewm(x, alpha, period):
+    """
+    Exponential moving average seeded with the simple average of the first
+    ``period`` values, as TradingView's ``ta.ema``/``ta.rma`` do. The first
+    ``period - 1`` outputs are NaN.
+    """
+    import pandas as pd
+
+    out = np.full(len(x), np.nan)
+    if len(x) < period:
+        return out
+    seeded = x[period - 1:].astype(np.float64)
+    seeded[0] = x[:period].mean()
+    out[period - 1:] = pd.Series(seeded).ewm(alpha=alpha, adjust=False).mean().to_numpy()
+    return out
+
+
+def true_range(values):
+    """True range of (n, 6) bars; the first bar has no previous close and uses high - low."""
+    high, low, close = values[:, 2], values[:, 3], values[:, 4]
+    previous = np.empty_like(close)
+    previous[0] = np.nan
+    previous[1:] = close[:-1]
+    return np.fmax(high - low, np.fmax(np.abs(high - previous), np.abs(low - previous)))
+
+
+class Indicator:
+    """
+    Rolling indicator over one bar series.
+
+    ``warm_up`` computes the whole history in one vectorized pass and keeps
+    the state after the last closed bar. ``update`` then costs O(1) per
+    bar: a bar with a new time closes the previous one, a bar with the
+    same time as the last one replaces it (streamed bars are re-sent
+    until they close), and older bars are ignored.
+
+    Subclasses implement ``_warm_up(values)``, which returns one output per
+    bar and leaves the state committed through ``values[:-1]``,
+    ``_value(bar)``, the output for a bar given the committed state, and
+    ``_commit(bar)``, which folds a closed bar into the state.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.value = np.nan
+        self._time = None
+        self._bar = None
+        self._reset()
+
+    def warm_up(self, values) -> np.ndarray:
+        """
+        Compute the indicator over (n, 6) time-ordered bars and start from there.
+
+        Returns:
+            np.ndarray: One output per bar, NaN until enough bars were seen
+        """
+        values = np.asarray(values, dtype=np.float64).reshape(-1, 6)
+        self.reset()
+        if len(values) == 0:
+            return np.empty(0)
+        out = self._warm_up(values)
+        self._bar = values[-1].copy()
+        self._time = self._bar[0]
+        self.value = float(out[-1])
+        return out
+
+    def update(self, bar) -> float:
+        """Fold one (time, open, high, low, close, volume) bar and return the latest output."""
+        bar = np.asarray(bar, dtype=np.float64)
+        if self._time is not None:
+            if bar[0] < self._time:
+                logger.debug(f"Ignoring bar at {bar[0]} older than {self._time}")
+                return self.value
+            if bar[0] > self._time:
+                self._commit(self._bar)
+        self._bar = bar
+        self._time = bar[0]
+        self.value = float(self._value(bar))
+        return self.value
+
+    def _reset(self):
+        raise NotImplementedError
+
+    def _warm_up(self, values):
+        raise NotImplementedError
+
+    def _value(self, bar):
+        raise NotImplementedError
+
+    def _commit(self, bar):
+        raise NotImplementedError
+
+
+class SMA(Indicator):
+    """Simple moving average of ``field`` over ``period`` bars."""
+
+    def __init__(self, period: int, field: str = "close"):
+        self.period = period
+        self.column = _column(field)
+        super().__init__()
+
+    def _reset(self):
+        self.__window = collections.deque(maxlen=self.period - 1)
+        self.__sum = 0.0
+        self.__commits = 0
+
+    def _warm_up(self, values):
+        x = values[:, self.column]
+        out = np.full(len(x), np.nan)
+        if len(x) >= self.period:
+            sums = np.cumsum(np.concatenate([[0.0], x]))
+            out[self.period - 1:] = (sums[self.period:] - sums[:-self.period]) / self.period
+        tail = x[:-1][-(self.period - 1):] if self.period > 1 else x[:0]
+        self.__window.extend(tail)
+        self.__sum = float(tail.sum())
+        return out
+
+    def _value(self, bar):
+        if len(self.__window) < self.period - 1:
+            return np.nan
+        return (self.__sum + bar[self.column]) / self.period
+
+    def _commit(self, bar):
+        if self.period == 1:
+            return
+        x = bar[self.column]
+        if len(self.__window) == self.__window.maxlen:
+            self.__sum -= self.__window[0]
+        self.__window.append(x)
+        self.__sum += x
+        self.__commits += 1
+        if self.__commits % self.period == 0:
+            # drop the rounding error accumulated by the running sum
+            self.__sum = float(sum(self.__window))
+
+
+class EMA(Indicator):
+    """Exponential moving average of ``field``, seeded with the SMA of the first ``period`` bars."""
+
+    def __init__(self, period: int, field: str = "close"):
+        self.period = period
+        self.column = _column(field)
+        self.alpha = 2 / (period + 1)
+        super().__init__()
+
+    def _reset(self):
+        self.__count = 0
+        self.__seed = 0.0
+        self.__ema = np.nan
+
+    def _warm_up(self, values):
+        x = values[:, self.column]
+        out = seeded_ewm(x, self.alpha, self.period)
+        self.__count = len(x) - 1
+        self.__seed = float(x[:min(self.__count, self.period)].sum())
+        self.__ema = out[-2] if len(x) > 1 else np.nan
+        return out
+
+    def _value(self, bar):
+        return _step(bar[self.column], self.__count, self.__seed, self.__ema, self.alpha, self.period)
+
+    def _commit(self, bar):
+        value = self._value(bar)
+        if self.__count < self.period:
+            self.__seed += bar[self.column]
+        self.__count += 1
+        self.__ema = value
+
+
+class ATR(Indicator):
+    """Average true range over ``period`` bars, smoothed with Wilder's moving average."""
+
+    def __init__(self, period: int = 14):
+        self.period = period
+        self.alpha = 1 / period
+        super().__init__()
+
+    def _reset(self):
+        self.__count = 0
+        self.__seed = 0.0
+        self.__atr = np.nan
+        self.__close = np.nan
+
+    def _warm_up(self, values):
+        tr = true_range(values)
+        out = seeded_ewm(tr, self.alpha, self.period)
+        self.__count = len(tr) - 1
+        self.__seed = float(tr[:min(self.__count, self.period)].sum())
+        self.__atr = out[-2] if len(tr) > 1 else np.nan
+        self.__close = values[-2, 4] if len(tr) > 1 else np.nan
+        return out
+
+    def _value(self, bar):
+        return _step(self.__true_range(bar), self.__count, self.__seed, self.__atr, self.alpha, self.period)
+
+    def _commit(self, bar):
+        value = self._value(bar)
+        if self.__count < self.period:
+            self.__seed += self.__true_range(bar)
+        self.__count += 1
+        self.__atr = value
+        self.__close = bar[4]
+
+    def __true_range(self, bar):
+        high, low = bar[2], bar[3]
+        if np.isnan(self.__close):
+            return high - low
+        return max(high - low, abs(high - self.__close), abs(low - self.__close))
+
+
+def _step(x, count, seed, previous, alpha, period):
+    """Seeded EWM output for the bar after ``count`` committed bars."""
+    if count + 1 < period:
+        return np.nan
+    if count + 1 == period:
+        return (seed + x) / period
+    return (1 - alpha) * previous + alpha * x
+
+
+class VWAP(Indicator):
+    """
+    Volume-weighted average of the typical price (high + low + close) / 3,
+    restarting every session.
+
+    A session is the wall-clock day starting at ``session_start`` in the
+    exchange ``timezone``, so it stays put across DST changes.
+    """
+
+    def __init__(self, timezone: str = "UTC", session_start: str = "00:00"):
+        self.timezone = timezone
+        self.session_start = session_start
+        hours, minutes = (int(x) for x in session_start.split(":"))
+        self.origin = hours * 3600 + minutes * 60
+        super().__init__()
+
+    def _reset(self):
+        self.__session = None
+        self.__end = None
+        self.__pv = 0.0
+        self.__volume = 0.0
+
+    def _warm_up(self, values):
+        sessions = self.__sessions(values[:, 0])
+        typical = values[:, 2:5].mean(axis=1)
+        volume = values[:, 5]
+        pv = typical * volume
+        new = np.diff(sessions, prepend=sessions[0] - 1) != 0
+        first = np.flatnonzero(new)
+        group = np.cumsum(new) - 1
+        cum_pv = np.cumsum(pv)
+        cum_volume = np.cumsum(volume)
+        cum_pv -= (cum_pv - pv)[first][group]
+        cum_volume -= (cum_volume - volume)[first][group]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            out = np.where(cum_volume > 0, cum_pv / cum_volume, np.nan)
+
+        if len(values) > 1:
+            self.__enter(values[-2, 0])
+            same = sessions[:-1] == self.__session
+            self.__pv = float(pv[:-1][same].sum())
+            self.__volume = float(volume[:-1][same].sum())
+        return out
+
+    def _value(self, bar):
+        pv, volume = (self.__pv, self.__volume) if self.__in_session(bar[0]) else (0.0, 0.0)
+        pv += (bar[2] + bar[3] + bar[4]) / 3 * bar[5]
+        volume += bar[5]
+        return pv / volume if volume > 0 else np.nan
+
+    def _commit(self, bar):
+        if not self.__in_session(bar[0]):
+            self.__enter(bar[0])
+            self.__pv = self.__volume = 0.0
+        self.__pv += (bar[2] + bar[3] + bar[4]) / 3 * bar[5]
+        self.__volume += bar[5]
+
+    def __sessions(self, times):
+        """Session number (wall-clock days since the epoch) of each time."""
+        return (wall_seconds(np.asarray(times, dtype=np.int64), self.timezone) - self.origin) // _day
+
+    def __enter(self, timestamp):
+        wall = wall_seconds(np.array([timestamp], dtype=np.int64), self.timezone)[0] - self.origin
+        self.__session = wall // _day
+        # earliest epoch time the next session can start, allowing for a DST shift
+        self.__end = timestamp + (self.__session + 1) * _day - wall - _hour
+
+    def __in_session(self, timestamp):
+        if self.__session is None:
+            return False
+        if timestamp < self.__end:
+            return True
+        return self.__sessions([timestamp])[0] == self.__session
+
+
+class IndicatorEngine:
+    """
+    A set of named indicators kept up to date per (symbol, interval).
+
+    The indicators passed in are templates: every series gets its own
+    copies, warmed up once from history and then updated bar by bar, e.g.
+    from a live subscription (pass ``on_event`` as its callback).
+
+    Args:
+        indicators (dict): Output name to ``Indicator``, e.g. ``{"sma20": SMA(20)}``
+    """
+
+    def __init__(self, indicators: dict):
+        self.indicators = indicators
+        self.__series = {}
+        self.__lock = threading.Lock()
+
+    @property
+    def keys(self):
+        return sorted(self.__series)
+
+    def warm_up(self, bars, symbol: str = None, interval: str = None) -> dict:
+        """
+        Start a series from its history.
+
+        Args:
+            bars (Bars | np.ndarray): ``get_hist(..., output="bars")`` result
+                or (n, 6) bars, oldest first
+            symbol (str, optional): Series symbol, taken from ``Bars`` when omitted
+            interval (str, optional): Interval value, taken from ``Bars`` when omitted
+
+        Returns:
+            dict: Output name to an array with one value per bar
+        """
+        values = bars
+        if hasattr(bars, "to_numpy") and hasattr(bars, "symbol"):
+            symbol = bars.symbol if symbol is None else symbol
+            interval = bars.interval if interval is None else interval
+            values = bars.to_numpy()
+        indicators = copy.deepcopy(self.indicators)
+        out = {name: indicator.warm_up(values) for name, indicator in indicators.items()}
+        with self.__lock:
+            self.__series[(symbol, interval)] = indicators
+        return out
+
+    def update(self, symbol: str, interval: str, bars) -> dict:
+        """
+        Fold one bar, or (n, 6) bars, into a series; unknown series start empty.
+
+        Returns:
+            dict: Output name to the value for the newest bar
+        """
+        bars = np.atleast_2d(np.asarray(bars, dtype=np.float64))
+        with self.__lock:
+            indicators = self.__series.get((symbol, interval))
+            if indicators is None:
+                indicators = self.__series[(symbol, interval)] = copy.deepcopy(self.indicators)
+            for bar in bars:
+                for indicator in indicators.values():
+                    indicator.update(bar)
+            return {name: indicator.value for name, indicator in indicators.items()}
+
+    def on_event(self, event):
+        """Fold a bar ``StreamEvent``; other events are ignored."""
+        if event.kind == "bar":
+            self.update(event.symbol, event.interval, event.data)
+
+    def values(self, symbol: str, interval: str) -> dict:
+        """Latest value of every indicator of a series, None for unknown series."""
+        with self.__lock:
+            indicators = self.__series.get((symbol, interval))
+            if indicators is None:
+                return None
+            return {name: indicator.value for name, indicator in indicators.items()}
@@ -0,0 +1,144 @@
+import logging
+import random
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """
+    Token-bucket rate limiter.
+
+    Tokens refill at ``rate`` per second up to ``burst``. ``reserve`` takes
+    a token and returns how long the caller must wait for it, so the same
+    bucket can pace threads (``acquire``) and coroutines
+    (``await asyncio.sleep(bucket.reserve())``).
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = burst
+        self.__tokens = float(burst)
+        self.__updated = time.monotonic()
+        self.__lock = threading.Lock()
+
+    def reserve(self) -> float:
+        with self.__lock:
+            now = time.monotonic()
+            self.__tokens = min(self.burst, self.__tokens + (now - self.__updated) * self.rate)
+            self.__updated = now
+            self.__tokens -= 1
+            if self.__tokens >= 0:
+                return 0.0
+            return -self.__tokens / self.rate
+
+    def acquire(self):
+        delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+
+class Backoff:
+    """Exponential backoff with jitter: ``base * factor**attempt``, capped at ``max_delay``."""
+
+    def __init__(self, base: float = 0.5, factor: float = 2, max_delay: float = 30, jitter: float = 0.5):
+        self.base = base
+        self.factor = factor
+        self.max_delay = max_delay
+        self.jitter = jitter
+
+    def delay(self, attempt: int) -> float:
+        delay = min(self.max_delay, self.base * self.factor**attempt)
+        return delay * (1 - self.jitter * random.random())
+
+
+class CircuitBreaker:
+    """
+    Stops connection attempts after repeated failures.
+
+    After ``failure_threshold`` consecutive failures the circuit opens and
+    ``allow`` returns False for ``reset_timeout`` seconds. Then one trial
+    attempt is let through: success closes the circuit, failure opens it again.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.__opened = None
+        self.__lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.__opened is None:
+            return "closed"
+        if time.monotonic() - self.__opened >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def allow(self) -> bool:
+        with self.__lock:
+            state = self.state
+            if state == "half-open":
+                # let one trial through; it reopens the circuit if it fails
+                self.__opened = time.monotonic()
+            return state != "open"
+
+    def record_success(self):
+        with self.__lock:
+            self.failures = 0
+            self.__opened = None
+
+    def record_failure(self):
+        with self.__lock:
+            self.failures += 1
+            if self.failures >= self.failure_threshold:
+                if self.__opened is None:
+                    logger.warning(
+                        f"Circuit opened after {self.failures} failures, "
+                        f"pausing connections for {self.reset_timeout}s"
+                    )
+                self.__opened = time.monotonic()
+
+    def retry_after(self) -> float:
+        if self.__opened is None:
+            return 0.0
+        return max(0.0, self.reset_timeout - (time.monotonic() - self.__opened))
+
+
+class ConnectionLimits:
+    """
+    Limits shared by every websocket connection of a client.
+
+    Args:
+        max_connections (int): Websocket connections opened at most
+        max_series_per_connection (int): Series in flight per connection
+        create_series_rate (float): ``create_series`` messages per second, None for no limit
+        create_series_burst (int): Messages that may be sent at once before the rate applies
+        timeout (float): Socket and idle series timeout in seconds
+        connect_attempts (int): Attempts per connect before giving up
+        backoff (Backoff, optional): Delay between connect attempts
+        breaker (CircuitBreaker, optional): Circuit breaker for connects
+    """
+
+    def __init__(
+        self,
+        max_connections: int = 4,
+        max_series_per_connection: int = 10,
+        create_series_rate: float = 10,
+        create_series_burst: int = 20,
+        timeout: float = 5,
+        connect_attempts: int = 3,
+        backoff: Backoff = None,
+        breaker: CircuitBreaker = None,
+    ):
+        self.max_connections = max_connections
+        self.max_series_per_connection = max_series_per_connection
+        self.timeout = timeout
+        self.connect_attempts = connect_attempts
+        self.rate_limiter = (
+            TokenBucket(create_series_rate, create_series_burst) if create_series_rate else None
+        )
+        self.backoff = backoff or Backoff()
+        self.breaker = breaker or CircuitBreaker()
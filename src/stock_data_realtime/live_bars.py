@@ -0,0 +1,179 @@
+import logging
+import threading
+import time
+
+import numpy as np
+
+from .resample import bucket_starts
+
+logger = logging.getLogger(__name__)
+
+_hour = 3600
+_day = 86400
+# Shortest wall-clock length of calendar buckets, allowing for a DST change
+_min_length = {"1D": _day - _hour, "1W": 7 * _day - _hour, "1M": 28 * _day - _hour}
+
+
+class RingBuffer:
+    """
+    Fixed-capacity buffer of (time, open, high, low, close, volume) rows.
+
+    Appending overwrites the oldest row once full, so memory stays constant
+    however long it runs. The newest row can be updated in place.
+    """
+
+    def __init__(self, capacity: int, width: int = 6):
+        self.capacity = capacity
+        self.__rows = np.full((capacity, width), np.nan)
+        self.__next = 0
+        self.__size = 0
+
+    def __len__(self):
+        return self.__size
+
+    def append(self, row):
+        self.__rows[self.__next] = row
+        self.__next = (self.__next + 1) % self.capacity
+        self.__size = min(self.__size + 1, self.capacity)
+
+    @property
+    def latest(self):
+        """View of the newest row, or None if empty."""
+        if not self.__size:
+            return None
+        return self.__rows[self.__next - 1]
+
+    def last(self, n: int = None):
+        """Copy of the newest ``n`` rows (all if None), oldest first."""
+        n = self.__size if n is None else min(n, self.__size)
+        start = self.__next - n
+        if start >= 0:
+            return self.__rows[start:self.__next].copy()
+        return np.concatenate([self.__rows[start:], self.__rows[:self.__next]])
+
+
+class BarBuilder:
+    """
+    Builds OHLCV bars per symbol from streamed quote ticks.
+
+    Pass ``update`` as a subscription callback, or call ``add_tick``
+    directly. Each tick's ``lp`` updates the bar its ``lp_time`` falls in;
+    bar volume is the increase of the session's cumulative ``volume``
+    field. The last ``capacity`` bars of each symbol, including the one
+    still forming, are kept in a ``RingBuffer``.
+
+    Args:
+        interval (Interval | int): Bar interval, or bar length in seconds
+        capacity (int): Bars kept per symbol
+        timezone (str): Exchange timezone buckets are aligned in
+        session_start (str): ``HH:MM`` the trading session starts at
+        callback (callable, optional): Called with ``(symbol, bar)`` when a bar closes
+    """
+
+    def __init__(
+        self, interval, capacity: int = 1000, timezone="UTC", session_start="00:00", callback=None
+    ):
+        self.interval = interval
+        self.capacity = capacity
+        self.timezone = timezone
+        self.session_start = session_start
+        self.callback = callback
+        if isinstance(interval, int):
+            self.__min_length = interval
+        else:
+            self.__min_length = _min_length.get(interval.value, interval.seconds)
+        self.__bars = {}
+        self.__state = {}
+        self.__lock = threading.Lock()
+
+    @property
+    def symbols(self):
+        return sorted(self.__bars)
+
+    def update(self, event):
+        """Fold a quote ``StreamEvent``; other events are ignored."""
+        if event.kind != "quote" or event.data.get("lp") is None:
+            return
+        fields = event.data
+        self.add_tick(
+            event.symbol, fields["lp"], fields.get("lp_time") or time.time(), fields.get("volume")
+        )
+
+    def add_tick(self, symbol: str, price: float, timestamp: float, volume: float = None):
+        """
+        Fold one trade into the current bar of ``symbol``.
+
+        Args:
+            symbol (str): Symbol the tick belongs to
+            price (float): Trade price
+            timestamp (float): Trade time in epoch seconds
+            volume (float, optional): Cumulative session volume
+        """
+        closed = None
+        with self.__lock:
+            bars = self.__bars.get(symbol)
+            if bars is None:
+                bars = self.__bars[symbol] = RingBuffer(self.capacity)
+                # bucket start, shortest bucket end and last cumulative volume
+                self.__state[symbol] = [None, None, volume]
+            state = self.__state[symbol]
+            traded = 0.0
+            if volume is not None and state[2] is not None:
+                traded = volume - state[2] if volume >= state[2] else volume
+            if volume is not None:
+                state[2] = volume
+
+            bar = bars.latest
+            if state[0] is None or not state[0] <= timestamp < state[1]:
+                start = self.__bucket_start(timestamp)
+                if state[0] is not None and start < state[0]:
+                    logger.debug(f"Ignoring late tick for {symbol} at {timestamp}")
+                    return
+                if start == state[0]:
+                    # a calendar bucket running past its shortest length
+                    state[1] = timestamp + 1
+                else:
+                    bar = None
+            if bar is not None:
+                bar[2] = max(bar[2], price)
+                bar[3] = min(bar[3], price)
+                bar[4] = price
+                bar[5] += traded
+                return
+            if bars.latest is not None:
+                closed = bars.latest.copy()
+            state[0], state[1] = start, start + self.__min_length
+            bars.append((start, price, price, price, price, traded))
+        if closed is not None and self.callback is not None:
+            try:
+                self.callback(symbol, closed)
+            except Exception as e:
+                logger.error(f"Error in bar callback: {e}")
+
+    def last(self, symbol: str, n: int = None):
+        """
+        Newest ``n`` bars of ``symbol`` as an (n, 6) array, oldest first.
+
+        The last row is the bar still forming. Returns an empty array for
+        unknown symbols.
+        """
+        with self.__lock:
+            bars = self.__bars.get(symbol)
+            if bars is None:
+                return np.empty((0, 6))
+            return bars.last(n)
+
+    def current(self, symbol: str):
+        """Copy of the bar still forming for ``symbol``, or None."""
+        with self.__lock:
+            bars = self.__bars.get(symbol)
+            if bars is None or bars.latest is None:
+                return None
+            return bars.latest.copy()
+
+    def __bucket_start(self, timestamp):
+        if isinstance(self.interval, int):
+            return timestamp - timestamp % self.interval
+        return float(
+            bucket_starts([timestamp], self.interval, self.timezone, self.session_start)[0]
+        )
@@ -0,0 +1,173 @@
+import bisect
+import contextlib
+import json
+import threading
+import time
+
+DEFAULT_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30,
+)
+SIZE_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 5000, 10000, 50000, 100000)
+# Histograms of counts rather than seconds
+SIZE_HISTOGRAMS = {"tv_series_frames": SIZE_BUCKETS, "tv_decoded_bars": SIZE_BUCKETS}
+
+
+class Metrics:
+    """
+    Metrics interface; this base class records nothing.
+
+    Subclass it (or use ``MetricsCollector``) and install it with
+    ``set_metrics`` to receive counters and histogram observations from
+    the client. Label values are passed as keyword arguments.
+    """
+
+    def increment(self, name: str, value: float = 1, **labels):
+        """Add ``value`` to a counter."""
+
+    def observe(self, name: str, value: float, **labels):
+        """Record one histogram sample, e.g. a latency in seconds."""
+
+    @contextlib.contextmanager
+    def timer(self, name: str, **labels):
+        """Observe the duration of the ``with`` block in seconds under ``name``."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+
+class NullMetrics(Metrics):
+    """The default: every call is a no-op, including ``timer``."""
+
+    def timer(self, name: str, **labels):
+        return contextlib.nullcontext()
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class MetricsCollector(Metrics):
+    """
+    Thread-safe in-process metrics store.
+
+    Counters and histograms are kept per (name, labels) and can be exported
+    with ``to_prometheus`` for a scrape endpoint or ``to_json`` for logs.
+
+    Args:
+        buckets (tuple): Default histogram upper bounds
+        histogram_buckets (dict): Upper bounds for specific histogram names
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS, histogram_buckets=None):
+        self.buckets = tuple(buckets)
+        self.histogram_buckets = dict(SIZE_HISTOGRAMS if histogram_buckets is None else histogram_buckets)
+        self.__counters = {}
+        self.__histograms = {}
+        self.__lock = threading.Lock()
+
+    def increment(self, name: str, value: float = 1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.__lock:
+            self.__counters[key] = self.__counters.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.__lock:
+            histogram = self.__histograms.get(key)
+            if histogram is None:
+                buckets = self.histogram_buckets.get(name, self.buckets)
+                histogram = self.__histograms[key] = Histogram(buckets)
+            histogram.observe(value)
+
+    def counter(self, name: str, **labels) -> float:
+        return self.__counters.get((name, tuple(sorted(labels.items()))), 0)
+
+    def histogram(self, name: str, **labels):
+        """Return ``(count, sum)`` of a histogram, zeros if never observed."""
+        histogram = self.__histograms.get((name, tuple(sorted(labels.items()))))
+        return (histogram.count, histogram.sum) if histogram else (0, 0.0)
+
+    def reset(self):
+        with self.__lock:
+            self.__counters.clear()
+            self.__histograms.clear()
+
+    def snapshot(self) -> dict:
+        """Plain-dict copy of every metric, as written by ``to_json``."""
+        with self.__lock:
+            counters = [
+                {"name": name, "labels": dict(labels), "value": value}
+                for (name, labels), value in sorted(self.__counters.items())
+            ]
+            histograms = [
+                {
+                    "name": name,
+                    "labels": dict(labels),
+                    "count": h.count,
+                    "sum": h.sum,
+                    "buckets": dict(zip([*map(str, h.buckets), "+Inf"], h.counts)),
+                }
+                for (name, labels), h in sorted(self.__histograms.items())
+            ]
+        return {"counters": counters, "histograms": histograms}
+
+    def to_json(self, **kwargs) -> str:
+        return json.dumps(self.snapshot(), **kwargs)
+
+    def to_prometheus(self) -> str:
+        """Render every metric in the Prometheus text exposition format."""
+        snapshot = self.snapshot()
+        lines = []
+        typed = set()
+        for counter in snapshot["counters"]:
+            if counter["name"] not in typed:
+                typed.add(counter["name"])
+                lines.append(f"# TYPE {counter['name']} counter")
+            lines.append(f"{counter['name']}{_labels(counter['labels'])} {counter['value']}")
+        for histogram in snapshot["histograms"]:
+            name, labels = histogram["name"], histogram["labels"]
+            if name not in typed:
+                typed.add(name)
+                lines.append(f"# TYPE {name} histogram")
+            cumulative = 0
+            for bound, count in histogram["buckets"].items():
+                cumulative += count
+                lines.append(f"{name}_bucket{_labels({**labels, 'le': bound})} {cumulative}")
+            lines.append(f"{name}_sum{_labels(labels)} {histogram['sum']}")
+            lines.append(f"{name}_count{_labels(labels)} {histogram['count']}")
+        return "\n".join(lines) + "\n"
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    pairs = []
+    for key, value in labels.items():
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        pairs.append(f'{key}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+_metrics = NullMetrics()
+
+
+def get_metrics() -> Metrics:
+    return _metrics
+
+
+def set_metrics(metrics: Metrics = None) -> Metrics:
+    """Install ``metrics`` for the whole package (None restores the no-op default)."""
+    global _metrics
+    _metrics = metrics if metrics is not None else NullMetrics()
+    return _metrics
@@ -0,0 +1,237 @@
+import logging
+import threading
+
+import numpy as np
+
+from .bars import FIELDS, Bars, localize
+
+logger = logging.getLogger(__name__)
+
+FILLS = ("ffill", "nan")
+
+
+class Panel:
+    """
+    OHLCV bars of many symbols aligned on one shared time axis.
+
+    ``time`` is the sorted union of every symbol's bar times as int64 epoch
+    seconds, and each field is a (time, symbol) float64 array, all views of
+    one (field, time, symbol) block. ``observed`` marks the cells that hold
+    a real bar. The other cells follow the ``fill`` policy:
+
+    - ``"ffill"``: a flat bar at the symbol's last close with zero volume,
+      for at most ``limit`` rows after the last real bar (no limit when
+      None). Cells before a symbol's first bar stay NaN.
+    - ``"nan"``: every field is NaN.
+
+    ``update`` and ``on_event`` keep the panel current as bars stream in:
+    new times are appended, re-sent bars overwrite their row in place, and
+    only the filled cells of the updated symbol are rewritten.
+
+    Args:
+        symbols (list): Column order of the panel
+        interval (str, optional): Interval value of the bars
+        fill (str): ``"ffill"`` or ``"nan"``
+        limit (int, optional): Rows a close is carried forward at most
+    """
+
+    def __init__(self, symbols, interval: str = None, fill: str = "ffill", limit: int = None, capacity: int = 0):
+        if fill not in FILLS:
+            raise ValueError(f"Unknown fill {fill!r}, expected one of {FILLS}")
+        self.symbols = list(symbols)
+        self.interval = interval
+        self.fill = fill
+        self.limit = limit
+        self.__columns = {symbol: i for i, symbol in enumerate(self.symbols)}
+        self.__n = 0
+        self.__time = np.empty(capacity, dtype=np.int64)
+        self.__block = np.full((len(FIELDS), capacity, len(self.symbols)), np.nan)
+        self.__observed = np.zeros((capacity, len(self.symbols)), dtype=bool)
+        # last row holding a real bar, per symbol
+        self.__last = np.full(len(self.symbols), -1)
+        self.__lock = threading.Lock()
+
+    @classmethod
+    def from_bars(cls, series, interval: str = None, fill: str = "ffill", limit: int = None):
+        """
+        Align the bars of many symbols in one vectorized merge.
+
+        Args:
+            series (dict | list): Symbol to ``Bars`` or (n, 6) array, or a
+                list of ``Bars``; None stands for a symbol without bars
+            interval (str, optional): Interval value, taken from ``Bars`` when omitted
+            fill (str): ``"ffill"`` or ``"nan"``
+            limit (int, optional): Rows a close is carried forward at most
+
+        Returns:
+            Panel: One column per symbol, in the order given
+        """
+        if not isinstance(series, dict):
+            series = {bars.symbol: bars for bars in series}
+        arrays = []
+        for bars in series.values():
+            if isinstance(bars, Bars):
+                interval = bars.interval if interval is None else interval
+                bars = bars.to_numpy()
+            arrays.append(np.empty((0, 6)) if bars is None else np.asarray(bars, dtype=np.float64).reshape(-1, 6))
+
+        values = np.concatenate(arrays) if arrays else np.empty((0, 6))
+        time, rows = np.unique(values[:, 0].astype(np.int64), return_inverse=True)
+        columns = np.repeat(np.arange(len(arrays)), [len(a) for a in arrays])
+
+        panel = cls(series, interval, fill, limit, capacity=len(time))
+        panel.__n = len(time)
+        panel.__time[:] = time
+        panel.__block[:, rows, columns] = values[:, 1:].T
+        panel.__observed[rows, columns] = True
+        panel.__refill()
+        return panel
+
+    def __len__(self):
+        return self.__n
+
+    def __repr__(self):
+        return f"Panel({len(self.symbols)} symbols, {self.interval!r}, {self.__n} bars)"
+
+    def __getitem__(self, field: str):
+        """(time, symbol) array of one field, e.g. ``panel["close"]``."""
+        return self.__block[FIELDS.index(field.lower()), :self.__n]
+
+    @property
+    def time(self):
+        return self.__time[:self.__n]
+
+    @property
+    def observed(self):
+        return self.__observed[:self.__n]
+
+    open = property(lambda self: self["open"])
+    high = property(lambda self: self["high"])
+    low = property(lambda self: self["low"])
+    close = property(lambda self: self["close"])
+    volume = property(lambda self: self["volume"])
+
+    def to_numpy(self):
+        """(field, time, symbol) view of the whole panel."""
+        return self.__block[:, :self.__n]
+
+    def to_pandas(self, field: str = "close", timezone: str = None):
+        """
+        One field as a DataFrame with a time index and one column per symbol.
+
+        Args:
+            field (str): ``open``, ``high``, ``low``, ``close`` or ``volume``
+            timezone (str, optional): Make the index tz-aware in this timezone
+        """
+        import pandas as pd
+
+        if timezone is None:
+            index = pd.DatetimeIndex(self.time.view("datetime64[s]"), name="Date")
+        else:
+            index = localize(self.time, timezone)
+        return pd.DataFrame(self[field], index=index, columns=self.symbols)
+
+    def update(self, symbol: str, bars):
+        """
+        Write new or re-sent bars of one symbol into the panel.
+
+        Args:
+            symbol (str): A symbol of the panel
+            bars (np.ndarray | list): (n, 6) bars or a single 6-value bar
+        """
+        column = self.__columns.get(symbol)
+        if column is None:
+            raise ValueError(f"{symbol} is not in the panel")
+        bars = np.atleast_2d(np.asarray(bars, dtype=np.float64))
+        with self.__lock:
+            for bar in bars[np.argsort(bars[:, 0], kind="stable")]:
+                row = self.__row(int(bar[0]))
+                self.__block[:, row, column] = bar[1:]
+                self.__observed[row, column] = True
+                self.__last[column] = max(self.__last[column], row)
+                self.__fill_after(row, column)
+
+    def on_event(self, event):
+        """Fold a bar ``StreamEvent`` of a panel symbol; other events are ignored."""
+        if event.kind != "bar" or event.symbol not in self.__columns:
+            return
+        if self.interval is not None and event.interval != self.interval:
+            return
+        self.update(event.symbol, event.data)
+
+    def __row(self, timestamp):
+        """Row of ``timestamp``, adding it to the time axis if needed."""
+        n = self.__n
+        row = int(np.searchsorted(self.__time[:n], timestamp))
+        if row < n and self.__time[row] == timestamp:
+            return row
+        if row < n:
+            logger.debug(f"Inserting bar at {timestamp} before the end of the panel")
+            self.__insert(row, timestamp)
+            return row
+
+        if n == len(self.__time):
+            self.__grow(max(2 * n, 64))
+        self.__time[n] = timestamp
+        self.__block[:, n] = np.nan
+        self.__observed[n] = False
+        if self.fill == "ffill":
+            columns = np.flatnonzero(self.__fillable(n, self.__last))
+            self.__block[:4, n, columns] = self.__block[3, self.__last[columns], columns]
+            self.__block[4, n, columns] = 0
+        self.__n += 1
+        return n
+
+    def __insert(self, row, timestamp):
+        n = self.__n
+        self.__time = np.insert(self.__time[:n], row, timestamp)
+        self.__block = np.insert(self.__block[:, :n], row, np.nan, axis=1)
+        self.__observed = np.insert(self.__observed[:n], row, False, axis=0)
+        self.__n += 1
+        self.__refill()
+
+    def __grow(self, capacity):
+        n = self.__n
+        time = np.empty(capacity, dtype=np.int64)
+        block = np.full((len(FIELDS), capacity, len(self.symbols)), np.nan)
+        observed = np.zeros((capacity, len(self.symbols)), dtype=bool)
+        time[:n] = self.__time[:n]
+        block[:, :n] = self.__block[:, :n]
+        observed[:n] = self.__observed[:n]
+        self.__time, self.__block, self.__observed = time, block, observed
+
+    def __fillable(self, rows, last):
+        """Whether cells ``rows`` rows down with real bars at ``last`` get filled."""
+        fillable = last >= 0
+        if self.limit is not None:
+            fillable &= rows - last <= self.limit
+        return fillable
+
+    def __refill(self):
+        """Recompute every unobserved cell from the observed ones."""
+        n = self.__n
+        observed = self.__observed[:n]
+        rows = np.arange(n)[:, None]
+        last = np.maximum.accumulate(np.where(observed, rows, -1), axis=0)
+        self.__last = last[-1] if n else np.full(len(self.symbols), -1)
+        block = self.__block[:, :n]
+        gaps = ~observed
+        if self.fill == "ffill":
+            gaps &= ~self.__fillable(rows, last)
+            filled_rows, filled_columns = np.nonzero(~observed & self.__fillable(rows, last))
+            close = block[3, last[filled_rows, filled_columns], filled_columns]
+            block[:4, filled_rows, filled_columns] = close
+            block[4, filled_rows, filled_columns] = 0
+        block[:, gaps] = np.nan
+
+    def __fill_after(self, row, column):
+        """Carry the close at ``row`` forward to the next real bar of ``column``."""
+        if self.fill != "ffill":
+            return
+        n = self.__n
+        later = np.flatnonzero(self.__observed[row + 1:n, column])
+        stop = row + 1 + later[0] if len(later) else n
+        if self.limit is not None:
+            stop = min(stop, row + 1 + self.limit)
+        self.__block[:4, row + 1:stop, column] = self.__block[3, row, column]
+        self.__block[4, row + 1:stop, column] = 0
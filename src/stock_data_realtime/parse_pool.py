@@ -0,0 +1,72 @@
+import concurrent.futures
+import multiprocessing
+import os
+import threading
+
+from .bars import Bars
+from .decode import decode_bars
+
+
+def decode_columns(frames, symbol: str, interval: str = None):
+    """
+    Decode the frames of one series into a ``Bars`` container.
+
+    Runs in parse pool workers: the result is two contiguous arrays, which
+    pickle as raw buffers instead of one Python object per bar.
+    Returns None when there are no bars.
+    """
+    values = decode_bars(frames)
+    if values is None:
+        return None
+    return Bars.from_values(values, symbol, interval)
+
+
+class ParsePool:
+    """
+    Worker pool that decodes series payloads away from the I/O loop.
+
+    With ``processes=True`` decoding runs in worker processes, so large
+    batches no longer hold the GIL while the reader threads drain the
+    sockets. Threads are cheaper to start and avoid copying the frames, but
+    only help while NumPy releases the GIL. Workers are started on first use.
+
+    Args:
+        max_workers (int, optional): Pool size, defaults to the CPU count
+        processes (bool): Use worker processes instead of threads
+    """
+
+    def __init__(self, max_workers: int = None, processes: bool = True):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.processes = processes
+        self.__executor = None
+        self.__lock = threading.Lock()
+
+    def submit(self, frames, symbol: str, interval: str = None) -> concurrent.futures.Future:
+        """Schedule ``decode_columns`` and return its future."""
+        return self.__get_executor().submit(decode_columns, list(frames), symbol, interval)
+
+    def close(self, wait: bool = True):
+        with self.__lock:
+            if self.__executor is not None:
+                self.__executor.shutdown(wait=wait)
+                self.__executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def __get_executor(self):
+        with self.__lock:
+            if self.__executor is None:
+                if self.processes:
+                    # spawn: forking while the websocket reader threads run is unsafe
+                    self.__executor = concurrent.futures.ProcessPoolExecutor(
+                        self.max_workers, mp_context=multiprocessing.get_context("spawn")
+                    )
+                else:
+                    self.__executor = concurrent.futures.ThreadPoolExecutor(
+                        self.max_workers, thread_name_prefix="tv-parse"
+                    )
+            return self.__executor
@@ -0,0 +1,130 @@
+import logging
+import threading
+import time
+
+from .connection import TvConnection
+from .limits import ConnectionLimits
+from .protocol import generate_session
+
+logger = logging.getLogger(__name__)
+
+
+class ConnectionPool:
+    """
+    Websocket connections of one TvDatafeed, opened on demand.
+
+    ``acquire`` hands out a connection with room for another series: an idle
+    one if possible, else a new one while fewer than ``max_connections``
+    are open, else the least loaded one below ``max_series_per_connection``.
+    When every connection is full it blocks until ``release`` frees a slot.
+    All connections share the limits' rate limiter, backoff and breaker.
+    """
+
+    def __init__(
+        self,
+        token: str,
+        limits: ConnectionLimits = None,
+        session=None,
+        chart_session=None,
+        url: str = None,
+        transport=None,
+        recorder=None,
+    ):
+        self.token = token
+        self.limits = limits or ConnectionLimits()
+        self.url = url
+        self.transport = transport
+        self.recorder = recorder
+        self.connections = []
+        self.__ws_debug = False
+        self.__load = {}
+        self.__condition = threading.Condition()
+        self.primary = self.__open(session, chart_session)
+
+    @property
+    def ws_debug(self) -> bool:
+        return self.__ws_debug
+
+    @ws_debug.setter
+    def ws_debug(self, value: bool) -> None:
+        self.__ws_debug = value
+        for connection in self.connections:
+            connection.ws_debug = value
+
+    def acquire(
+        self,
+        block: bool = True,
+        timeout: float = None,
+        max_connections: int = None,
+        max_series: int = None,
+    ):
+        """
+        Reserve a series slot on a connection.
+
+        Args:
+            block (bool): Wait for a free slot instead of returning None
+            timeout (float, optional): Seconds to wait at most
+            max_connections (int, optional): Lower connection cap for this caller
+            max_series (int, optional): Lower per-connection series cap for this caller
+
+        Returns:
+            TvConnection: Connection to send the series on; pass it to
+            ``release`` once the series is done. None if ``block`` is False
+            or ``timeout`` expires without a free slot.
+        """
+        max_connections = min(max_connections or self.limits.max_connections, self.limits.max_connections)
+        max_series = min(max_series or self.limits.max_series_per_connection, self.limits.max_series_per_connection)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.__condition:
+            while True:
+                connection = self.__choose(max_connections, max_series)
+                if connection is not None:
+                    self.__load[connection] += 1
+                    return connection
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if not block or (remaining is not None and remaining <= 0):
+                    return None
+                self.__condition.wait(remaining)
+
+    def release(self, connection):
+        with self.__condition:
+            self.__load[connection] -= 1
+            self.__condition.notify()
+
+    def set_token(self, token: str):
+        """Use ``token`` for new connections and re-authenticate open ones."""
+        self.token = token
+        for connection in self.connections:
+            connection.set_token(token)
+
+    def load(self, connection) -> int:
+        return self.__load.get(connection, 0)
+
+    def close(self):
+        for connection in self.connections:
+            connection.close()
+
+    def __choose(self, max_connections, max_series):
+        usable = self.connections[:max_connections]
+        for connection in usable:
+            if self.__load[connection] == 0:
+                return connection
+        if len(usable) < max_connections:
+            return self.__open()
+        connection = min(usable, key=self.__load.get)
+        return connection if self.__load[connection] < max_series else None
+
+    def __open(self, session=None, chart_session=None):
+        connection = TvConnection(
+            self.token,
+            session or generate_session("qs_"),
+            chart_session or generate_session("cs_"),
+            limits=self.limits,
+            url=self.url,
+            transport=self.transport,
+            recorder=self.recorder,
+        )
+        connection.ws_debug = self.__ws_debug
+        self.connections.append(connection)
+        self.__load[connection] = 0
+        return connection
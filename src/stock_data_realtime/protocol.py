@@ -0,0 +1,148 @@
+import functools
+import json
+import logging
+import random
+import re
+import string
+
+logger = logging.getLogger(__name__)
+
+_frame_header = re.compile(r"~m~(\d+)~m~")
+_partial_header = re.compile(r"~(m(~(\d+(~(m)?)?)?)?)?")
+
+
+def prepend_header(st):
+    return "~m~" + str(len(st)) + "~m~" + st
+
+
+def construct_message(func, param_list):
+    return json.dumps({"m": func, "p": param_list}, separators=(",", ":"))
+
+
+def create_message(func, param_list):
+    return prepend_header(construct_message(func, param_list))
+
+
+def generate_session(prefix):
+    stringLength = 12
+    letters = string.ascii_lowercase
+    random_string = "".join(random.choice(letters) for i in range(stringLength))
+    return prefix + random_string
+
+
+def split_frames(text):
+    """
+    Split a websocket message into its ``~m~<len>~m~<payload>`` frames.
+
+    Args:
+        text (str): Raw websocket message, possibly holding several frames
+
+    Returns:
+        list: Frame payloads in the order they were received
+    """
+    frames = []
+    pos = 0
+    while True:
+        match = _frame_header.match(text, pos)
+        if not match:
+            break
+        start = match.end()
+        end = start + int(match.group(1))
+        frames.append(text[start:end])
+        pos = end
+    return frames
+
+
+def format_symbol(symbol, exchange, contract: int = None):
+    if ":" in symbol:
+        return symbol
+    elif contract is None:
+        return f"{exchange}:{symbol}"
+    elif isinstance(contract, int):
+        return f"{exchange}:{symbol}{contract}!"
+    else:
+        raise ValueError("Not a valid contract")
+
+
+@functools.lru_cache(maxsize=4096)
+def prepare_symbol(symbol, exchange, fut_contract=None, extended_session=False):
+    """
+    Format a symbol and build its ``resolve_symbol`` payload.
+
+    A trailing ``!A`` on continuous contracts requests back-adjusted prices.
+    Results are memoized, so repeated requests for a symbol reuse them.
+
+    Returns:
+        tuple: (formatted symbol, resolve_symbol payload)
+    """
+    backadjustment: bool = False
+    if symbol.endswith("!A"):
+        backadjustment = True
+        symbol = symbol.replace("!A", "!")
+
+    symbol = format_symbol(symbol=symbol, exchange=exchange, contract=fut_contract)
+
+    resolve_payload = (
+        '={"symbol":"'
+        + symbol
+        + '","adjustment":"splits"'
+        + ("" if not backadjustment else ',"backadjustment":"default"')
+        + ',"session":'
+        + ('"regular"' if not extended_session else '"extended"')
+        + "}"
+    )
+    return symbol, resolve_payload
+
+
+class FrameDecoder:
+    """
+    Incremental decoder for the ``~m~<len>~m~<payload>`` framing.
+
+    Websocket messages are fed as they arrive and complete frame payloads
+    are returned; a frame split across messages is held until the rest
+    arrives. The pending buffer is capped at ``max_buffer`` characters so a
+    corrupt length prefix cannot grow it without bound.
+    """
+
+    def __init__(self, max_buffer: int = 16 * 1024 * 1024):
+        self.max_buffer = max_buffer
+        self.__pending = ""
+
+    @property
+    def pending(self) -> int:
+        return len(self.__pending)
+
+    def reset(self):
+        self.__pending = ""
+
+    def feed(self, text: str) -> list:
+        if self.__pending:
+            text = self.__pending + text
+            self.__pending = ""
+        frames = []
+        pos = 0
+        size = len(text)
+        while pos < size:
+            match = _frame_header.match(text, pos)
+            if match is None:
+                if _partial_header.fullmatch(text, pos):
+                    self.__pending = text[pos:]
+                else:
+                    logger.error(f"Dropping unframed data: {text[pos:pos + 80]!r}")
+                break
+            end = match.end() + int(match.group(1))
+            if end > size:
+                self.__pending = text[pos:]
+                break
+            frames.append(text[match.end():end])
+            pos = end
+        if len(self.__pending) > self.max_buffer:
+            logger.error(
+                f"Frame larger than {self.max_buffer} characters, dropping it"
+            )
+            self.__pending = ""
+        return frames
+
+
+def is_heartbeat(frame: str) -> bool:
+    return frame.startswith("~h~")
@@ -0,0 +1,180 @@
+import logging
+
+import numpy as np
+
+from .bars import Bars
+from .decode import merge_bars
+
+logger = logging.getLogger(__name__)
+
+_day = 86400
+# 1970-01-01 was a Thursday; weekly buckets start on Monday
+_monday = 4 * _day
+
+
+def wall_seconds(times, timezone="UTC"):
+    """Epoch seconds shifted to wall-clock seconds in ``timezone``."""
+    if timezone in (None, "UTC"):
+        return times
+    import pandas as pd
+
+    local = (
+        pd.to_datetime(times, unit="s", utc=True)
+        .tz_convert(timezone)
+        .tz_localize(None)
+        .to_numpy()
+        .astype("datetime64[s]")
+        .astype(np.int64)
+    )
+    return local
+
+
+def bucket_starts(times, interval, timezone="UTC", session_start="00:00"):
+    """
+    Start time (epoch seconds) of the ``interval`` bucket each bar falls in.
+
+    Buckets are aligned in ``timezone`` wall-clock time: intraday buckets
+    count from ``session_start`` (so 1H bars of a 09:30 session start at
+    09:30, 10:30, ...), daily buckets begin at ``session_start``, weekly ones
+    on Monday and monthly ones on the first of the month.
+    """
+    times = np.asarray(times, dtype=np.int64)
+    hours, minutes = (int(x) for x in session_start.split(":"))
+    origin = hours * 3600 + minutes * 60
+    local = wall_seconds(times, timezone) - origin
+
+    if interval.value == "1M":
+        months = local.astype("datetime64[s]").astype("datetime64[M]")
+        offset = local - months.astype("datetime64[s]").astype(np.int64)
+    elif interval.value == "1W":
+        offset = np.mod(local - _monday, 7 * _day)
+    else:
+        offset = np.mod(local, interval.seconds)
+    # subtracting per bar keeps each bucket correct across DST changes
+    return times - offset
+
+
+def aggregate(values, starts):
+    """
+    Fold time-ordered (n, 6) bars into one bar per distinct bucket start.
+
+    Open is the first bar's open, high/low the extremes, close the last
+    close and volume the sum; each output bar is stamped with its bucket start.
+    """
+    first = np.flatnonzero(np.diff(starts, prepend=starts[0] - 1))
+    last = np.append(first[1:], len(values)) - 1
+    out = np.empty((len(first), 6), dtype=np.float64)
+    out[:, 0] = starts[first]
+    out[:, 1] = values[first, 1]
+    out[:, 2] = np.maximum.reduceat(values[:, 2], first)
+    out[:, 3] = np.minimum.reduceat(values[:, 3], first)
+    out[:, 4] = values[last, 4]
+    out[:, 5] = np.add.reduceat(values[:, 5], first)
+    return out
+
+
+def check_coarser(interval, base_interval):
+    if base_interval is None:
+        return
+    if interval.seconds <= base_interval.seconds or (
+        interval.seconds < _day and interval.seconds % base_interval.seconds
+    ):
+        raise ValueError(
+            f"Cannot resample {base_interval.value} bars to {interval.value}"
+        )
+
+
+def resample(data, interval, timezone="UTC", session_start="00:00", base_interval=None):
+    """
+    Aggregate bars into a coarser interval.
+
+    Args:
+        data (Bars | np.ndarray): Bars from ``get_hist(..., output="bars")``
+            or an (n, 6) time/open/high/low/close/volume array
+        interval (Interval): Target interval
+        timezone (str): Exchange timezone buckets are aligned in
+        session_start (str): ``HH:MM`` the trading session starts at
+        base_interval (Interval, optional): Interval of ``data``, checked to
+            be finer than ``interval``; taken from ``Bars`` when omitted
+
+    Returns:
+        Bars | np.ndarray: Same type as ``data``; the last bar may be incomplete
+    """
+    if isinstance(data, Bars):
+        if base_interval is None and data.interval is not None:
+            base_interval = type(interval)(data.interval)
+        check_coarser(interval, base_interval)
+        values = resample(data.to_numpy(), interval, timezone, session_start)
+        return Bars.from_values(values, data.symbol, interval.value)
+
+    check_coarser(interval, base_interval)
+    values = np.asarray(data, dtype=np.float64)
+    if len(values) == 0:
+        return values.reshape(0, 6)
+    return aggregate(values, bucket_starts(values[:, 0], interval, timezone, session_start))
+
+
+class Resampler:
+    """
+    Incrementally maintained coarser-interval bars.
+
+    Feed base bars with ``update`` as they arrive, e.g. the history from
+    ``get_hist`` followed by live ``StreamEvent`` bar updates. Only the
+    base bars of the current (still open) bucket are kept and re-aggregated;
+    closed buckets are never recomputed. A base bar may be sent again with
+    new values while its bucket is open, as streaming ``du`` updates do.
+
+    Args:
+        interval (Interval): Target interval
+        timezone (str): Exchange timezone buckets are aligned in
+        session_start (str): ``HH:MM`` the trading session starts at
+        base_interval (Interval, optional): Interval of the input bars
+    """
+
+    def __init__(self, interval, timezone="UTC", session_start="00:00", base_interval=None):
+        check_coarser(interval, base_interval)
+        self.interval = interval
+        self.timezone = timezone
+        self.session_start = session_start
+        self.__closed = []
+        self.__values = None
+        self.__open = np.empty((0, 6))
+        self.__current = np.empty((0, 6))
+
+    def update(self, bars):
+        """
+        Add base bars and return the coarse bars they changed.
+
+        Args:
+            bars (np.ndarray | list): (n, 6) bars or a single 6-value bar
+
+        Returns:
+            np.ndarray: Buckets closed by this update followed by the current one
+        """
+        bars = np.atleast_2d(np.asarray(bars, dtype=np.float64))
+        if len(self.__open):
+            stale = bars[:, 0] < self.__open[0, 0]
+            if stale.any():
+                logger.debug(f"Ignoring {stale.sum()} bars older than the open bucket")
+                bars = bars[~stale]
+        if len(bars) == 0:
+            return self.__current
+        pending = merge_bars(self.__open, bars) if len(self.__open) else bars
+        starts = bucket_starts(pending[:, 0], self.interval, self.timezone, self.session_start)
+        out = aggregate(pending, starts)
+
+        if len(out) > 1:
+            self.__closed.append(out[:-1])
+            self.__values = None
+        self.__open = pending[starts == starts[-1]]
+        self.__current = out[-1:]
+        return out
+
+    @property
+    def values(self):
+        """All coarse bars so far as an (n, 6) array; the last may be incomplete."""
+        if self.__values is None:
+            if len(self.__closed) > 1:
+                self.__closed = [np.concatenate(self.__closed)]
+            self.__values = self.__closed[0] if self.__closed else np.empty((0, 6))
+        return np.concatenate([self.__values, self.__current])
@@ -0,0 +1,463 @@
+import logging
+import os
+import queue
+import re
+import threading
+
+import numpy as np
+
+from .bars import FIELDS, Bars
+
+logger = logging.getLogger(__name__)
+
+_unsafe = re.compile(r"[^A-Za-z0-9_.-]+")
+_identifier = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+
+def _file_name(symbol, interval, extension):
+    return f"{_unsafe.sub('_', symbol)}_{_unsafe.sub('_', interval or '')}{extension}"
+
+
+def _concat(chunks):
+    """Join buffered chunks into one batch ordered by time."""
+    first = chunks[0]
+    if len(chunks) == 1:
+        time, block = first.time, first._block
+    else:
+        time = np.concatenate([c.time for c in chunks])
+        block = np.concatenate([c._block for c in chunks], axis=1)
+    if len(time) > 1 and (np.diff(time) < 0).any():
+        # iter_hist pages arrive newest first
+        order = np.argsort(time, kind="stable")
+        time, block = time[order], block[:, order]
+    elif len(chunks) == 1:
+        return first
+    return Bars(first.symbol, first.interval, time, block, first.info)
+
+
+class _Times:
+    """
+    Times already written for one series, as sorted int64 chunks.
+
+    Membership is answered per chunk with ``searchsorted``, so a lookup or
+    an insert rarely copies the whole index; it costs 8 bytes per bar.
+    Every ``max_chunks`` inserts the chunks are merged into one.
+    """
+
+    max_chunks = 64
+
+    def __init__(self, times=None):
+        self.chunks = []
+        self.last = None
+        if times is not None and len(times):
+            self.add(times)
+
+    def __len__(self):
+        return sum(len(chunk) for chunk in self.chunks)
+
+    def add(self, times):
+        chunk = np.sort(np.asarray(times, dtype=np.int64))
+        if not len(chunk):
+            return
+        self.chunks.append(chunk)
+        if len(self.chunks) > self.max_chunks:
+            self.chunks = [np.sort(np.concatenate(self.chunks))]
+        self.last = chunk[-1] if self.last is None else max(self.last, chunk[-1])
+
+    def contains(self, times):
+        found = np.zeros(len(times), dtype=bool)
+        for chunk in self.chunks:
+            index = np.searchsorted(chunk, times).clip(max=len(chunk) - 1)
+            found |= chunk[index] == times
+        return found
+
+
+class Sink:
+    """
+    Destination for bar batches, written on a background thread.
+
+    ``write`` hands a ``Bars`` batch to the writer thread and blocks while
+    ``max_pending`` batches are still waiting, so a fast producer is slowed
+    down to the speed of the disk instead of piling up pages in memory.
+    Rows are buffered per (symbol, interval) and written in chunks of
+    ``batch_size``, each sorted by time. ``end`` marks a series as
+    finished and flushes it.
+
+    Subclasses implement ``_write(bars)`` and may override ``_end(symbol,
+    interval)`` and ``_close()``; all three run on the writer thread. Writes
+    are idempotent per (symbol, interval, time), so re-running an ingest
+    does not duplicate rows.
+
+    Args:
+        batch_size (int): Rows per write
+        max_pending (int): Batches queued before ``write`` blocks
+    """
+
+    def __init__(self, batch_size: int = 10000, max_pending: int = 8):
+        self.batch_size = batch_size
+        self.max_pending = max_pending
+        self.rows_written = 0
+        self.closed = False
+        self.__queue = queue.Queue(max_pending)
+        self.__buffers = {}
+        self.__error = None
+        self.__thread = None
+        self.__lock = threading.Lock()
+
+    def write(self, bars: Bars):
+        """Queue a batch of bars, blocking while the writer is behind."""
+        if len(bars):
+            self.__put(("write", bars))
+
+    def end(self, symbol: str, interval: str = None):
+        """Flush the buffered rows of one series; it gets no more writes."""
+        self.__put(("end", (symbol, interval)))
+
+    def flush(self):
+        """Write every buffered row and wait until the writer is idle."""
+        self.__put(("flush", None))
+        self.__queue.join()
+        self.__raise()
+
+    def close(self):
+        """Flush, stop the writer thread and release files or connections."""
+        if self.closed:
+            return
+        if self.__thread is not None:
+            self.__queue.put(("close", None))
+            self.__thread.join()
+        else:
+            self._close()
+        self.closed = True
+        self.__raise()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _write(self, bars: Bars):
+        raise NotImplementedError
+
+    def _end(self, symbol, interval):
+        pass
+
+    def _close(self):
+        pass
+
+    def __put(self, message):
+        if self.closed:
+            raise ValueError("Sink is closed")
+        self.__raise()
+        with self.__lock:
+            if self.__thread is None:
+                self.__thread = threading.Thread(
+                    target=self.__run, name=f"{type(self).__name__}-writer", daemon=True
+                )
+                self.__thread.start()
+        self.__queue.put(message)
+
+    def __raise(self):
+        if self.__error is not None:
+            error, self.__error = self.__error, None
+            raise error
+
+    def __run(self):
+        while True:
+            kind, payload = self.__queue.get()
+            try:
+                if self.__error is None:
+                    self.__handle(kind, payload)
+            except Exception as e:
+                self.__fail(e)
+            if kind == "close":
+                # release files and connections even after a failed write
+                try:
+                    self._close()
+                except Exception as e:
+                    self.__fail(e)
+            self.__queue.task_done()
+            if kind == "close":
+                return
+
+    def __fail(self, error):
+        logger.error(f"{type(self).__name__} failed: {error}")
+        if self.__error is None:
+            self.__error = error
+
+    def __handle(self, kind, payload):
+        if kind == "write":
+            key = (payload.symbol, payload.interval)
+            chunks, rows = self.__buffers.get(key, ([], 0))
+            chunks.append(payload)
+            rows += len(payload)
+            self.__buffers[key] = (chunks, rows)
+            if rows >= self.batch_size:
+                self.__flush(key)
+        elif kind == "end":
+            self.__flush(payload)
+            self._end(*payload)
+        else:
+            for key in list(self.__buffers):
+                self.__flush(key)
+
+    def __flush(self, key):
+        chunks, rows = self.__buffers.pop(key, ([], 0))
+        if not chunks:
+            return
+        bars = _concat(chunks)
+        for start in range(0, len(bars), self.batch_size):
+            batch = bars[start:start + self.batch_size]
+            self._write(batch)
+            self.rows_written += len(batch)
+
+
+class CSVSink(Sink):
+    """
+    Append-only CSV files, one per symbol and interval, in ``directory``.
+
+    Columns are ``time`` (epoch seconds), open, high, low, close and volume.
+    A CSV file cannot be updated in place, so bars whose time is already in
+    the file are skipped rather than rewritten. Rows are appended as they
+    arrive, sorted within each batch; ``ingest`` pages newest first, so the
+    file is only ordered by time with ``sort=True``, which re-reads and
+    rewrites it when the series ends and needs memory for all of its rows.
+
+    Args:
+        directory (str): Where the files are written
+        sort (bool): Rewrite each series sorted by time when it ends
+    """
+
+    def __init__(
+        self, directory: str, batch_size: int = 10000, max_pending: int = 8, sort: bool = False
+    ):
+        super().__init__(batch_size, max_pending)
+        self.directory = directory
+        self.sort = sort
+        self.__times = {}
+        self.__unsorted = set()
+
+    def path(self, symbol: str, interval: str = None) -> str:
+        return os.path.join(self.directory, _file_name(symbol, interval, ".csv"))
+
+    def _write(self, bars):
+        path = self.path(bars.symbol, bars.interval)
+        key = (bars.symbol, bars.interval)
+        existing = self.__times.get(key)
+        if existing is None:
+            existing = self.__times[key] = _Times(self.__read_times(path))
+        keep = ~existing.contains(bars.time)
+        if not keep.any():
+            return
+        if self.sort and existing.last is not None and bars.time[keep][0] < existing.last:
+            self.__unsorted.add(key)
+        rows = np.column_stack([bars.time[keep], bars._block[:, keep].T])
+        os.makedirs(self.directory, exist_ok=True)
+        new_file = not os.path.exists(path)
+        with open(path, "a", newline="") as f:
+            if new_file:
+                f.write(",".join(("time", *FIELDS)) + "\n")
+            np.savetxt(f, rows, delimiter=",", fmt=["%d"] + ["%.17g"] * len(FIELDS))
+        existing.add(bars.time[keep])
+
+    def _end(self, symbol, interval):
+        self.__times.pop((symbol, interval), None)
+        if (symbol, interval) in self.__unsorted:
+            self.__unsorted.discard((symbol, interval))
+            self.__sort(self.path(symbol, interval))
+
+    def _close(self):
+        for symbol, interval in list(self.__unsorted):
+            self._end(symbol, interval)
+
+    @staticmethod
+    def __sort(path):
+        with open(path) as f:
+            header = f.readline()
+            lines = f.readlines()
+        times = np.array([int(line.split(",", 1)[0]) for line in lines], dtype=np.int64)
+        tmp = path + ".tmp"
+        with open(tmp, "w", newline="") as f:
+            f.write(header)
+            f.writelines(lines[i] for i in np.argsort(times, kind="stable"))
+        os.replace(tmp, path)
+
+    @staticmethod
+    def __read_times(path):
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            return None
+        return np.loadtxt(path, delimiter=",", skiprows=1, usecols=0, dtype=np.int64, ndmin=1)
+
+
+class ParquetSink(Sink):
+    """
+    Parquet files, one per symbol and interval, in ``directory`` (requires pyarrow).
+
+    Every write becomes one row group of a temporary file, sorted by time
+    within the row group. When the series ends (``end`` or ``close``) the
+    row groups of an existing file are copied over one at a time, minus the
+    bars written again, so re-runs upsert instead of duplicating while
+    holding one row group in memory; the file itself is still rewritten.
+    Then the temporary file replaces it. ``ingest`` pages newest first, so
+    the file is only ordered by time with ``sort=True``, which reads the
+    whole series back when it ends and needs memory for all of its rows.
+
+    Args:
+        directory (str): Where the files are written
+        sort (bool): Rewrite each series sorted by time when it ends
+    """
+
+    def __init__(
+        self, directory: str, batch_size: int = 10000, max_pending: int = 8, sort: bool = False
+    ):
+        try:
+            import pyarrow.parquet  # noqa: F401
+        except ImportError:
+            raise ImportError(
+                "ParquetSink requires pyarrow, install it with `pip install pyarrow`"
+            ) from None
+        super().__init__(batch_size, max_pending)
+        self.directory = directory
+        self.sort = sort
+        self.__writers = {}
+        self.__times = {}
+
+    def path(self, symbol: str, interval: str = None) -> str:
+        return os.path.join(self.directory, _file_name(symbol, interval, ".parquet"))
+
+    def _write(self, bars):
+        import pyarrow.parquet as pq
+
+        key = (bars.symbol, bars.interval)
+        table = bars.to_arrow()
+        writer = self.__writers.get(key)
+        if writer is None:
+            os.makedirs(self.directory, exist_ok=True)
+            tmp = self.path(*key) + ".tmp"
+            writer = self.__writers[key] = pq.ParquetWriter(tmp, table.schema)
+            self.__times[key] = _Times()
+        writer.write_table(table)
+        self.__times[key].add(bars.time)
+
+    def _end(self, symbol, interval):
+        import pyarrow.parquet as pq
+
+        key = (symbol, interval)
+        writer = self.__writers.pop(key, None)
+        if writer is None:
+            return
+        written = self.__times.pop(key)
+        path = self.path(symbol, interval)
+        tmp = path + ".tmp"
+        if os.path.exists(path):
+            old = pq.ParquetFile(path)
+            for i in range(old.num_row_groups):
+                group = old.read_row_group(i).cast(writer.schema)
+                times = group.column("time").cast("int64").to_numpy()
+                keep = ~written.contains(times)
+                if keep.any():
+                    writer.write_table(group.filter(keep))
+        writer.close()
+        if self.sort:
+            from .decode import merge_bars
+
+            values = _read_values(pq.read_table(tmp))
+            merged = Bars.from_values(merge_bars(values[:0], values), symbol, interval)
+            pq.write_table(merged.to_arrow(), tmp, row_group_size=self.batch_size)
+        os.replace(tmp, path)
+
+    def _close(self):
+        for symbol, interval in list(self.__writers):
+            self._end(symbol, interval)
+
+
+def _read_values(table):
+    import pyarrow as pa
+
+    # Parquet has no seconds unit, so times come back in ms or us
+    time = table.column("time").cast(pa.timestamp("s")).cast("int64").to_numpy()
+    columns = [table.column(f).to_numpy() for f in FIELDS]
+    return np.column_stack([time.astype(np.float64), *columns])
+
+
+class SQLiteSink(Sink):
+    """
+    Upserts bars into a SQLite table keyed by (symbol, interval, time).
+
+    The connection is opened on the writer thread, and each write is one
+    transaction. Re-written bars replace the stored values.
+
+    Args:
+        path (str): Database file
+        table (str): Table name, created if missing
+    """
+
+    _types = ("TEXT", "INTEGER", "REAL")
+
+    def __init__(self, path: str, table: str = "bars", batch_size: int = 10000, max_pending: int = 8):
+        if not _identifier.match(table):
+            raise ValueError(f"Invalid table name {table!r}")
+        super().__init__(batch_size, max_pending)
+        self.path = path
+        self.table = table
+        self.__db = None
+
+    def _connect(self):
+        import sqlite3
+
+        return sqlite3.connect(self.path)
+
+    def _write(self, bars):
+        if self.__db is None:
+            self.__db = self._connect()
+            self.__db.execute(self.__create_sql())
+        fields = ", ".join(FIELDS)
+        updates = ", ".join(f"{f} = excluded.{f}" for f in FIELDS)
+        sql = (
+            f"INSERT INTO {self.table} (symbol, interval, time, {fields}) "
+            f"VALUES ({', '.join('?' * (3 + len(FIELDS)))}) "
+            f"ON CONFLICT (symbol, interval, time) DO UPDATE SET {updates}"
+        )
+        rows = zip(
+            [bars.symbol] * len(bars),
+            [bars.interval or ""] * len(bars),
+            bars.time.tolist(),
+            *(column.tolist() for column in bars._block),
+        )
+        self.__db.executemany(sql, rows)
+        self.__db.commit()
+
+    def _close(self):
+        if self.__db is not None:
+            self.__db.close()
+            self.__db = None
+
+    def __create_sql(self):
+        text, integer, real = self._types
+        columns = ", ".join(f"{f} {real}" for f in FIELDS)
+        return (
+            f"CREATE TABLE IF NOT EXISTS {self.table} ("
+            f"symbol {text} NOT NULL, interval {text} NOT NULL, time {integer} NOT NULL, "
+            f"{columns}, PRIMARY KEY (symbol, interval, time))"
+        )
+
+
+class DuckDBSink(SQLiteSink):
+    """``SQLiteSink`` for a DuckDB database file (requires duckdb)."""
+
+    _types = ("VARCHAR", "BIGINT", "DOUBLE")
+
+    def __init__(self, path: str, table: str = "bars", batch_size: int = 10000, max_pending: int = 8):
+        try:
+            import duckdb  # noqa: F401
+        except ImportError:
+            raise ImportError(
+                "DuckDBSink requires duckdb, install it with `pip install duckdb`"
+            ) from None
+        super().__init__(path, table, batch_size, max_pending)
+
+    def _connect(self):
+        import duckdb
+
+        return duckdb.connect(self.path)
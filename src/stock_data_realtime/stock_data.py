@@ -1,17 +1,35 @@
-import datetime
+import collections
 import enum
 import json
 import logging
-import random
-import re
-import string
-import os
+import queue
+import threading
 import time
-from typing import Optional
-
-import pandas as pd
-from websocket import create_connection
-import requests
+from typing import TYPE_CHECKING, Optional
+
+from . import web
+from .bars import Bars, exchange_timezone
+from .cache import BarCache, SearchCache, SymbolCache, default_symbol_cache
+from .limits import ConnectionLimits
+from .metrics import get_metrics
+from .parse_pool import ParsePool
+from .connection import QUOTE_BATCH_SIZE, QUOTE_FIELDS, AuthError
+from .panel import FILLS, Panel
+from .pool import ConnectionPool
+from .token_store import TokenStore, default_token_store, token_key
+from .wire_log import WireRecorder
+from .decode import bars_to_df, bars_to_tz_df, create_df, decode_bars, merge_bars
+from .streaming import Subscription
+from .protocol import (
+    construct_message,
+    format_symbol,
+    generate_session,
+    prepend_header,
+    prepare_symbol,
+)
+
+if TYPE_CHECKING:
+    import pandas as pd
 
 logger = logging.getLogger(__name__)
 
@@ -32,33 +50,282 @@ class Interval(enum.Enum):
     in_weekly = "1W"
     in_monthly = "1M"
 
+    @property
+    def seconds(self) -> int:
+        """Nominal bar length; weeks and months use 7 and 30 days."""
+        return _interval_seconds[self]
+
+
+_interval_seconds = {
+    Interval.in_5_seconds: 5,
+    Interval.in_1_minute: 60,
+    Interval.in_3_minute: 180,
+    Interval.in_5_minute: 300,
+    Interval.in_15_minute: 900,
+    Interval.in_30_minute: 1800,
+    Interval.in_45_minute: 2700,
+    Interval.in_1_hour: 3600,
+    Interval.in_2_hour: 7200,
+    Interval.in_3_hour: 10800,
+    Interval.in_4_hour: 14400,
+    Interval.in_daily: 86400,
+    Interval.in_weekly: 604800,
+    Interval.in_monthly: 2592000,
+}
+
+
+def batch_stat(spec, started, bars=0, error=None):
+    symbol, exchange, interval, n_bars = spec
+    if error is not None:
+        logger.error(f"Failed to fetch {exchange}:{symbol}: {error}")
+    return {
+        "symbol": symbol,
+        "exchange": exchange,
+        "interval": interval.value,
+        "n_bars": n_bars,
+        "bars": bars,
+        "latency": time.perf_counter() - started,
+        "error": None if error is None else str(error),
+    }
+
+
+def batch_stats_frame(stats):
+    import pandas as pd
+
+    return pd.DataFrame(
+        stats,
+        columns=["symbol", "exchange", "interval", "n_bars", "bars", "latency", "error"],
+    )
 
-class TvDatafeed:
-    __sign_in_url = "https://www.tradingview.com/accounts/signin/"
-    __search_url = "https://symbol-search.tradingview.com/symbol_search/?text={}&hl=1&exchange={}&lang=en&type=&domain=production"
-    __ws_headers = json.dumps({"Origin": "https://data.tradingview.com"})
-    __signin_headers = {"Referer": "https://www.tradingview.com"}
-    __ws_timeout = 5
-    __token_file = "tv_token.json"
 
+def concat_batch(results):
+    import pandas as pd
+
+    if not results:
+        return pd.DataFrame()
+    frames = []
+    for (symbol, exchange, interval, n_bars), data in results.items():
+        data = data.copy()
+        data.insert(1, "interval", interval.value)
+        frames.append(data)
+    return pd.concat(frames)
+
+
+def quotes_frame(snapshot):
+    """One row per quoted symbol of a QuoteSnapshot, columns in ``QUOTE_FIELDS`` order."""
+    import pandas as pd
+
+    for symbol, error in snapshot.errors.items():
+        logger.error(f"Failed to quote {symbol}: {error}")
+    if snapshot.pending:
+        logger.warning(
+            f"Quote snapshot timed out with {len(snapshot.pending)} incomplete symbol(s)"
+        )
+    rows = {
+        symbol: snapshot.quotes[symbol]
+        for symbol in snapshot.symbols
+        if symbol in snapshot.quotes and symbol not in snapshot.errors
+    }
+    data = pd.DataFrame.from_dict(rows, orient="index")
+    columns = [f for f in QUOTE_FIELDS if f in data.columns]
+    data = data[columns + [c for c in data.columns if c not in columns]]
+    data.index.name = "symbol"
+    return data
+
+
+def build_output(values, symbol, interval, output="pandas", info=None):
+    """
+    Wrap decoded bars as a get_hist DataFrame, a DataFrame indexed in the
+    exchange timezone or a columnar Bars container.
+    """
+    if values is None:
+        return None
+    if output == "bars":
+        return Bars.from_values(values, symbol, interval.value, info)
+    if output == "pandas_tz":
+        if info is None or "timezone" not in info:
+            logger.warning(f"No exchange timezone known for {symbol}, using UTC")
+        return with_info(bars_to_tz_df(values, symbol, exchange_timezone(info)), info)
+    return with_info(bars_to_df(values, symbol), info)
+
+
+def with_info(frame, info):
+    """Attach instrument metadata to a DataFrame as ``attrs["symbol_info"]``."""
+    if frame is not None and info is not None:
+        frame.attrs["symbol_info"] = info
+    return frame
+
+
+def check_output(output):
+    if output not in ("pandas", "pandas_tz", "bars"):
+        raise ValueError(
+            f"Unknown output {output!r}, expected 'pandas', 'pandas_tz' or 'bars'"
+        )
+
+
+def check_fill(fill):
+    if fill not in FILLS:
+        raise ValueError(f"Unknown fill {fill!r}, expected one of {FILLS}")
+
+
+def build_panel(specs, results, interval, fill, limit, extended_session=False):
+    """Align ``get_hist_many(..., output="bars")`` results, one column per spec."""
+    series = {}
+    for spec in dict.fromkeys(specs):
+        symbol = prepare_symbol(spec[0], spec[1], None, extended_session)[0]
+        if spec not in results:
+            logger.warning(f"No bars for {symbol}, its panel column is empty")
+        series[symbol] = results.get(spec)
+    return Panel.from_bars(series, interval.value, fill, limit)
+
+
+def has_credentials(username, password, sessionid, sessionid_sign):
+    return bool((sessionid and sessionid_sign) or (username and password))
+
+
+class TvDatafeed:
     def __init__(
         self,
         username: Optional[str] = None,
         password: Optional[str] = None,
         sessionid: Optional[str] = None,
         sessionid_sign: Optional[str] = None,
+        cache: Optional[BarCache] = None,
+        search_cache: Optional[SearchCache] = None,
+        limits: Optional[ConnectionLimits] = None,
+        ws_url: Optional[str] = None,
+        parse_pool: Optional[ParsePool] = None,
+        token_store: Optional[TokenStore] = None,
+        symbol_cache: Optional[SymbolCache] = None,
+        recorder: Optional[WireRecorder] = None,
+        transport=None,
     ) -> None:
         self.username = username
         self.password = password
         self.sessionid = sessionid
         self.sessionid_sign = sessionid_sign
-        self.ws_debug = False
-        self.token = self.__load_token()
-        if not self.token:
-            self.token = self.__auth()
-        self.ws = None
+        self.search_cache = search_cache if search_cache is not None else SearchCache()
         self.session = self.__generate_session()
         self.chart_session = self.__generate_chart_session()
+        self.limits = limits or ConnectionLimits()
+        self.ws_url = ws_url
+        self.batch_stats = None
+        self.cache = cache
+        self.parse_pool = parse_pool
+        self.token_store = token_store or default_token_store()
+        self.symbol_cache = symbol_cache or default_symbol_cache()
+        self.recorder = recorder
+        self.transport = transport
+        self.__token = None
+        self.__http = None
+        self.__pool = None
+        self.__ws_debug = False
+        self.__lock = threading.RLock()
+
+    @property
+    def token(self) -> str:
+        """Auth token, loaded or obtained when a request first needs it."""
+        if self.__token is None:
+            with self.__lock:
+                if self.__token is None:
+                    self.__token = self.__get_token()
+        return self.__token
+
+    @token.setter
+    def token(self, value: str) -> None:
+        self.__token = value
+
+    @property
+    def http(self):
+        """HTTP session for authentication and search, created on first use."""
+        if self.__http is None:
+            with self.__lock:
+                if self.__http is None:
+                    self.__http = web.http_session()
+        return self.__http
+
+    @property
+    def ws(self):
+        return self.__get_pool().primary.ws
+
+    @property
+    def ws_debug(self) -> bool:
+        return self.__ws_debug
+
+    @ws_debug.setter
+    def ws_debug(self, value: bool) -> None:
+        self.__ws_debug = value
+        if self.__pool is not None:
+            self.__pool.ws_debug = value
+
+    def close(self):
+        """Close the shared websocket connections and HTTP session."""
+        if self.__pool is not None:
+            self.__pool.close()
+        if self.__http is not None:
+            self.__http.close()
+        self.symbol_cache.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def refresh_token(self, rejected: str = None) -> str:
+        """
+        Replace a token the server rejected.
+
+        Only one client or process signs in, the others wait and reuse its
+        token. Open connections are re-authenticated with the new token.
+
+        Args:
+            rejected (str, optional): The token that was rejected; if another
+                worker already replaced it, its token is returned as is
+
+        Returns:
+            str: The new token, or the unauthorized token if signing in failed
+        """
+        with self.__lock:
+            if rejected is not None and self.__token is not None and self.__token != rejected:
+                return self.__token
+            self.__token = self.__get_token(stale=rejected or self.__token)
+            if self.__pool is not None:
+                self.__pool.set_token(self.__token)
+            return self.__token
+
+    def __get_token(self, stale=None):
+        if not has_credentials(self.username, self.password, self.sessionid, self.sessionid_sign):
+            return self.__sign_in() or web.UNAUTHORIZED_TOKEN
+        key = token_key(self.username, self.sessionid)
+        token = None if stale else self.token_store.get(key)
+        if token:
+            logger.info("Loaded saved token.")
+        else:
+            token = self.token_store.refresh(key, self.__sign_in, stale)
+        return token or web.UNAUTHORIZED_TOKEN
+
+    def __sign_in(self):
+        with get_metrics().timer("tv_auth_seconds"):
+            token = self.__auth()
+        return None if token == web.UNAUTHORIZED_TOKEN else token
+
+    def __get_pool(self):
+        if self.__pool is None:
+            with self.__lock:
+                if self.__pool is None:
+                    pool = ConnectionPool(
+                        self.token,
+                        self.limits,
+                        self.session,
+                        self.chart_session,
+                        self.ws_url,
+                        self.transport,
+                        self.recorder,
+                    )
+                    pool.ws_debug = self.__ws_debug
+                    self.__pool = pool
+        return self.__pool
 
     def __auth(self):
         # Check if we have session cookies
@@ -71,307 +338,572 @@ class TvDatafeed:
             logger.warning(
                 "No valid credentials or session cookies provided. Using unauthorized access."
             )
-            return "unauthorized_user_token"
+            return web.UNAUTHORIZED_TOKEN
 
     def __auth_with_session(self):
-        headers = {
-            "Referer": "https://www.tradingview.com",
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
-            "Cookie": f"sessionid={self.sessionid}; sessionid_sign={self.sessionid_sign}",
-        }
+        import requests
+
+        headers = web.session_headers(self.sessionid, self.sessionid_sign)
 
         try:
-            response = requests.get(
-                "https://www.tradingview.com/chart/",
+            response = self.http.get(
+                web.CHART_URL,
                 headers=headers,
                 allow_redirects=False,
             )
             if response.status_code == 302:
                 redirect_url = response.headers.get("Location")
-                response = requests.get(
+                response = self.http.get(
                     f"https://www.tradingview.com{redirect_url}", headers=headers
                 )
             response.raise_for_status()
 
-            match = re.search(r'"auth_token":"([^"]+)"', response.text)
-            if match:
-                token = match.group(1)
-                self.__save_token(token)
+            token = web.parse_session_token(response.text)
+            if token:
                 logger.info("Authentication successful with session cookies.")
                 return token
             else:
                 logger.error("Failed to extract auth token from response.")
-                return "unauthorized_user_token"
+                return web.UNAUTHORIZED_TOKEN
 
         except requests.exceptions.RequestException as e:
             logger.error(f"Error during session authentication: {e}")
-            return "unauthorized_user_token"
+            return web.UNAUTHORIZED_TOKEN
 
     def __auth_with_credentials(self):
+        import requests
+
         data = {"username": self.username, "password": self.password, "remember": "on"}
         try:
-            response = requests.post(
-                url=self.__sign_in_url, data=data, headers=self.__signin_headers
+            response = self.http.post(
+                url=web.SIGN_IN_URL, data=data, headers=web.SIGNIN_HEADERS
             )
             response.raise_for_status()
 
             try:
-                json_response = response.json()
-                if "user" in json_response and "auth_token" in json_response["user"]:
-                    token = json_response["user"]["auth_token"]
-                    self.__save_token(token)
+                token = web.parse_credentials_token(response.json())
+                if token:
                     logger.info("Authentication successful with credentials.")
                     return token
                 else:
                     logger.error("Unexpected response format during authentication.")
-                    return "unauthorized_user_token"
+                    return web.UNAUTHORIZED_TOKEN
             except json.JSONDecodeError:
                 logger.error("Failed to parse authentication response as JSON.")
-                return "unauthorized_user_token"
+                return web.UNAUTHORIZED_TOKEN
 
         except requests.exceptions.RequestException as e:
             logger.error(f"Error during credentials authentication: {e}")
-            return "unauthorized_user_token"
-
-    def __save_token(self, token):
-        data = {
-            "token": token,
-            "expiry": (
-                datetime.datetime.now() + datetime.timedelta(days=30)
-            ).isoformat(),
-        }
-        with open(self.__token_file, "w") as f:
-            json.dump(data, f)
-        logger.info("Token saved successfully.")
-
-    def __load_token(self):
-        if not os.path.exists(self.__token_file):
-            return None
-
-        with open(self.__token_file, "r") as f:
-            data = json.load(f)
-
-        expiry = datetime.datetime.fromisoformat(data["expiry"])
-        if expiry > datetime.datetime.now():
-            logger.info("Loaded saved token.")
-            return data["token"]
-        else:
-            logger.info("Saved token has expired.")
-            os.remove(self.__token_file)
-            return None
-
-    def __create_connection(self):
-        for attempt in range(3):
-            try:
-                logging.debug(f"Creating websocket connection (attempt {attempt + 1})")
-                self.ws = create_connection(
-                    "wss://data.tradingview.com/socket.io/websocket",
-                    headers=self.__ws_headers,
-                    timeout=self.__ws_timeout,
-                )
-                logger.debug("WebSocket connection established successfully")
-                return
-            except Exception as e:
-                logger.error(f"Failed to establish WebSocket connection: {e}")
-                if attempt < 2:
-                    time.sleep(2)
-        raise ConnectionError(
-            "Failed to establish WebSocket connection after 3 attempts"
-        )
-
-    @staticmethod
-    def __filter_raw_message(text):
-        try:
-            found = re.search('"m":"(.+?)",', text).group(1)
-            found2 = re.search('"p":(.+?"}"])}', text).group(1)
-            return found, found2
-        except AttributeError:
-            logger.error("Error in filter_raw_message")
+            return web.UNAUTHORIZED_TOKEN
 
     @staticmethod
     def __generate_session():
-        stringLength = 12
-        letters = string.ascii_lowercase
-        random_string = "".join(random.choice(letters) for i in range(stringLength))
-        return "qs_" + random_string
+        return generate_session("qs_")
 
     @staticmethod
     def __generate_chart_session():
-        stringLength = 12
-        letters = string.ascii_lowercase
-        random_string = "".join(random.choice(letters) for i in range(stringLength))
-        return "cs_" + random_string
+        return generate_session("cs_")
 
-    @staticmethod
-    def __prepend_header(st):
-        return "~m~" + str(len(st)) + "~m~" + st
+    __prepend_header = staticmethod(prepend_header)
+    __construct_message = staticmethod(construct_message)
 
-    @staticmethod
-    def __construct_message(func, param_list):
-        return json.dumps({"m": func, "p": param_list}, separators=(",", ":"))
+    __create_df = staticmethod(create_df)
+    __format_symbol = staticmethod(format_symbol)
 
-    def __create_message(self, func, paramList):
-        return self.__prepend_header(self.__construct_message(func, paramList))
+    def get_hist(
+        self,
+        symbol: str,
+        exchange: str = "NSE",
+        interval: Interval = Interval.in_daily,
+        n_bars: int = 5000,
+        fut_contract: int = None,
+        extended_session: bool = False,
+        use_cache: bool = True,
+        output: str = "pandas",
+    ) -> "pd.DataFrame":
+        """
+        Fetch the latest ``n_bars`` bars of a symbol.
 
-    def __send_message(self, func, args):
-        m = self.__create_message(func, args)
-        if self.ws_debug:
-            print(m)
-        self.ws.send(m)
+        Args:
+            symbol (str): Symbol, e.g. ``AAPL``
+            exchange (str): Exchange of the symbol
+            interval (Interval): Bar interval
+            n_bars (int): Number of bars
+            fut_contract (int, optional): Continuous futures contract, e.g. 1 for ``NQ1!``
+            extended_session (bool): Include extended trading hours
+            use_cache (bool): Read and update the ``BarCache`` if one is set
+            output (str): ``"pandas"`` for a DataFrame with a Date index and
+                Time column, ``"pandas_tz"`` for a DataFrame indexed by a
+                tz-aware ``DatetimeIndex`` in the exchange timezone, or
+                ``"bars"`` for a columnar ``Bars`` container
 
-    @staticmethod
-    def __create_df(raw_data, symbol):
-        try:
-            out = re.search('"s":\[(.+?)\}\]', raw_data).group(1)
-            x = out.split(',{"')
-            data = list()
-            volume_data = True
-
-            for xi in x:
-                xi = re.split("\[|:|,|\]", xi)
-                timestamp = float(xi[4])
-                dt = datetime.datetime.fromtimestamp(timestamp)
-                date = dt.date()
-                time = dt.time()
-
-                row = [date, time]
-
-                for i in range(5, 10):
-                    # skip converting volume data if does not exist
-                    if not volume_data and i == 9:
-                        row.append(0.0)
-                        continue
-                    try:
-                        row.append(float(xi[i]))
-                    except ValueError:
-                        volume_data = False
-                        row.append(0.0)
-                        logger.debug("No volume data")
-
-                data.append(row)
-
-            data = pd.DataFrame(
-                data, columns=["Date", "Time", "Open", "High", "Low", "Close", "Volume"]
-            )
-            data["Date"] = pd.to_datetime(data["Date"])
-            data["Time"] = pd.to_datetime(data["Time"], format="%H:%M:%S").dt.time
-            data.set_index("Date", inplace=True)
-            data.insert(0, "symbol", value=symbol)
-            return data
-        except AttributeError:
+        Returns:
+            pd.DataFrame | Bars: The bars, or None if no data was received.
+            The instrument metadata (see ``symbol_info``) is attached as
+            ``attrs["symbol_info"]`` or ``Bars.info``.
+        """
+        check_output(output)
+        if self.token == web.UNAUTHORIZED_TOKEN:
+            logger.warning("Using unauthorized access, data may be limited")
+
+        symbol, resolve_payload = prepare_symbol(
+            symbol, exchange, fut_contract, extended_session
+        )
+        if self.cache is None or not use_cache:
+            values = self.__fetch_bars(symbol, resolve_payload, interval, n_bars)
+        else:
+            values = self.__fetch_cached(symbol, resolve_payload, interval, n_bars)
+
+        if values is None:
             logger.error("No data, please check the exchange and symbol")
+            return None
+        info = self.symbol_cache.get(resolve_payload)
+        return build_output(values[-n_bars:], symbol, interval, output, info)
 
-    @staticmethod
-    def __format_symbol(symbol, exchange, contract: int = None):
-        if ":" in symbol:
-            return symbol
-        elif contract is None:
-            return f"{exchange}:{symbol}"
-        elif isinstance(contract, int):
-            return f"{exchange}:{symbol}{contract}!"
+    def symbol_info(
+        self,
+        symbol: str,
+        exchange: str = "NSE",
+        fut_contract: int = None,
+        extended_session: bool = False,
+    ) -> dict:
+        """
+        Instrument metadata of a symbol, as sent in ``symbol_resolved``.
+
+        Served from ``self.symbol_cache`` when any client on the machine has
+        fetched the symbol recently; otherwise one bar is requested to
+        resolve it.
+
+        Returns:
+            dict: Fields such as ``pricescale``, ``minmov``, ``session``,
+            ``timezone`` and ``type``, or None if the symbol did not resolve
+        """
+        symbol, resolve_payload = prepare_symbol(
+            symbol, exchange, fut_contract, extended_session
+        )
+        info = self.symbol_cache.get(resolve_payload)
+        if info is None:
+            self.__fetch_bars(symbol, resolve_payload, Interval.in_daily, 1)
+            info = self.symbol_cache.get(resolve_payload)
+        return info
+
+    def __fetch_bars(self, symbol, resolve_payload, interval, n_bars, retry_auth=True):
+        logger.debug(f"Getting data for {symbol}...")
+        connection = self.__get_pool().acquire()
+        try:
+            token = connection.token
+            request = connection.request_series(
+                symbol, resolve_payload, interval.value, n_bars
+            )
+            connection.wait(request)
+        finally:
+            self.__get_pool().release(connection)
+        if isinstance(request.error, AuthError) and retry_auth:
+            logger.warning(f"Token rejected while fetching {symbol}, refreshing it")
+            self.refresh_token(rejected=token)
+            return self.__fetch_bars(symbol, resolve_payload, interval, n_bars, False)
+        self.__remember(request)
+        return decode_bars(request.frames)
+
+    def __remember(self, request):
+        if request.symbol_info is not None:
+            self.symbol_cache.put(request.resolve_payload, request.symbol_info)
+
+    def __fetch_cached(self, symbol, resolve_payload, interval, n_bars):
+        """Serve from the cache, fetching only the bars newer than the last entry."""
+        cached = self.cache.get(symbol, resolve_payload, interval.value)
+        if cached is None or len(cached) < n_bars:
+            values = self.__fetch_bars(symbol, resolve_payload, interval, n_bars)
         else:
-            raise ValueError("Not a valid contract")
+            # +2 re-fetches the last cached bar, which may have been incomplete
+            missing = int((time.time() - cached[-1, 0]) // interval.seconds) + 2
+            values = self.__fetch_bars(
+                symbol, resolve_payload, interval, min(missing, n_bars)
+            )
+            if values is not None and values[0, 0] > cached[-1, 0] and missing < n_bars:
+                logger.debug(f"Cached bars for {symbol} are stale, fetching {n_bars}")
+                values = self.__fetch_bars(symbol, resolve_payload, interval, n_bars)
 
-    def get_hist(
+        if values is None:
+            return None
+        if cached is not None and values[0, 0] <= cached[-1, 0]:
+            values = merge_bars(cached, values)
+        elif cached is not None:
+            # merging would leave a hole between the cached and the fresh bars
+            logger.debug(f"Replacing cached bars for {symbol}, they do not reach the new ones")
+        self.cache.put(symbol, resolve_payload, interval.value, values)
+        return values
+
+    def iter_hist(
         self,
         symbol: str,
         exchange: str = "NSE",
         interval: Interval = Interval.in_daily,
-        n_bars: int = 5000,
+        n_bars: int = 100000,
+        page_size: int = 5000,
         fut_contract: int = None,
         extended_session: bool = False,
-    ) -> pd.DataFrame:
-        if self.token == "unauthorized_user_token":
-            logger.warning("Using unauthorized access, data may be limited")
+        timeout: float = None,
+        output: str = "pandas",
+    ):
+        """
+        Page backwards through history beyond a single ``create_series`` window.
 
-        backadjustment: bool = False
-        if symbol.endswith("!A"):
-            backadjustment = True
-            symbol = symbol.replace("!A", "!")
+        The first page holds the newest ``page_size`` bars and every later
+        page the bars just before it, fetched with ``request_more_data`` on
+        the same series. Bars overlapping an earlier page are dropped, and the
+        next page is only requested once the current one is handed over, so
+        at most two pages are held in memory.
 
-        symbol = self.__format_symbol(
-            symbol=symbol, exchange=exchange, contract=fut_contract
-        )
+        Args:
+            symbol (str): Symbol, e.g. ``AAPL``
+            exchange (str): Exchange of the symbol
+            interval (Interval): Bar interval
+            n_bars (int): Total number of bars to fetch at most
+            page_size (int): Bars requested per page
+            timeout (float, optional): Idle timeout per page
+            output (str): ``"pandas"``, ``"pandas_tz"`` or ``"bars"``, as in ``get_hist``
+
+        Yields:
+            pd.DataFrame | Bars: One page, oldest bar first. Pages run newest to
+            oldest and stop when the server has no older bars.
+        """
+        check_output(output)
+        if self.token == web.UNAUTHORIZED_TOKEN:
+            logger.warning("Using unauthorized access, data may be limited")
 
-        interval = interval.value
-
-        self.__create_connection()
-
-        self.__send_message("set_auth_token", [self.token])
-        self.__send_message("chart_create_session", [self.chart_session, ""])
-        self.__send_message("quote_create_session", [self.session])
-        self.__send_message(
-            "quote_set_fields",
-            [
-                self.session,
-                "ch",
-                "chp",
-                "current_session",
-                "description",
-                "local_description",
-                "language",
-                "exchange",
-                "fractional",
-                "is_tradable",
-                "lp",
-                "lp_time",
-                "minmov",
-                "minmove2",
-                "original_name",
-                "pricescale",
-                "pro_name",
-                "short_name",
-                "type",
-                "update_mode",
-                "volume",
-                "currency_code",
-                "rchp",
-                "rtc",
-            ],
+        symbol, resolve_payload = prepare_symbol(
+            symbol, exchange, fut_contract, extended_session
         )
-
-        self.__send_message(
-            "quote_add_symbols", [self.session, symbol, {"flags": ["force_permission"]}]
+        connection = self.__get_pool().acquire()
+        request = connection.request_series(
+            symbol, resolve_payload, interval.value, min(page_size, n_bars), paged=True
         )
-        self.__send_message("quote_fast_symbols", [self.session, symbol])
-
-        self.__send_message(
-            "resolve_symbol",
-            [
-                self.chart_session,
-                "symbol_1",
-                '={"symbol":"'
-                + symbol
-                + '","adjustment":"splits"'
-                + ("" if not backadjustment else ',"backadjustment":"default"')
-                + ',"session":'
-                + ('"regular"' if not extended_session else '"extended"')
-                + "}",
-            ],
+        oldest = None
+        remaining = n_bars
+        try:
+            while remaining > 0:
+                frames = connection.next_page(request, timeout)
+                if frames is None:
+                    if request.error is not None:
+                        logger.error(f"Paging {symbol} stopped: {request.error}")
+                    return
+                values = decode_bars(frames)
+                if values is not None and oldest is not None:
+                    values = values[values[:, 0] < oldest]
+                if values is None or len(values) == 0:
+                    logger.debug(f"No older bars for {symbol}")
+                    return
+                values = values[-remaining:]
+                oldest = values[0, 0]
+                remaining -= len(values)
+                if remaining > 0:
+                    connection.request_more(request, min(page_size, remaining))
+                self.__remember(request)
+                yield build_output(values, symbol, interval, output, request.symbol_info)
+        finally:
+            connection.cancel(request)
+            self.__get_pool().release(connection)
+
+    def subscribe(self, callback=None, maxsize: int = 10000) -> Subscription:
+        """
+        Open a live subscription on the shared connection.
+
+        Add symbols with ``add_quotes``/``add_bars`` and either iterate the
+        subscription or pass ``callback`` to receive each ``StreamEvent``.
+
+        Args:
+            callback (callable, optional): Called with every update on the reader thread
+            maxsize (int): Updates buffered for iteration before the oldest are dropped
+
+        Returns:
+            Subscription: Live subscription, close it to unsubscribe everything
+        """
+        return Subscription(self.__get_pool().primary, callback, maxsize)
+
+    def get_quotes(
+        self,
+        symbols: list,
+        exchange: str = "",
+        timeout: float = None,
+        batch_size: int = QUOTE_BATCH_SIZE,
+    ) -> "pd.DataFrame":
+        """
+        Snapshot the latest quote of many symbols over one quote session.
+
+        All symbols are added with batched ``quote_add_symbols`` messages
+        and the ``qsd`` fields configured by ``quote_set_fields`` are
+        collected until the server marks every symbol complete, or until
+        ``timeout``.
+
+        Args:
+            symbols (list): Symbols, e.g. ``["AAPL", "MSFT"]`` or ``["NASDAQ:AAPL"]``
+            exchange (str, optional): Exchange prefixed to symbols without one
+            timeout (float, optional): Seconds to wait for complete quotes,
+                defaults to ``self.limits.timeout``
+            batch_size (int): Symbols per ``quote_add_symbols`` message
+
+        Returns:
+            pd.DataFrame: One row per symbol, indexed by symbol, with columns
+            such as ``lp``, ``ch``, ``chp``, ``volume`` and ``lp_time``.
+            Invalid symbols are logged and left out. Symbols still incomplete
+            at the timeout keep the fields received so far.
+        """
+        symbols = [format_symbol(s, exchange) if exchange else s for s in symbols]
+        symbols = list(dict.fromkeys(symbols))
+        connection = self.__get_pool().primary
+        snapshot = connection.snapshot_quotes(symbols, timeout, batch_size)
+        return quotes_frame(snapshot)
+
+    def get_hist_many(
+        self,
+        specs: list,
+        n_connections: int = 1,
+        max_concurrent_series: int = 10,
+        concat: bool = False,
+        extended_session: bool = False,
+        timeout: float = None,
+        output: str = "pandas",
+    ):
+        """
+        Fetch history for many symbols concurrently.
+
+        Requests are spread over up to ``n_connections`` pooled websocket
+        connections, each with up to ``max_concurrent_series`` series in
+        flight, both capped by ``self.limits``. ``create_series`` messages
+        are paced by the limits' rate limiter. A failing symbol is
+        recorded and skipped without affecting the rest of the batch.
+        With ``self.parse_pool`` set, finished series are decoded in the
+        pool while further series are sent and received.
+
+        Args:
+            specs (list): (symbol, exchange, interval, n_bars) tuples
+            n_connections (int): Websocket connections to spread the requests over
+            max_concurrent_series (int): Series in flight per connection
+            concat (bool): Return one long-format DataFrame instead of a dict
+            extended_session (bool): Request extended trading hours
+            timeout (float, optional): Idle timeout per series in seconds
+            output (str): ``"pandas"``, ``"pandas_tz"`` or ``"bars"``, as in
+                ``get_hist``; ``concat`` needs one of the DataFrame outputs
+
+        Returns:
+            dict | pd.DataFrame: DataFrames (or ``Bars``) keyed by spec tuple,
+            or all bars concatenated with an ``interval`` column. Per-symbol
+            latency, bar counts and errors are stored in ``self.batch_stats``.
+        """
+        check_output(output)
+        if concat and output == "bars":
+            raise ValueError("concat=True needs output 'pandas' or 'pandas_tz'")
+        if self.token == web.UNAUTHORIZED_TOKEN:
+            logger.warning("Using unauthorized access, data may be limited")
+
+        timeout = self.limits.timeout if timeout is None else timeout
+        pending = collections.deque(dict.fromkeys(tuple(spec) for spec in specs))
+        done = queue.Queue()
+        in_flight = {}
+        parsing = {}
+        results = {}
+        stats = []
+        used = set()
+
+        def record(spec, started, bars=0, error=None):
+            stats.append(batch_stat(spec, started, bars, error))
+
+        while pending or in_flight or parsing:
+            while pending:
+                connection = self.__get_pool().acquire(
+                    block=not in_flight,
+                    max_connections=n_connections,
+                    max_series=max_concurrent_series,
+                )
+                if connection is None:
+                    break
+                used.add(connection)
+                spec = pending.popleft()
+                started = time.perf_counter()
+                try:
+                    symbol, exchange, interval, n_bars = spec
+                    symbol, resolve_payload = prepare_symbol(
+                        symbol, exchange, None, extended_session
+                    )
+                    request = connection.request_series(
+                        symbol, resolve_payload, interval.value, n_bars, done.put
+                    )
+                except Exception as e:
+                    self.__get_pool().release(connection)
+                    record(spec, started, error=e)
+                    continue
+                in_flight[request] = (spec, connection, started)
+
+            if not in_flight and not parsing:
+                continue
+            try:
+                request = done.get(timeout=min(timeout, 1))
+            except queue.Empty:
+                now = time.monotonic()
+                for request, (spec, connection, started) in list(in_flight.items()):
+                    if now - request.last_activity >= timeout:
+                        connection.cancel(
+                            request, TimeoutError("Timed out waiting for series")
+                        )
+                continue
+
+            if request in parsing:
+                spec, started, info = parsing.pop(request)
+                try:
+                    bars = request.result()
+                except Exception as e:
+                    record(spec, started, error=e)
+                    continue
+                data = None if bars is None else build_output(
+                    bars.to_numpy(), bars.symbol, spec[2], output, info
+                )
+            else:
+                spec, connection, started = in_flight.pop(request)
+                self.__get_pool().release(connection)
+                if request.error is not None:
+                    record(spec, started, error=request.error)
+                    continue
+                self.__remember(request)
+                info = request.symbol_info
+                if self.parse_pool is not None:
+                    future = self.parse_pool.submit(request.frames, request.symbol)
+                    parsing[future] = (spec, started, info)
+                    future.add_done_callback(done.put)
+                    continue
+                data = build_output(
+                    decode_bars(request.frames), request.symbol, spec[2], output, info
+                )
+            if data is None:
+                record(spec, started, error="No data")
+                continue
+            record(spec, started, bars=len(data))
+            results[spec] = data
+
+        self.symbol_cache.flush()
+        self.batch_stats = batch_stats_frame(stats)
+        logger.info(
+            f"Fetched {len(results)}/{len(stats)} series over {len(used)} connection(s)"
         )
 
-        self.__send_message(
-            "create_series",
-            [self.chart_session, "s1", "s1", "symbol_1", interval, n_bars],
+        return concat_batch(results) if concat else results
+
+    def get_panel(
+        self,
+        symbols: list,
+        exchange: str = "NSE",
+        interval: Interval = Interval.in_daily,
+        n_bars: int = 5000,
+        fill: str = "ffill",
+        limit: int = None,
+        n_connections: int = 1,
+        max_concurrent_series: int = 10,
+        extended_session: bool = False,
+        timeout: float = None,
+    ) -> Panel:
+        """
+        Fetch a universe of symbols as one panel aligned on a shared time axis.
+
+        The series are fetched like ``get_hist_many`` and merged into a
+        ``Panel`` in one vectorized pass; pass ``panel.on_event`` to
+        ``subscribe`` to keep it current.
+
+        Args:
+            symbols (list): Symbols, e.g. ``["AAPL", "MSFT"]`` or ``["NASDAQ:AAPL"]``
+            exchange (str): Exchange of symbols without one
+            interval (Interval): Bar interval
+            n_bars (int): Number of bars per symbol
+            fill (str): ``"ffill"`` to carry closes over missing bars or ``"nan"``
+            limit (int, optional): Rows a close is carried forward at most
+            n_connections (int): Websocket connections to spread the requests over
+            max_concurrent_series (int): Series in flight per connection
+            extended_session (bool): Request extended trading hours
+            timeout (float, optional): Idle timeout per series in seconds
+
+        Returns:
+            Panel: One column per symbol, all-NaN for symbols that failed
+            (see ``self.batch_stats``)
+        """
+        check_fill(fill)
+        specs = [(symbol, exchange, interval, n_bars) for symbol in symbols]
+        results = self.get_hist_many(
+            specs,
+            n_connections=n_connections,
+            max_concurrent_series=max_concurrent_series,
+            extended_session=extended_session,
+            timeout=timeout,
+            output="bars",
         )
+        return build_panel(specs, results, interval, fill, limit, extended_session)
 
-        self.__send_message("switch_timezone", [self.chart_session, "exchange"])
+    def ingest(
+        self,
+        specs: list,
+        sink,
+        n_workers: int = 1,
+        page_size: int = 5000,
+        extended_session: bool = False,
+        timeout: float = None,
+    ) -> "pd.DataFrame":
+        """
+        Page history for many symbols straight into a sink.
 
-        raw_data = ""
+        Every spec is fetched with ``iter_hist`` and each page is handed to
+        ``sink.write`` as a ``Bars`` batch, so only a few pages per worker
+        are held in memory however long the history is. ``sink.write``
+        blocks while the sink's writer is behind, which also throttles the
+        download. The sink is not closed; close it when done.
 
-        logger.debug(f"Getting data for {symbol}...")
-        while True:
-            try:
-                result = self.ws.recv()
-                raw_data = raw_data + result + "\n"
-            except Exception as e:
-                logger.error(e)
-                break
+        Args:
+            specs (list): (symbol, exchange, interval, n_bars) tuples
+            sink (Sink): Destination, see ``stock_data_realtime.sinks``
+            n_workers (int): Symbols paged concurrently, one connection each
+            page_size (int): Bars requested per page
+            extended_session (bool): Request extended trading hours
+            timeout (float, optional): Idle timeout per page
 
-            if "series_completed" in result:
-                break
+        Returns:
+            pd.DataFrame: Per-symbol latency, bar counts and errors, also
+            stored in ``self.batch_stats``.
+        """
+        from concurrent.futures import ThreadPoolExecutor
 
-        return self.__create_df(raw_data, symbol)
+        def run(spec):
+            symbol, exchange, interval, n_bars = spec
+            started = time.perf_counter()
+            bars = 0
+            key = None
+            try:
+                for page in self.iter_hist(
+                    symbol,
+                    exchange,
+                    interval,
+                    n_bars,
+                    page_size,
+                    extended_session=extended_session,
+                    timeout=timeout,
+                    output="bars",
+                ):
+                    key = (page.symbol, page.interval)
+                    sink.write(page)
+                    bars += len(page)
+                if key is not None:
+                    sink.end(*key)
+            except Exception as e:
+                return batch_stat(spec, started, bars, e)
+            return batch_stat(spec, started, bars, None if bars else "No data")
+
+        specs = list(dict.fromkeys(tuple(spec) for spec in specs))
+        with ThreadPoolExecutor(max(1, n_workers)) as executor:
+            stats = list(executor.map(run, specs))
+        sink.flush()
+        self.symbol_cache.flush()
+
+        self.batch_stats = batch_stats_frame(stats)
+        logger.info(
+            f"Ingested {self.batch_stats['bars'].sum()} bars of {len(stats)} series"
+        )
+        return self.batch_stats
 
     def search_symbol(self, text: str, exchange: str = "", type: str = None):
         """
@@ -383,36 +915,33 @@ class TvDatafeed:
             type (str, optional): Asset type (e.g., stock, futures, crypto)
         
         Returns:
-            list: List of symbol dictionaries
+            list: List of symbol dictionaries. Results are served from
+            ``search_cache`` while fresh, and identical searches running at
+            the same time share one HTTP request.
         """
-        url = "https://symbol-search.tradingview.com/symbol_search"
-        params = {"text": text}
-        if exchange:
-            params["exchange"] = exchange
-        if type:
-            params["type"] = type
-        
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
-            "Referer": "https://www.tradingview.com",
-            "Origin": "https://www.tradingview.com",
-            "Accept": "application/json",
-            "Authorization": f"Bearer {self.token}" if self.token else None
-        }
-        
-        cookies = {"sessionid": self.sessionid, "sessionid_sign": self.sessionid_sign} if (self.sessionid and self.sessionid_sign) else {}
-        resp = requests.get(url, params=params, headers=headers, cookies=cookies)  # Changed to GET
-        
-        symbols_list = []
+        import requests
+
+        key = (text, exchange, type)
         try:
-            resp.raise_for_status()
-            symbols_list = json.loads(resp.text.replace("</em>", "").replace("<em>", ""))
-            logger.debug(f"Search successful for '{text}' on '{exchange}'")
+            symbols_list = self.search_cache.load(key, lambda: self.__search(*key))
+            return list(symbols_list)
         except requests.exceptions.HTTPError as e:
-            logger.error(f"HTTP error during symbol search: {e} - Response: {resp.text}")
+            logger.error(f"HTTP error during symbol search: {e} - Response: {e.response.text}")
         except Exception as e:
             logger.error(f"Error during symbol search: {e}")
-        
+        return []
+
+    def __search(self, text, exchange, type):
+        params = web.search_params(text, exchange, type)
+        headers = web.search_headers(self.token)
+        cookies = web.search_cookies(self.sessionid, self.sessionid_sign)
+        with get_metrics().timer("tv_search_seconds"):
+            resp = self.http.get(
+                web.SEARCH_URL, params=params, headers=headers, cookies=cookies
+            )
+        resp.raise_for_status()
+        symbols_list = web.parse_search_results(resp.text)
+        logger.debug(f"Search successful for '{text}' on '{exchange}'")
         return symbols_list
 
 if __name__ == "__main__":
@@ -0,0 +1,296 @@
+import asyncio
+import collections
+import logging
+import queue
+
+from .protocol import format_symbol, prepare_symbol
+
+logger = logging.getLogger(__name__)
+
+StreamEvent = collections.namedtuple("StreamEvent", ["kind", "symbol", "interval", "data"])
+StreamEvent.__doc__ = """
+Live update from a subscription.
+
+``kind`` is ``"quote"`` or ``"bar"``. Quote events carry the merged
+``quote_set_fields`` values for ``symbol`` in ``data``; bar events carry the
+interval value and the ``[time, open, high, low, close, volume]`` bar.
+"""
+
+
+def bar_values(values) -> list:
+    """
+    ``[time, open, high, low, close, volume]`` floats of a ``du`` bar.
+
+    Symbols without volume are sent as 5-value bars; like ``decode_bars``,
+    their volume is 0.
+    """
+    values = (list(values) + [0.0] * 6)[:6]
+    if values[5] is None:
+        values[5] = 0.0
+    return [float(v) for v in values]
+
+
+def bars_key(symbol, exchange, interval, fut_contract=None, extended_session=False):
+    """The (formatted symbol, interval value) key of a bar series; keys pass through."""
+    if isinstance(symbol, tuple):
+        return symbol
+    return (prepare_symbol(symbol, exchange, fut_contract, extended_session)[0], interval.value)
+
+
+class BaseSubscription:
+    """Bookkeeping shared by the sync and asyncio subscriptions."""
+
+    def __init__(self, connection, callback=None, maxsize: int = 10000):
+        self.connection = connection
+        self.maxsize = maxsize
+        self.dropped = 0
+        self.closed = False
+        self.__callbacks = [callback] if callback else []
+        self._quotes = set()
+        self._bars = {}
+
+    def on_update(self, callback):
+        """Register a callable invoked with every ``StreamEvent``."""
+        self.__callbacks.append(callback)
+        return callback
+
+    @property
+    def symbols(self):
+        return sorted(self._quotes)
+
+    @property
+    def bar_series(self):
+        return sorted(self._bars)
+
+    def _handle(self, event):
+        for callback in self.__callbacks:
+            try:
+                callback(event)
+            except Exception as e:
+                logger.error(f"Error in stream callback: {e}")
+        self._put(event)
+
+    def _put(self, event):
+        raise NotImplementedError
+
+    def _new_quotes(self, symbols, exchange):
+        symbols = [format_symbol(s, exchange) if exchange else s for s in symbols]
+        return [s for s in dict.fromkeys(symbols) if s not in self._quotes]
+
+    def _known_quotes(self, symbols, exchange):
+        symbols = [format_symbol(s, exchange) if exchange else s for s in symbols]
+        return [s for s in dict.fromkeys(symbols) if s in self._quotes]
+
+
+class Subscription(BaseSubscription):
+    """
+    Live quote ticks and bar updates on a TvConnection.
+
+    Updates are passed to any registered callbacks (on the reader thread)
+    and queued for iteration, so a subscription can be consumed either as a
+    blocking generator or callback-driven. When the queue is full the oldest
+    update is dropped and counted in ``dropped``.
+    """
+
+    def __init__(self, connection, callback=None, maxsize: int = 10000):
+        super().__init__(connection, callback, maxsize)
+        self.__queue = queue.Queue(maxsize)
+
+    def add_quotes(self, symbols: list, exchange: str = ""):
+        """Start streaming quote updates (``qsd``) for ``symbols``."""
+        added = self._new_quotes(symbols, exchange)
+        if added:
+            self._quotes.update(added)
+            self.connection.subscribe_quotes(added, self._handle)
+
+    def remove_quotes(self, symbols: list, exchange: str = ""):
+        removed = self._known_quotes(symbols, exchange)
+        if removed:
+            self._quotes.difference_update(removed)
+            self.connection.unsubscribe_quotes(removed, self._handle)
+
+    def add_bars(
+        self,
+        symbol: str,
+        exchange: str,
+        interval,
+        n_bars: int = 1,
+        fut_contract: int = None,
+        extended_session: bool = False,
+    ):
+        """
+        Start streaming bar updates (``du``) for one symbol and interval.
+
+        Args:
+            symbol (str): Symbol, e.g. ``AAPL`` or ``NASDAQ:AAPL``
+            exchange (str): Exchange of the symbol
+            interval (Interval): Bar interval
+            n_bars (int): Historical bars sent before live updates start
+
+        Returns:
+            tuple: (formatted symbol, interval value), the key for ``remove_bars``
+        """
+        symbol, resolve_payload = prepare_symbol(
+            symbol, exchange, fut_contract, extended_session
+        )
+        key = (symbol, interval.value)
+        if key not in self._bars:
+            self._bars[key] = self.connection.request_series(
+                symbol, resolve_payload, interval.value, n_bars, listener=self._handle
+            )
+        return key
+
+    def remove_bars(
+        self,
+        symbol,
+        exchange: str = None,
+        interval=None,
+        fut_contract: int = None,
+        extended_session: bool = False,
+    ):
+        """
+        Stop streaming a series started with ``add_bars``.
+
+        Args:
+            symbol (str | tuple): Symbol as passed to ``add_bars``, or the key it returned
+            exchange (str): Exchange of the symbol
+            interval (Interval): Bar interval
+            fut_contract (int, optional): Continuous contract as passed to ``add_bars``
+            extended_session (bool): As passed to ``add_bars``
+        """
+        key = bars_key(symbol, exchange, interval, fut_contract, extended_session)
+        request = self._bars.pop(key, None)
+        if request is not None:
+            self.connection.cancel(request)
+
+    def get(self, timeout: float = None):
+        """
+        Return the next update, or None if none arrives within ``timeout``.
+        """
+        try:
+            return self.__queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def __iter__(self):
+        while not self.closed:
+            event = self.get(timeout=1)
+            if event is not None:
+                yield event
+
+    def close(self):
+        """Unsubscribe everything; the connection itself stays open."""
+        self.closed = True
+        if self._quotes:
+            self.connection.unsubscribe_quotes(list(self._quotes), self._handle)
+            self._quotes.clear()
+        for request in self._bars.values():
+            self.connection.cancel(request)
+        self._bars.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _put(self, event):
+        while True:
+            try:
+                self.__queue.put_nowait(event)
+                return
+            except queue.Full:
+                try:
+                    self.__queue.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+
+class AsyncSubscription(BaseSubscription):
+    """asyncio counterpart of Subscription, consumed with ``async for``."""
+
+    def __init__(self, connection, callback=None, maxsize: int = 10000):
+        super().__init__(connection, callback, maxsize)
+        self.__queue = asyncio.Queue(maxsize)
+
+    async def add_quotes(self, symbols: list, exchange: str = ""):
+        added = self._new_quotes(symbols, exchange)
+        if added:
+            self._quotes.update(added)
+            await self.connection.subscribe_quotes(added, self._handle)
+
+    async def remove_quotes(self, symbols: list, exchange: str = ""):
+        removed = self._known_quotes(symbols, exchange)
+        if removed:
+            self._quotes.difference_update(removed)
+            await self.connection.unsubscribe_quotes(removed, self._handle)
+
+    async def add_bars(
+        self,
+        symbol: str,
+        exchange: str,
+        interval,
+        n_bars: int = 1,
+        fut_contract: int = None,
+        extended_session: bool = False,
+    ):
+        symbol, resolve_payload = prepare_symbol(
+            symbol, exchange, fut_contract, extended_session
+        )
+        key = (symbol, interval.value)
+        if key not in self._bars:
+            self._bars[key] = await self.connection.request_series(
+                symbol, resolve_payload, interval.value, n_bars, listener=self._handle
+            )
+        return key
+
+    async def remove_bars(
+        self,
+        symbol,
+        exchange: str = None,
+        interval=None,
+        fut_contract: int = None,
+        extended_session: bool = False,
+    ):
+        key = bars_key(symbol, exchange, interval, fut_contract, extended_session)
+        request = self._bars.pop(key, None)
+        if request is not None:
+            self.connection.cancel(request)
+
+    async def get(self, timeout: float = None):
+        try:
+            return await asyncio.wait_for(self.__queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        while not self.closed:
+            event = await self.get(timeout=1)
+            if event is not None:
+                return event
+        raise StopAsyncIteration
+
+    async def close(self):
+        self.closed = True
+        if self._quotes:
+            await self.connection.unsubscribe_quotes(list(self._quotes), self._handle)
+            self._quotes.clear()
+        for request in self._bars.values():
+            self.connection.cancel(request)
+        self._bars.clear()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    def _put(self, event):
+        if self.__queue.full():
+            self.__queue.get_nowait()
+            self.dropped += 1
+        self.__queue.put_nowait(event)
@@ -0,0 +1,225 @@
+import asyncio
+import os
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+import pandas as pd
+
+from src.stock_data_realtime.async_stock_data import AsyncTvDatafeed, aiohttp
+from src.stock_data_realtime.cache import SymbolCache
+from src.stock_data_realtime.limits import ConnectionLimits
+from src.stock_data_realtime.parse_pool import ParsePool
+from src.stock_data_realtime.protocol import create_message
+from src.stock_data_realtime.stock_data import Interval
+from src.stock_data_realtime.test_connection import FakeWebSocket
+from src.stock_data_realtime.test_stock_data import TokenWebSocket
+from src.stock_data_realtime.test_streaming import QuoteWebSocket
+from src.stock_data_realtime.token_store import TokenStore, token_key
+from src.stock_data_realtime.wire_log import RECEIVED, SENT, WireLog, WireRecorder
+
+
+class FakeAsyncWebSocket(FakeWebSocket):
+    """aiohttp-flavoured FakeWebSocket: send_str/receive instead of send/recv."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.queue = asyncio.Queue()
+
+    def push(self, method, params):
+        self.queue.put_nowait(
+            SimpleNamespace(type=aiohttp.WSMsgType.TEXT, data=create_message(method, params))
+        )
+
+    async def send_str(self, message):
+        self.send(message)
+
+    async def receive(self):
+        return await self.queue.get()
+
+    async def close(self):
+        self.closed = True
+        self.queue.put_nowait(SimpleNamespace(type=aiohttp.WSMsgType.CLOSED, data=None))
+
+
+class QuoteAsyncWebSocket(FakeAsyncWebSocket, QuoteWebSocket):
+    pass
+
+
+class TokenAsyncWebSocket(FakeAsyncWebSocket, TokenWebSocket):
+    pass
+
+
+class CountingAsyncWebSocket(FakeAsyncWebSocket):
+    """Records the most series open at once: created but not yet completed on the client."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.open = 0
+        self.peak = 0
+
+    def on_message(self, method, params):
+        if method == "create_series":
+            self.open += 1
+            self.peak = max(self.peak, self.open)
+        super().on_message(method, params)
+
+    async def receive(self):
+        msg = await super().receive()
+        if msg.data is not None and "series_completed" in msg.data:
+            self.open -= 1
+        return msg
+
+
+class FakeHttp:
+    def __init__(self, socket_class=FakeAsyncWebSocket, **kwargs):
+        self.sockets = []
+        self.socket_class = socket_class
+        self.kwargs = kwargs
+
+    async def ws_connect(self, url, **kwargs):
+        self.sockets.append(self.socket_class(**self.kwargs))
+        return self.sockets[-1]
+
+    async def close(self):
+        pass
+
+
+@unittest.skipIf(aiohttp is None, "aiohttp is not installed")
+class TestAsyncTvDatafeed(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.http = FakeHttp(errors={"NASDAQ:BAD"})
+        patcher = patch.object(aiohttp, "ClientSession", return_value=self.http)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = tmp.name
+        self.tv = AsyncTvDatafeed(
+            limits=ConnectionLimits(create_series_rate=None),
+            symbol_cache=SymbolCache(os.path.join(tmp.name, "symbols.json")),
+        )
+        self.tv.token = "test_token"
+
+    async def asyncTearDown(self):
+        await self.tv.close()
+
+    async def test_get_hist(self):
+        """get_hist returns the same DataFrame shape as the sync client."""
+        df = await self.tv.get_hist("AAPL", "NASDAQ", Interval.in_daily, n_bars=1)
+        self.assertIsInstance(df, pd.DataFrame)
+        self.assertEqual(list(df.columns),
+                         ["symbol", "Time", "Open", "High", "Low", "Close", "Volume"])
+        self.assertEqual(df["symbol"].iloc[0], "NASDAQ:AAPL")
+        self.assertEqual(df.attrs["symbol_info"]["pricescale"], 100)
+        info = await self.tv.symbol_info("AAPL", "NASDAQ")
+        self.assertEqual(info["timezone"], "America/New_York")
+        self.assertEqual(self.http.sockets[0].methods().count("create_series"), 1)
+
+    async def test_malformed_frames_keep_the_reader_alive(self):
+        await self.tv.get_hist("AAPL", "NASDAQ", n_bars=1)
+        ws = self.http.sockets[0]
+        ws.push("series_completed", [])
+        ws.push("timescale_update", ["cs", 5])
+        df = await self.tv.get_hist("MSFT", "NASDAQ", n_bars=1)
+        self.assertEqual(df["symbol"].iloc[0], "NASDAQ:MSFT")
+        self.assertEqual(len(self.http.sockets), 1)
+
+    async def test_recorder_logs_both_directions(self):
+        path = os.path.join(self.tmp, "wire.log")
+        with WireRecorder(path) as recorder:
+            self.tv.recorder = recorder
+            await self.tv.get_hist("AAPL", "NASDAQ", n_bars=1)
+        with WireLog(path) as log:
+            sent = [t for _, _, d, t in log if d == SENT]
+            received = "".join(t for _, _, d, t in log if d == RECEIVED)
+        self.assertIn("create_series", sent[6])
+        self.assertIn("timescale_update", received)
+
+    async def test_concurrent_get_hist_respects_connection_limits(self):
+        """Concurrent requests spread over max_connections sockets, each below its series cap."""
+        self.http.socket_class = CountingAsyncWebSocket
+        self.tv.limits = ConnectionLimits(
+            create_series_rate=None, max_connections=2, max_series_per_connection=5
+        )
+        symbols = [f"SYM{i}" for i in range(50)]
+        frames = await asyncio.gather(
+            *(self.tv.get_hist(s, "NASDAQ", n_bars=1) for s in symbols)
+        )
+        self.assertTrue(all(len(df) == 1 for df in frames))
+        self.assertEqual(len(self.http.sockets), 2)
+        for ws in self.http.sockets:
+            self.assertLessEqual(ws.peak, 5)
+            self.assertEqual(ws.methods().count("set_auth_token"), 1)
+
+    async def test_rejected_token_is_refreshed_once(self):
+        """Concurrent requests rejected for auth sign in once and retry with the new token."""
+        self.http.socket_class = TokenAsyncWebSocket
+        self.http.kwargs = {"rejected": "rejected_token"}
+        store = TokenStore(os.path.join(self.tmp, "tv_token.json"))
+        store.put(token_key("test_user", None), "rejected_token")
+        tv = AsyncTvDatafeed(
+            username="test_user",
+            password="test_pass",
+            limits=ConnectionLimits(create_series_rate=None),
+            token_store=store,
+            symbol_cache=self.tv.symbol_cache,
+        )
+        self.addAsyncCleanup(tv.close)
+        with patch.object(
+            AsyncTvDatafeed, "_AsyncTvDatafeed__auth", AsyncMock(return_value="new_token")
+        ) as mock_auth:
+            frames = await asyncio.gather(
+                *(tv.get_hist(f"SYM{i}", "NASDAQ", n_bars=1) for i in range(8))
+            )
+            tokens = await asyncio.gather(*(tv.refresh_token("rejected_token") for _ in range(5)))
+        mock_auth.assert_awaited_once()
+        self.assertTrue(all(df is not None and len(df) == 1 for df in frames))
+        self.assertEqual(set(tokens), {"new_token"})
+        self.assertTrue(all(ws.token == "new_token" for ws in self.http.sockets))
+
+    async def test_get_hist_many_isolates_errors(self):
+        """A bad ticker is recorded in batch_stats without failing the batch."""
+        specs = [(s, "NASDAQ", Interval.in_daily, 5) for s in ["AAPL", "BAD", "MSFT"]]
+        result = await self.tv.get_hist_many(specs, n_connections=2)
+        self.assertEqual(set(result), {specs[0], specs[2]})
+        self.assertEqual(len(self.tv.batch_stats), 3)
+        self.assertEqual(len(self.http.sockets), 2)
+
+    async def test_get_hist_many_with_parse_pool(self):
+        """Decoding can be moved off the event loop into a parse pool."""
+        specs = [(s, "NASDAQ", Interval.in_daily, 5) for s in ["AAPL", "MSFT"]]
+        with ParsePool(2, processes=False) as pool:
+            self.tv.parse_pool = pool
+            result = await self.tv.get_hist_many(specs)
+        self.assertEqual(set(result), set(specs))
+        self.assertEqual(result[specs[0]]["symbol"].iloc[0], "NASDAQ:AAPL")
+
+    async def test_get_quotes(self):
+        """One quote session answers a whole universe in a single DataFrame."""
+        self.http.socket_class = QuoteAsyncWebSocket
+        df = await self.tv.get_quotes(["AAPL", "MSFT", "BAD"], "NASDAQ", batch_size=2)
+        self.assertEqual(list(df.index), ["NASDAQ:AAPL", "NASDAQ:MSFT"])
+        self.assertEqual(list(df.columns[:2]), ["ch", "lp"])
+        self.assertEqual(len(self.http.sockets), 1)
+        self.assertNotIn("create_series", self.http.sockets[0].methods())
+
+    async def test_subscribe_quotes(self):
+        """Quote ticks can be consumed with async for."""
+        sub = await self.tv.subscribe()
+        await sub.add_quotes(["AAPL"], "NASDAQ")
+        ws = self.http.sockets[0]
+        for price in (1.0, 2.0):
+            ws.push("qsd", [ws.sent[2]["p"][0], {"n": "NASDAQ:AAPL", "s": "ok", "v": {"lp": price}}])
+        prices = []
+        async for event in sub:
+            prices.append(event.data["lp"])
+            if len(prices) == 2:
+                break
+        await sub.close()
+        self.assertEqual(prices, [1.0, 2.0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,57 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from src.stock_data_realtime.bars import Bars
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+
+class TestBars(unittest.TestCase):
+    def setUp(self):
+        values = np.arange(30, dtype=np.float64).reshape(5, 6)
+        values[:, 0] = 1625097600 + 60 * np.arange(5)
+        self.values = values
+        self.bars = Bars.from_values(values, "NASDAQ:AAPL", "1")
+
+    def test_columns(self):
+        self.assertEqual(self.bars.time.dtype, np.int64)
+        np.testing.assert_array_equal(self.bars.close, self.values[:, 4])
+        np.testing.assert_array_equal(self.bars.to_numpy(), self.values)
+        self.assertEqual(self.bars.nbytes, 5 * 8 * 6)
+
+    def test_slice_is_a_view(self):
+        last = self.bars[-2:]
+        self.assertEqual(len(last), 2)
+        self.assertEqual(last.symbol, "NASDAQ:AAPL")
+        self.assertTrue(np.shares_memory(last.volume, self.bars.volume))
+
+    def test_to_pandas_is_zero_copy(self):
+        df = self.bars.to_pandas()
+        self.assertEqual(list(df.columns), ["Open", "High", "Low", "Close", "Volume"])
+        self.assertEqual(df.index[0], pd.Timestamp(1625097600, unit="s"))
+        self.assertTrue(np.shares_memory(df["Close"].to_numpy(), self.bars.close))
+        self.assertTrue(np.shares_memory(df.index.asi8, self.bars.time))
+
+    def test_to_pandas_in_timezone(self):
+        self.bars.info = {"timezone": "America/New_York"}
+        df = self.bars.to_pandas(timezone="exchange")
+        self.assertEqual(df.index[0], pd.Timestamp("2021-06-30 20:00", tz="America/New_York"))
+        np.testing.assert_array_equal(df.index.asi8, self.bars.time)
+        self.assertEqual(str(Bars.from_values(self.values, "X").to_pandas("exchange").index.tz), "UTC")
+
+    @unittest.skipIf(pyarrow is None, "pyarrow is not installed")
+    def test_to_arrow_is_zero_copy(self):
+        table = self.bars.to_arrow()
+        self.assertEqual(table.schema.metadata[b"symbol"], b"NASDAQ:AAPL")
+        self.assertTrue(
+            np.shares_memory(table["close"].chunk(0).to_numpy(), self.bars.close)
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,282 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import Mock, patch
+
+import numpy as np
+
+from src.stock_data_realtime.cache import BarCache, SearchCache, SymbolCache
+from src.stock_data_realtime.protocol import prepare_symbol
+from src.stock_data_realtime.stock_data import TvDatafeed, Interval
+from src.stock_data_realtime.test_connection import FakeWebSocket, symbol_info
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+
+def daily_bars(n, end=None):
+    end = int(end if end is not None else time.time()) // 86400 * 86400
+    times = end - 86400 * np.arange(n)[::-1]
+    values = np.ones((n, 6))
+    values[:, 0] = times
+    values[:, 4] = np.arange(n)
+    return values
+
+
+class HistoryWebSocket(FakeWebSocket):
+    """Serves the last n daily bars up to today and records each n_bars asked for."""
+
+    def __init__(self):
+        super().__init__()
+        self.requested = []
+
+    def on_message(self, method, params):
+        if method != "create_series":
+            return super().on_message(method, params)
+        cs, series_id, n_bars = params[0], params[1], params[5]
+        self.requested.append(n_bars)
+        rows = [{"i": i, "v": v.tolist()} for i, v in enumerate(daily_bars(n_bars))]
+        self.push("timescale_update", [cs, {series_id: {"node": "n", "s": rows}}])
+        self.push("series_completed", [cs, series_id, "streaming"])
+
+
+class TestBarCache(unittest.TestCase):
+    def setUp(self):
+        temp = tempfile.TemporaryDirectory()
+        self.addCleanup(temp.cleanup)
+        self.directory = temp.name
+
+    def test_round_trip(self):
+        """Bars come back exactly as stored, in every supported format."""
+        values = daily_bars(5)
+        formats = ["npy"] + (["parquet", "feather"] if pyarrow else [])
+        for fmt in formats:
+            with self.subTest(format=fmt):
+                cache = BarCache(self.directory, format=fmt)
+                self.assertIsNone(cache.get("NASDAQ:AAPL", "payload", "1D"))
+                cache.put("NASDAQ:AAPL", "payload", "1D", values)
+                np.testing.assert_array_equal(cache.get("NASDAQ:AAPL", "payload", "1D"), values)
+                self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    def test_key_includes_session_and_interval(self):
+        cache = BarCache(self.directory, format="npy")
+        cache.put("NASDAQ:AAPL", "regular", "1D", daily_bars(1))
+        self.assertIsNone(cache.get("NASDAQ:AAPL", "extended", "1D"))
+        self.assertIsNone(cache.get("NASDAQ:AAPL", "regular", "1W"))
+
+    def test_eviction(self):
+        """Expired entries are dropped, then the oldest until under max_bytes."""
+        cache = BarCache(self.directory, max_age=60, format="npy")
+        for i, symbol in enumerate(["A", "B", "C"]):
+            cache.put(symbol, "p", "1D", daily_bars(100))
+            path = cache.path(symbol, "p", "1D")
+            os.utime(path, (time.time() - 90 + 20 * i,) * 2)
+        self.assertIsNone(cache.get("A", "p", "1D"))
+
+        cache.max_bytes = os.path.getsize(cache.path("B", "p", "1D"))
+        cache.evict()
+        self.assertIsNone(cache.get("B", "p", "1D"))
+        self.assertIsNotNone(cache.get("C", "p", "1D"))
+
+
+class TestCachedGetHist(unittest.TestCase):
+    def setUp(self):
+        temp = tempfile.TemporaryDirectory()
+        self.addCleanup(temp.cleanup)
+        self.ws = HistoryWebSocket()
+        patcher = patch(
+            "src.stock_data_realtime.connection.create_connection", return_value=self.ws
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.tv = TvDatafeed(
+            cache=BarCache(temp.name, format="npy"),
+            symbol_cache=SymbolCache(os.path.join(temp.name, "symbols.json")),
+        )
+        self.addCleanup(self.tv.close)
+
+    def test_second_fetch_only_tops_up(self):
+        first = self.tv.get_hist("AAPL", "NASDAQ", Interval.in_daily, n_bars=50)
+        second = self.tv.get_hist("AAPL", "NASDAQ", Interval.in_daily, n_bars=50)
+        self.assertEqual(self.ws.requested[0], 50)
+        self.assertLessEqual(self.ws.requested[1], 3)
+        self.assertEqual(len(second), 50)
+        self.assertEqual(second.index[-1], first.index[-1])
+
+    def test_use_cache_false_bypasses(self):
+        self.tv.get_hist("AAPL", "NASDAQ", n_bars=20)
+        self.tv.get_hist("AAPL", "NASDAQ", n_bars=20, use_cache=False)
+        self.assertEqual(self.ws.requested, [20, 20])
+        self.assertEqual(self.tv.cache.hits + self.tv.cache.misses, 1)
+
+    def test_larger_request_refetches(self):
+        self.tv.get_hist("AAPL", "NASDAQ", n_bars=10)
+        df = self.tv.get_hist("AAPL", "NASDAQ", n_bars=30)
+        self.assertEqual(self.ws.requested, [10, 30])
+        self.assertEqual(len(df), 30)
+
+    def test_stale_entry_is_replaced_not_merged(self):
+        """A cache entry that the fresh window does not reach is replaced, leaving no gap."""
+        symbol, payload = prepare_symbol("AAPL", "NASDAQ", None, False)
+        self.tv.cache.put(symbol, payload, "1D", daily_bars(100, end=time.time() - 200 * 86400))
+        self.tv.get_hist("AAPL", "NASDAQ", n_bars=50)
+        self.assertEqual(self.ws.requested, [50])  # the first fetch already covers the window
+        self.assertEqual(len(self.tv.cache.get(symbol, payload, "1D")), 50)
+
+        df = self.tv.get_hist("AAPL", "NASDAQ", n_bars=120)
+        self.assertEqual(self.ws.requested, [50, 120])
+        self.assertEqual(set(df.index.to_series().diff().dropna().dt.days), {1})
+
+
+class TestSymbolCache(unittest.TestCase):
+    def setUp(self):
+        temp = tempfile.TemporaryDirectory()
+        self.addCleanup(temp.cleanup)
+        self.path = os.path.join(temp.name, "symbols.json")
+        self.payload = '={"symbol":"NASDAQ:AAPL","adjustment":"splits","session":"regular"}'
+
+    def test_entries_are_shared_and_trimmed(self):
+        cache = SymbolCache(self.path)
+        self.assertIsNone(cache.get(self.payload))
+        cache.put(self.payload, symbol_info("NASDAQ:AAPL"))
+        self.assertIsNone(SymbolCache(self.path).get(self.payload))
+        cache.flush()
+        info = SymbolCache(self.path).get(self.payload)
+        self.assertEqual(info["pricescale"], 100)
+        self.assertEqual(info["timezone"], "America/New_York")
+        self.assertNotIn("subsessions", info)
+        self.assertEqual((cache.hits, cache.misses), (0, 1))
+
+    def test_expired_entries_are_dropped(self):
+        cache = SymbolCache(self.path, max_age=60)
+        cache.put(self.payload, symbol_info("NASDAQ:AAPL"))
+        cache.flush()
+        with patch("time.time", return_value=time.time() + 61):
+            self.assertIsNone(cache.get(self.payload))
+            self.assertIsNone(SymbolCache(self.path, max_age=60).get(self.payload))
+
+    def test_unchanged_entries_are_not_rewritten(self):
+        cache = SymbolCache(self.path)
+        cache.put(self.payload, symbol_info("NASDAQ:AAPL"))
+        cache.flush()
+        mtime = os.stat(self.path).st_mtime_ns
+        with patch.object(SymbolCache, "_SymbolCache__dump") as dump:
+            cache.put(self.payload, symbol_info("NASDAQ:AAPL"))
+            cache.flush()
+        dump.assert_not_called()
+        self.assertEqual(os.stat(self.path).st_mtime_ns, mtime)
+
+    def test_puts_are_written_once_per_flush(self):
+        """A batch of new symbols rewrites the file once, and misses do not re-parse it."""
+        other = SymbolCache(self.path)
+        other.put("other", symbol_info("NYSE:IBM"))
+        other.flush()
+        cache = SymbolCache(self.path)
+        payloads = [self.payload.replace("AAPL", f"S{i}") for i in range(50)]
+        with patch.object(SymbolCache, "_SymbolCache__dump", autospec=True,
+                          side_effect=SymbolCache._SymbolCache__dump) as dump, \
+             patch.object(SymbolCache, "_SymbolCache__read", autospec=True,
+                          side_effect=SymbolCache._SymbolCache__read) as read:
+            for payload in payloads:
+                self.assertIsNone(cache.get(payload))
+                cache.put(payload, symbol_info("NASDAQ:AAPL"))
+            self.assertEqual((dump.call_count, read.call_count), (0, 1))
+            cache.flush()
+            self.assertEqual(dump.call_count, 1)
+        stored = SymbolCache(self.path)
+        self.assertIsNotNone(stored.get("other"))
+        self.assertTrue(all(stored.get(payload) for payload in payloads))
+
+        cache = SymbolCache(self.path, flush_interval=0)
+        cache.put(self.payload, symbol_info("NASDAQ:AAPL"))
+        self.assertIsNotNone(SymbolCache(self.path).get(self.payload))
+
+    def test_get_hist_attaches_metadata(self):
+        cache = SymbolCache(self.path)
+        with patch(
+            "src.stock_data_realtime.connection.create_connection", return_value=FakeWebSocket()
+        ):
+            tv = TvDatafeed(symbol_cache=cache)
+            self.addCleanup(tv.close)
+            df = tv.get_hist("AAPL", "NASDAQ", n_bars=1)
+            bars = tv.get_hist("AAPL", "NASDAQ", n_bars=1, output="bars")
+            tv.close()
+        self.assertEqual(df.attrs["symbol_info"]["type"], "stock")
+        self.assertEqual(bars.info, df.attrs["symbol_info"])
+        self.assertEqual(bars[-1:].info, bars.info)
+
+        # another client reads it from the file without connecting
+        with patch("src.stock_data_realtime.connection.create_connection") as connect:
+            other = TvDatafeed(symbol_cache=SymbolCache(self.path))
+            info = other.symbol_info("AAPL", "NASDAQ")
+        connect.assert_not_called()
+        self.assertEqual(info["session"], "0930-1600")
+
+
+class TestSearchCache(unittest.TestCase):
+    def test_lru_and_ttl(self):
+        cache = SearchCache(maxsize=2, ttl=60)
+        cache.put("a", [1])
+        cache.put("b", [2])
+        cache.get("a")
+        cache.put("c", [3])
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), [1])
+        cache.ttl = 0
+        time.sleep(0.01)
+        self.assertIsNone(cache.get("c"))
+        self.assertEqual((cache.hits, cache.misses), (2, 2))
+
+    def test_concurrent_loads_share_one_call(self):
+        cache = SearchCache()
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+
+        def loader():
+            calls.append(1)
+            started.set()
+            release.wait(1)
+            return ["AAPL"]
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(cache.load("k", loader)))
+            for _ in range(5)
+        ]
+        threads[0].start()
+        started.wait(1)
+        for thread in threads[1:]:
+            thread.start()
+        release.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [["AAPL"]] * 5)
+
+    def test_failures_are_not_cached(self):
+        cache = SearchCache()
+        with self.assertRaises(ValueError):
+            cache.load("k", Mock(side_effect=ValueError))
+        self.assertEqual(cache.load("k", lambda: [1]), [1])
+
+    def test_search_symbol_uses_cache_and_session(self):
+        temp = tempfile.TemporaryDirectory()
+        self.addCleanup(temp.cleanup)
+        tv = TvDatafeed(symbol_cache=SymbolCache(os.path.join(temp.name, "symbols.json")))
+        self.addCleanup(tv.close)
+        response = Mock(text='[{"symbol": "<em>AAPL</em>"}]')
+        with patch.object(tv.http, "get", return_value=response) as get:
+            for _ in range(3):
+                self.assertEqual(tv.search_symbol("AAPL", "NASDAQ"), [{"symbol": "AAPL"}])
+            tv.search_symbol("AAPL", "NYSE")
+        self.assertEqual(get.call_count, 2)
+        self.assertEqual(tv.search_cache.hits, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
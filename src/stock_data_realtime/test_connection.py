@@ -0,0 +1,239 @@
+import json
+import queue
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+from websocket import WebSocketTimeoutException, WebSocketConnectionClosedException
+
+from src.stock_data_realtime.connection import TvConnection
+from src.stock_data_realtime.protocol import (
+    create_message,
+    is_heartbeat,
+    prepend_header,
+    split_frames,
+)
+
+
+def symbol_info(symbol):
+    return {
+        "pro_name": symbol,
+        "type": "stock",
+        "timezone": "America/New_York",
+        "session": "0930-1600",
+        "pricescale": 100,
+        "minmov": 1,
+        "subsessions": [{"id": "regular"}],
+    }
+
+
+class FakeWebSocket:
+    """Answers create_series with one bar and series_completed, like TradingView."""
+
+    def __init__(self, bars=None, errors=None):
+        self.sent = []
+        self.bars = bars or {}
+        self.errors = errors or set()
+        self.inbox = queue.Queue()
+        self.closed = False
+        self.symbols = {}
+        self.heartbeats = []
+
+    def send(self, message):
+        if self.closed:
+            raise WebSocketConnectionClosedException("closed")
+        for frame in split_frames(message):
+            if is_heartbeat(frame):
+                self.heartbeats.append(frame)
+                continue
+            msg = json.loads(frame)
+            self.sent.append(msg)
+            self.on_message(msg["m"], msg["p"])
+
+    def on_message(self, method, params):
+        if method == "resolve_symbol":
+            symbol = self.symbols[params[1]] = json.loads(params[2][1:])["symbol"]
+            if symbol not in self.errors:
+                self.push("symbol_resolved", [params[0], params[1], symbol_info(symbol)])
+        elif method == "create_series":
+            cs, series_id, symbol_id = params[0], params[1], params[3]
+            symbol = self.symbols[symbol_id]
+            if symbol in self.errors:
+                self.push("symbol_error", [cs, symbol_id, "invalid symbol"])
+                return
+            close = self.bars.get(symbol, 100.0)
+            bar = {"i": 0, "v": [1625097600, close, close + 1, close - 1, close, 1000]}
+            self.push(
+                "timescale_update",
+                [cs, {series_id: {"node": "n", "s": [bar], "ns": {"d": ""}}}],
+            )
+            self.push("series_completed", [cs, series_id, "streaming"])
+
+    def push(self, method, params):
+        self.inbox.put(create_message(method, params))
+
+    def recv(self):
+        if self.closed:
+            raise WebSocketConnectionClosedException("closed")
+        try:
+            message = self.inbox.get(timeout=0.05)
+        except queue.Empty:
+            raise WebSocketTimeoutException("timeout")
+        if isinstance(message, Exception):
+            raise message
+        return message
+
+    def close(self):
+        self.closed = True
+
+    def methods(self):
+        return [m["m"] for m in self.sent]
+
+
+class TestTvConnection(unittest.TestCase):
+    def setUp(self):
+        self.sockets = []
+        patcher = patch(
+            "src.stock_data_realtime.connection.create_connection",
+            side_effect=self.new_socket,
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.conn = TvConnection("token", "qs_test", "cs_test", timeout=1)
+        self.addCleanup(self.conn.close)
+
+    def new_socket(self, *args, **kwargs):
+        ws = FakeWebSocket(bars={"NASDAQ:AAPL": 190.0, "NASDAQ:MSFT": 410.0})
+        self.sockets.append(ws)
+        return ws
+
+    def fetch(self, symbol):
+        payload = '={"symbol":"' + symbol + '","adjustment":"splits"}'
+        request = self.conn.request_series(symbol, payload, "1D", 10)
+        return self.conn.wait(request)
+
+    def test_authenticates_once_for_many_series(self):
+        """Several series reuse one socket and one set of sessions."""
+        for symbol in ["NASDAQ:AAPL", "NASDAQ:MSFT", "NASDAQ:AAPL"]:
+            request = self.fetch(symbol)
+            self.assertIsNone(request.error)
+        self.assertEqual(len(self.sockets), 1)
+        methods = self.sockets[0].methods()
+        self.assertEqual(methods.count("set_auth_token"), 1)
+        self.assertEqual(methods.count("chart_create_session"), 1)
+        self.assertEqual(methods.count("create_series"), 3)
+
+    def test_unique_series_ids(self):
+        """Every request gets its own series and symbol ids."""
+        first = self.fetch("NASDAQ:AAPL")
+        second = self.fetch("NASDAQ:MSFT")
+        self.assertNotEqual(first.series_id, second.series_id)
+        self.assertNotEqual(first.symbol_id, second.symbol_id)
+
+    def test_routes_frames_by_series_id(self):
+        """Concurrent requests only see their own timescale_update frames."""
+        requests = [
+            self.conn.request_series(s, '={"symbol":"' + s + '"}', "1D", 10)
+            for s in ["NASDAQ:AAPL", "NASDAQ:MSFT"]
+        ]
+        for request in requests:
+            self.conn.wait(request)
+        self.assertIn("190.0", requests[0].frames[0])
+        self.assertIn("410.0", requests[1].frames[0])
+        self.assertNotIn(requests[1].series_id, requests[0].frames[0])
+
+    def test_symbol_error_fails_only_that_request(self):
+        """A symbol error is reported on the request that caused it."""
+        self.conn.connect()
+        self.sockets[0].errors.add("NASDAQ:BAD")
+        bad = self.fetch("NASDAQ:BAD")
+        good = self.fetch("NASDAQ:AAPL")
+        self.assertIsInstance(bad.error, ValueError)
+        self.assertIsNone(good.error)
+
+    def test_resolved_symbols_are_reused(self):
+        """A symbol resolved on the session is not resolved again."""
+        first = self.fetch("NASDAQ:AAPL")
+        second = self.fetch("NASDAQ:AAPL")
+        self.assertIsNone(second.error)
+        self.assertEqual(second.symbol_id, first.symbol_id)
+        self.assertEqual(first.symbol_info["pricescale"], 100)
+        self.assertEqual(second.symbol_info, first.symbol_info)
+        self.assertEqual(self.sockets[0].methods().count("resolve_symbol"), 1)
+        self.fetch("NASDAQ:MSFT")
+        self.assertEqual(self.sockets[0].methods().count("resolve_symbol"), 2)
+
+    def test_symbols_are_resolved_again_after_reconnect(self):
+        self.fetch("NASDAQ:AAPL")
+        self.sockets[0].inbox.put(WebSocketConnectionClosedException("dropped"))
+        for _ in range(50):
+            if len(self.sockets) > 1:
+                break
+            time.sleep(0.01)
+        request = self.fetch("NASDAQ:AAPL")
+        self.assertIsNone(request.error)
+        self.assertIn("resolve_symbol", self.sockets[1].methods())
+
+    def test_reconnects_and_resubscribes(self):
+        """A dropped socket is replaced and pending series are sent again."""
+        self.conn.connect()
+        first = self.sockets[0]
+        first.on_message = lambda method, params: None
+        request = self.conn.request_series(
+            "NASDAQ:AAPL", '={"symbol":"NASDAQ:AAPL"}', "1D", 10
+        )
+        first.inbox.put(WebSocketConnectionClosedException("dropped"))
+        self.conn.wait(request)
+        self.assertIsNone(request.error)
+        self.assertEqual(self.conn.reconnects, 1)
+        self.assertEqual(len(self.sockets), 2)
+        self.assertIn("create_series", self.sockets[1].methods())
+        self.assertTrue(request.frames)
+
+    def test_close_fails_pending_requests(self):
+        """Closing the connection releases anyone waiting on it."""
+        self.conn.connect()
+        self.sockets[0].on_message = lambda method, params: None
+        request = self.conn.request_series(
+            "NASDAQ:AAPL", '={"symbol":"NASDAQ:AAPL"}', "1D", 10
+        )
+        threading.Timer(0.1, self.conn.close).start()
+        self.conn.wait(request)
+        self.assertIsInstance(request.error, ConnectionError)
+
+    def test_echoes_heartbeats(self):
+        """~h~ frames are answered so the server keeps the session open."""
+        self.conn.connect()
+        ws = self.sockets[0]
+        ws.inbox.put(prepend_header("~h~1") + prepend_header("~h~2"))
+        request = self.fetch("NASDAQ:AAPL")
+        self.assertIsNone(request.error)
+        self.assertEqual(ws.heartbeats, ["~h~1", "~h~2"])
+        self.assertEqual(self.conn.heartbeats, 2)
+
+    def test_malformed_frames_keep_the_reader_alive(self):
+        """A truncated built-in frame is logged and later fetches still work."""
+        self.conn.connect()
+        ws = self.sockets[0]
+        with self.assertLogs("src.stock_data_realtime.connection", "ERROR"):
+            for frame in ('{"m":"series_completed","p":[]}', '{"m":"timescale_update","p":["cs_test",5]}'):
+                ws.inbox.put(prepend_header(frame))
+            request = self.fetch("NASDAQ:AAPL")
+        self.assertIsNone(request.error)
+        self.assertTrue(request.frames)
+        self.assertEqual(len(self.sockets), 1)
+
+    def test_custom_message_handlers(self):
+        """Handlers registered with on() see messages of their type."""
+        seen = []
+        self.conn.on("symbol_resolved", lambda params, frame: seen.append(params))
+        self.conn.connect()
+        self.sockets[0].push("symbol_resolved", ["cs_test", "symbol_1", {"pricescale": 100}])
+        self.fetch("NASDAQ:AAPL")
+        self.assertEqual(seen[0], ["cs_test", "symbol_1", {"pricescale": 100}])
+        self.assertEqual(len(seen), 2)  # and the answer to resolve_symbol
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,81 @@
+import datetime
+import json
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from src.stock_data_realtime.decode import bars_to_tz_df, create_df, decode_bars, local_seconds
+from src.stock_data_realtime.protocol import prepend_header
+
+
+def series_frame(bars, method="timescale_update", series_id="s1"):
+    rows = [{"i": i, "v": v} for i, v in enumerate(bars)]
+    return json.dumps(
+        {"m": method, "p": ["cs_test", {series_id: {"node": "n", "s": rows}}]},
+        separators=(",", ":"),
+    )
+
+
+class TestDecode(unittest.TestCase):
+    bars = [
+        [1625097600, 100.0, 101.0, 99.0, 100.5, 1000],
+        [1625184000, 100.5, 102.0, 100.0, 101.5, 1200],
+        [1625270400, 101.5, 103.0, 101.0, 102.5, 900],
+    ]
+
+    def test_matches_row_by_row_conversion(self):
+        """Output equals the per-row fromtimestamp construction it replaces."""
+        rows = []
+        for t, o, h, l, c, v in self.bars:
+            dt = datetime.datetime.fromtimestamp(t)
+            rows.append([pd.Timestamp(dt.date()), dt.time(), o, h, l, c, float(v)])
+        expected = pd.DataFrame(
+            rows, columns=["Date", "Time", "Open", "High", "Low", "Close", "Volume"]
+        ).set_index("Date")
+        expected.insert(0, "symbol", value="NASDAQ:AAPL")
+
+        result = create_df([series_frame(self.bars)], "NASDAQ:AAPL")
+        pd.testing.assert_frame_equal(result, expected, check_index_type=False)
+
+    def test_raw_websocket_text(self):
+        """Framed ~m~ text decodes the same as a list of frame payloads."""
+        frame = series_frame(self.bars)
+        raw = prepend_header(frame) + prepend_header("~h~1")
+        pd.testing.assert_frame_equal(create_df(raw, "X"), create_df([frame], "X"))
+
+    def test_missing_volume_is_zero(self):
+        values = decode_bars([series_frame([b[:5] for b in self.bars])])
+        self.assertEqual(values.shape, (3, 6))
+        self.assertTrue((values[:, 5] == 0).all())
+
+    def test_du_updates_replace_bars(self):
+        """A later du for an existing bar replaces it instead of duplicating it."""
+        update = [1625270400, 101.5, 104.0, 101.0, 103.5, 1500]
+        values = decode_bars([series_frame(self.bars), series_frame([update], "du")])
+        self.assertEqual(len(values), 3)
+        np.testing.assert_array_equal(values[-1], update)
+
+    def test_no_bars(self):
+        self.assertIsNone(decode_bars(['{"m":"series_completed","p":["cs","s1"]}']))
+        self.assertIsNone(create_df("", "X"))
+
+    def test_tz_index_across_dst(self):
+        # 2021-11-06 and 2021-11-08 09:30 in New York, either side of the DST change
+        values = np.array([[1636205400, 1, 2, 0, 1, 10], [1636381800, 1, 2, 0, 1, 10]], dtype=np.float64)
+        df = bars_to_tz_df(values, "NASDAQ:AAPL", "America/New_York")
+        self.assertEqual([t.strftime("%H:%M") for t in df.index], ["09:30", "09:30"])
+        self.assertEqual(df.index.asi8.tolist(), values[:, 0].astype(np.int64).tolist())
+        self.assertEqual(df["symbol"].iloc[0], "NASDAQ:AAPL")
+
+    def test_local_seconds(self):
+        ts = np.array([1625097600.0, 1636264800.0])
+        expected = [
+            datetime.datetime.fromtimestamp(t).replace(tzinfo=datetime.timezone.utc).timestamp()
+            for t in ts
+        ]
+        np.testing.assert_array_equal(local_seconds(ts), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
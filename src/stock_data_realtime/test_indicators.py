@@ -0,0 +1,103 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from src.stock_data_realtime.bars import Bars
+from src.stock_data_realtime.indicators import ATR, EMA, SMA, VWAP, IndicatorEngine
+from src.stock_data_realtime.streaming import StreamEvent
+
+
+def random_bars(n, start=1625146200, step=60, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 1, n))
+    open_ = close + rng.normal(0, 0.5, n)
+    high = np.maximum(open_, close) + rng.random(n)
+    low = np.minimum(open_, close) - rng.random(n)
+    volume = rng.integers(0, 1000, n).astype(np.float64)
+    time = start + step * np.arange(n, dtype=np.float64)
+    return np.column_stack([time, open_, high, low, close, volume])
+
+
+class TestIndicators(unittest.TestCase):
+    def indicators(self):
+        return [SMA(5), SMA(3, field="volume"), EMA(4), ATR(3), VWAP("America/New_York", "09:30")]
+
+    def test_updates_match_warm_up(self):
+        values = random_bars(50, step=3600)
+        for indicator in self.indicators():
+            expected = indicator.warm_up(values)
+            for split in (0, 1, 2, 7, 30):
+                indicator.warm_up(values[:split])
+                streamed = [indicator.update(bar) for bar in values[split:]]
+                np.testing.assert_allclose(streamed, expected[split:], err_msg=type(indicator).__name__)
+
+    def test_amended_bars_replace_the_last_one(self):
+        values = random_bars(20)
+        for indicator in self.indicators():
+            expected = indicator.warm_up(values)
+            indicator.warm_up(values[:10])
+            for bar in values[10:]:
+                draft = bar.copy()
+                draft[2:6] = [draft[1] + 5, draft[1] - 5, draft[1], 1]
+                indicator.update(draft)
+                indicator.update(bar)
+            indicator.update(values[5])  # older bars are ignored
+            self.assertAlmostEqual(indicator.value, expected[-1])
+
+    def test_against_pandas(self):
+        values = random_bars(100)
+        df = pd.DataFrame(values[:, 1:], columns=["open", "high", "low", "close", "volume"])
+        np.testing.assert_allclose(SMA(10).warm_up(values), df.close.rolling(10).mean())
+
+        previous = df.close.shift()
+        tr = pd.concat([df.high - df.low, (df.high - previous).abs(), (df.low - previous).abs()], axis=1).max(axis=1)
+        atr = ATR(14).warm_up(values)
+        self.assertTrue(np.isnan(atr[:13]).all())
+        self.assertAlmostEqual(atr[13], tr[:14].mean())
+        self.assertAlmostEqual(atr[14], (atr[13] * 13 + tr[14]) / 14)
+
+        ema = EMA(10).warm_up(values)
+        self.assertAlmostEqual(ema[9], df.close[:10].mean())
+        self.assertAlmostEqual(ema[10], ema[9] + 2 / 11 * (df.close[10] - ema[9]))
+
+    def test_vwap_restarts_every_session(self):
+        # 2021-11-05 to 2021-11-09 hourly, across the end of US daylight saving time
+        values = random_bars(24 * 5, start=1636118400, step=3600)
+        indicator = VWAP("America/New_York", "09:30")
+        vwap = indicator.warm_up(values)
+        indicator.warm_up(values[:3])
+        np.testing.assert_allclose([indicator.update(bar) for bar in values[3:]], vwap[3:])
+
+        local = pd.to_datetime(values[:, 0], unit="s", utc=True).tz_convert("America/New_York").tz_localize(None)
+        session = (local - pd.Timedelta(hours=9, minutes=30)).date
+        df = pd.DataFrame({"pv": values[:, 2:5].mean(axis=1) * values[:, 5], "v": values[:, 5], "s": session})
+        grouped = df.groupby("s")
+        np.testing.assert_allclose(vwap, grouped.pv.cumsum() / grouped.v.cumsum())
+
+
+class TestIndicatorEngine(unittest.TestCase):
+    def test_series_warm_up_then_stream(self):
+        values = random_bars(30)
+        engine = IndicatorEngine({"sma": SMA(5), "atr": ATR(3)})
+        bars = Bars.from_values(values[:20], "NASDAQ:AAPL", "1")
+        out = engine.warm_up(bars)
+        self.assertEqual(len(out["sma"]), 20)
+        engine.warm_up(values[:5], "NASDAQ:MSFT", "1")
+        self.assertEqual(engine.keys, [("NASDAQ:AAPL", "1"), ("NASDAQ:MSFT", "1")])
+
+        for bar in values[20:]:
+            engine.on_event(StreamEvent("bar", "NASDAQ:AAPL", "1", bar.tolist()))
+        engine.on_event(StreamEvent("quote", "NASDAQ:AAPL", None, {"lp": 1.0}))
+        latest = engine.values("NASDAQ:AAPL", "1")
+        self.assertAlmostEqual(latest["sma"], values[-5:, 4].mean())
+        self.assertAlmostEqual(latest["atr"], ATR(3).warm_up(values)[-1])
+        self.assertFalse(np.isnan(engine.values("NASDAQ:MSFT", "1")["sma"]))
+        self.assertIsNone(engine.values("NASDAQ:TSLA", "1"))
+
+        latest = engine.update("NASDAQ:TSLA", "1", values[:5])
+        self.assertAlmostEqual(latest["sma"], values[:5, 4].mean())
+
+
+if __name__ == "__main__":
+    unittest.main()
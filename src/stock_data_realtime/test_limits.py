@@ -0,0 +1,92 @@
+import time
+import unittest
+from unittest.mock import patch
+
+from src.stock_data_realtime.connection import TvConnection
+from src.stock_data_realtime.limits import (
+    Backoff,
+    CircuitBreaker,
+    ConnectionLimits,
+    TokenBucket,
+)
+from src.stock_data_realtime.pool import ConnectionPool
+from src.stock_data_realtime.test_connection import FakeWebSocket
+
+
+class TestLimits(unittest.TestCase):
+    def test_token_bucket_paces_after_burst(self):
+        bucket = TokenBucket(rate=10, burst=2)
+        delays = [bucket.reserve() for _ in range(4)]
+        self.assertEqual(delays[:2], [0.0, 0.0])
+        self.assertAlmostEqual(delays[2], 0.1, delta=0.01)
+        self.assertAlmostEqual(delays[3], 0.2, delta=0.01)
+
+    def test_backoff_grows_with_jitter_and_cap(self):
+        backoff = Backoff(base=1, factor=2, max_delay=5, jitter=0.5)
+        for attempt, ceiling in [(0, 1), (1, 2), (2, 4), (5, 5)]:
+            delay = backoff.delay(attempt)
+            self.assertTrue(ceiling / 2 <= delay <= ceiling, (attempt, delay))
+
+    def test_circuit_breaker(self):
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.05)
+        breaker.record_failure()
+        self.assertTrue(breaker.allow())
+        breaker.record_failure()
+        self.assertEqual(breaker.state, "open")
+        self.assertFalse(breaker.allow())
+        time.sleep(0.06)
+        self.assertTrue(breaker.allow())  # one trial
+        self.assertFalse(breaker.allow())
+        breaker.record_success()
+        self.assertEqual(breaker.state, "closed")
+
+    @patch("src.stock_data_realtime.connection.create_connection")
+    def test_open_circuit_skips_connection_attempts(self, mock_create_conn):
+        mock_create_conn.side_effect = OSError("throttled")
+        limits = ConnectionLimits(
+            connect_attempts=3,
+            backoff=Backoff(base=0.001),
+            breaker=CircuitBreaker(failure_threshold=2, reset_timeout=60),
+        )
+        connection = TvConnection("token", "qs_test", "cs_test", limits=limits)
+        with self.assertRaises(ConnectionError):
+            connection.connect()
+        self.assertEqual(mock_create_conn.call_count, 2)
+        with self.assertRaisesRegex(ConnectionError, "retry in"):
+            connection.connect()
+        self.assertEqual(mock_create_conn.call_count, 2)
+
+
+class TestConnectionPool(unittest.TestCase):
+    def setUp(self):
+        patcher = patch(
+            "src.stock_data_realtime.connection.create_connection",
+            side_effect=lambda *args, **kwargs: FakeWebSocket(),
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        limits = ConnectionLimits(max_connections=2, max_series_per_connection=2)
+        self.pool = ConnectionPool("token", limits)
+        self.addCleanup(self.pool.close)
+
+    def test_spreads_then_caps(self):
+        """Idle connections first, then new ones, then the least loaded, then wait."""
+        first, second = self.pool.acquire(), self.pool.acquire()
+        self.assertIs(first, self.pool.primary)
+        self.assertIsNot(second, first)
+        self.assertIn(self.pool.acquire(), (first, second))
+        self.pool.acquire()
+        self.assertIsNone(self.pool.acquire(block=False))
+        self.assertIsNone(self.pool.acquire(timeout=0.01))
+        self.pool.release(second)
+        self.assertIs(self.pool.acquire(timeout=1), second)
+        self.assertEqual(len(self.pool.connections), 2)
+
+    def test_caller_caps(self):
+        self.pool.acquire(max_connections=1, max_series=1)
+        self.assertIsNone(self.pool.acquire(block=False, max_connections=1, max_series=1))
+        self.assertIsNotNone(self.pool.acquire(block=False, max_connections=5))
+
+
+if __name__ == "__main__":
+    unittest.main()
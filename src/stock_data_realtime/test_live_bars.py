@@ -0,0 +1,60 @@
+import unittest
+from unittest.mock import Mock
+
+import numpy as np
+
+from src.stock_data_realtime.live_bars import BarBuilder, RingBuffer
+from src.stock_data_realtime.stock_data import Interval
+from src.stock_data_realtime.streaming import StreamEvent
+
+
+class TestRingBuffer(unittest.TestCase):
+    def test_wraps_at_capacity(self):
+        ring = RingBuffer(3, width=1)
+        for i in range(5):
+            ring.append([i])
+        self.assertEqual(len(ring), 3)
+        self.assertEqual(ring.last().ravel().tolist(), [2, 3, 4])
+        self.assertEqual(ring.last(2).ravel().tolist(), [3, 4])
+        self.assertEqual(ring.latest[0], 4)
+
+
+class TestBarBuilder(unittest.TestCase):
+    def quote(self, symbol, lp, lp_time, volume):
+        return StreamEvent("quote", symbol, None, {"lp": lp, "lp_time": lp_time, "volume": volume})
+
+    def test_ticks_fold_into_bars(self):
+        closed = Mock()
+        builder = BarBuilder(Interval.in_1_minute, callback=closed)
+        t = 1625097600
+        for lp, offset, volume in [(10, 0, 100), (12, 10, 150), (9, 30, 160), (11, 59, 200), (11.5, 61, 230)]:
+            builder.update(self.quote("NASDAQ:AAPL", lp, t + offset, volume))
+        builder.update(StreamEvent("bar", "NASDAQ:AAPL", "1", [t, 0, 0, 0, 0, 0]))
+
+        bars = builder.last("NASDAQ:AAPL")
+        np.testing.assert_array_equal(bars[0], [t, 10, 12, 9, 11, 100])
+        np.testing.assert_array_equal(bars[1], [t + 60, 11.5, 11.5, 11.5, 11.5, 30])
+        symbol, bar = closed.call_args.args
+        self.assertEqual(symbol, "NASDAQ:AAPL")
+        np.testing.assert_array_equal(bar, bars[0])
+
+    def test_volume_reset_and_late_ticks(self):
+        builder = BarBuilder(5, capacity=2)
+        builder.add_tick("X", 1.0, 100, volume=1000)
+        builder.add_tick("X", 2.0, 106, volume=10)  # new session, cumulative volume restarted
+        builder.add_tick("X", 3.0, 99, volume=20)  # older than the current bar
+        self.assertEqual(builder.current("X").tolist(), [105, 2.0, 2.0, 2.0, 2.0, 10])
+        builder.add_tick("X", 4.0, 111)
+        self.assertEqual(builder.last("X")[:, 0].tolist(), [105, 110])
+        self.assertEqual(len(builder.last("Y")), 0)
+
+    def test_daily_bars_in_exchange_timezone(self):
+        builder = BarBuilder(Interval.in_daily, timezone="America/New_York", session_start="09:30")
+        builder.add_tick("X", 1.0, 1625146200)  # 2021-07-01 09:30 EDT
+        builder.add_tick("X", 2.0, 1625146200 + 23 * 3600 + 1800)  # 08:30 next day
+        builder.add_tick("X", 3.0, 1625146200 + 24 * 3600)
+        self.assertEqual(builder.last("X")[:, 4].tolist(), [2.0, 3.0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,90 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from src.stock_data_realtime.cache import SymbolCache
+from src.stock_data_realtime.metrics import (
+    MetricsCollector,
+    NullMetrics,
+    get_metrics,
+    set_metrics,
+)
+from src.stock_data_realtime.stock_data import TvDatafeed
+from src.stock_data_realtime.test_connection import FakeWebSocket
+
+
+class TestMetricsCollector(unittest.TestCase):
+    def test_counters_and_histograms(self):
+        metrics = MetricsCollector(buckets=(0.1, 1))
+        metrics.increment("requests_total", symbol="AAPL")
+        metrics.increment("requests_total", 2, symbol="AAPL")
+        for value in (0.05, 0.5, 5):
+            metrics.observe("latency_seconds", value)
+        with metrics.timer("latency_seconds"):
+            pass
+
+        self.assertEqual(metrics.counter("requests_total", symbol="AAPL"), 3)
+        count, total = metrics.histogram("latency_seconds")
+        self.assertEqual(count, 4)
+        self.assertGreaterEqual(total, 5.55)
+
+    def test_prometheus_text(self):
+        metrics = MetricsCollector(buckets=(0.1, 1))
+        metrics.increment("tv_frames_total", 3)
+        metrics.observe("tv_auth_seconds", 0.5, method='se"ssion')
+        text = metrics.to_prometheus()
+        self.assertIn("# TYPE tv_frames_total counter\ntv_frames_total 3\n", text)
+        self.assertIn('tv_auth_seconds_bucket{method="se\\"ssion",le="0.1"} 0', text)
+        self.assertIn('tv_auth_seconds_bucket{method="se\\"ssion",le="1"} 1', text)
+        self.assertIn('tv_auth_seconds_bucket{method="se\\"ssion",le="+Inf"} 1', text)
+        self.assertIn('tv_auth_seconds_count{method="se\\"ssion"} 1', text)
+
+    def test_json(self):
+        metrics = MetricsCollector()
+        metrics.increment("tv_reconnects_total")
+        data = json.loads(metrics.to_json())
+        self.assertEqual(data["counters"], [{"name": "tv_reconnects_total", "labels": {}, "value": 1}])
+
+    def test_default_is_noop(self):
+        self.assertIsInstance(get_metrics(), NullMetrics)
+        with get_metrics().timer("anything"):
+            get_metrics().increment("anything")
+
+
+class TestInstrumentation(unittest.TestCase):
+    def setUp(self):
+        self.metrics = set_metrics(MetricsCollector())
+        self.addCleanup(set_metrics, None)
+        patcher = patch(
+            "src.stock_data_realtime.connection.create_connection", return_value=FakeWebSocket()
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.symbol_cache = SymbolCache(os.path.join(tmp.name, "symbols.json"))
+
+    def test_get_hist_records_each_phase(self):
+        tv = TvDatafeed(symbol_cache=self.symbol_cache)
+        self.addCleanup(tv.close)
+        tv.get_hist("AAPL", "NASDAQ", n_bars=1)
+
+        for name in (
+            "tv_auth_seconds",
+            "tv_connect_seconds",
+            "tv_session_setup_seconds",
+            "tv_series_first_update_seconds",
+            "tv_series_seconds",
+            "tv_decode_seconds",
+        ):
+            self.assertEqual(self.metrics.histogram(name)[0], 1, name)
+        self.assertEqual(self.metrics.histogram("tv_series_frames"), (1, 1))
+        self.assertEqual(self.metrics.histogram("tv_decoded_bars"), (1, 1))
+        self.assertGreaterEqual(self.metrics.counter("tv_frames_total"), 2)
+        self.assertGreater(self.metrics.counter("tv_received_bytes_total"), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,105 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+
+from src.stock_data_realtime.bars import Bars
+from src.stock_data_realtime.cache import SymbolCache
+from src.stock_data_realtime.panel import Panel
+from src.stock_data_realtime.stock_data import Interval, TvDatafeed
+from src.stock_data_realtime.streaming import StreamEvent
+from src.stock_data_realtime.test_connection import FakeWebSocket
+
+
+def bars(times, close):
+    times = np.asarray(times, dtype=np.float64)
+    close = np.broadcast_to(np.asarray(close, dtype=np.float64), times.shape)
+    return np.column_stack([times, close - 1, close + 1, close - 2, close, np.full(len(times), 10.0)])
+
+
+class TestPanel(unittest.TestCase):
+    def setUp(self):
+        self.series = {
+            "A": bars([60, 120, 180, 240], [1, 2, 3, 4]),
+            "B": bars([120, 240], [20, 40]),
+            "C": None,
+        }
+
+    def test_alignment_and_fill(self):
+        panel = Panel.from_bars(self.series, "1")
+        self.assertEqual(panel.time.tolist(), [60, 120, 180, 240])
+        self.assertEqual(panel.to_numpy().shape, (5, 4, 3))
+        np.testing.assert_array_equal(panel.close[:, 1], [np.nan, 20, 20, 40])
+        np.testing.assert_array_equal(panel.high[:, 1], [np.nan, 21, 20, 41])
+        np.testing.assert_array_equal(panel.volume[:, 1], [np.nan, 10, 0, 10])
+        self.assertTrue(np.isnan(panel.close[:, 2]).all())
+        self.assertEqual(panel.observed[:, 1].tolist(), [False, True, False, True])
+
+        panel = Panel.from_bars(self.series, fill="nan")
+        np.testing.assert_array_equal(panel["Close"][:, 1], [np.nan, 20, np.nan, 40])
+
+        panel = Panel.from_bars({"A": bars([60, 120, 180, 240], 1), "B": bars([60], 5)}, limit=2)
+        np.testing.assert_array_equal(panel.close[:, 1], [5, 5, 5, np.nan])
+
+    def test_from_bars_containers(self):
+        panel = Panel.from_bars([Bars.from_values(v, s, "1D") for s, v in self.series.items() if v is not None])
+        self.assertEqual((panel.symbols, panel.interval), (["A", "B"], "1D"))
+        df = panel.to_pandas("close", timezone="America/New_York")
+        self.assertEqual(list(df.columns), ["A", "B"])
+        self.assertEqual(str(df.index.tz), "America/New_York")
+        self.assertEqual(df.index.asi8.tolist(), panel.time.tolist())
+
+    def test_updates_match_a_rebuild(self):
+        panel = Panel.from_bars({s: None if v is None else v[:2] for s, v in self.series.items()}, limit=1)
+        updates = [
+            ("A", self.series["A"][2]),
+            ("A", bars([240], 9)),  # re-sent with new values below
+            ("B", self.series["B"][1]),
+            ("A", self.series["A"][3]),
+            ("C", bars([90, 300], 7)),  # 90 goes between existing rows
+        ]
+        for symbol, bar in updates:
+            panel.update(symbol, bar)
+        expected = Panel.from_bars(dict(self.series, C=bars([90, 300], 7)), limit=1)
+        np.testing.assert_array_equal(panel.time, expected.time)
+        np.testing.assert_array_equal(panel.to_numpy(), expected.to_numpy())
+        np.testing.assert_array_equal(panel.observed, expected.observed)
+        with self.assertRaises(ValueError):
+            panel.update("D", bars([60], 1))
+
+    def test_streamed_bars(self):
+        panel = Panel.from_bars(self.series, "1")
+        for t in range(300, 300 + 60 * 100, 60):
+            panel.on_event(StreamEvent("bar", "A", "1", bars([t], t)[0].tolist()))
+        panel.on_event(StreamEvent("bar", "B", "5", bars([300], 1)[0].tolist()))
+        panel.on_event(StreamEvent("quote", "B", None, {"lp": 1.0}))
+        self.assertEqual(len(panel), 104)
+        self.assertEqual(panel.close[-1].tolist()[:2], [6240.0, 40.0])
+        self.assertEqual(int(panel.observed[:, 1].sum()), 2)
+
+
+class TestGetPanel(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tv = TvDatafeed(symbol_cache=SymbolCache(os.path.join(tmp.name, "symbols.json")))
+        self.addCleanup(self.tv.close)
+
+    @patch('src.stock_data_realtime.connection.create_connection')
+    def test_get_panel(self, mock_create_conn):
+        mock_create_conn.side_effect = lambda *args, **kwargs: FakeWebSocket(errors={"NASDAQ:BAD"})
+        panel = self.tv.get_panel(["AAPL", "BAD", "NASDAQ:MSFT"], "NASDAQ", Interval.in_daily, n_bars=5)
+        self.assertEqual(panel.symbols, ["NASDAQ:AAPL", "NASDAQ:BAD", "NASDAQ:MSFT"])
+        self.assertEqual(panel.interval, "1D")
+        self.assertTrue(panel.observed[:, [0, 2]].all())
+        self.assertTrue(np.isnan(panel.close[:, 1]).all())
+        self.assertIsInstance(panel.to_pandas(), pd.DataFrame)
+        with self.assertRaises(ValueError):
+            self.tv.get_panel(["AAPL"], "NASDAQ", fill="bfill")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+
+from src.stock_data_realtime.bars import Bars
+from src.stock_data_realtime.cache import SymbolCache
+from src.stock_data_realtime.decode import bars_to_df, create_df
+from src.stock_data_realtime.parse_pool import ParsePool, decode_columns
+from src.stock_data_realtime.protocol import create_message
+from src.stock_data_realtime.stock_data import TvDatafeed, Interval
+from src.stock_data_realtime.test_connection import FakeWebSocket
+
+
+def series_frames(n_bars):
+    rows = [{"i": i, "v": [1600000000 + 86400 * i, 1, 2, 0, 1, i]} for i in range(n_bars)]
+    frame = create_message("timescale_update", ["cs_x", {"s1": {"node": "n", "s": rows}}])
+    return [frame.split("~m~", 2)[2]]
+
+
+class TestParsePool(unittest.TestCase):
+    def test_decode_columns(self):
+        """Workers return the columnar container, None without bars."""
+        bars = decode_columns(series_frames(3), "NASDAQ:AAPL", "1D")
+        self.assertIsInstance(bars, Bars)
+        self.assertEqual(bars.time.dtype, np.int64)
+        np.testing.assert_array_equal(bars.volume, [0, 1, 2])
+        self.assertIsNone(decode_columns([], "NASDAQ:AAPL"))
+
+    def test_thread_and_process_pools_match_inline_decode(self):
+        frames = series_frames(500)
+        expected = create_df(frames, "NASDAQ:AAPL")
+        for processes in (False, True):
+            with self.subTest(processes=processes), ParsePool(2, processes=processes) as pool:
+                bars = pool.submit(frames, "NASDAQ:AAPL").result(timeout=30)
+                pd.testing.assert_frame_equal(bars_to_df(bars.to_numpy(), bars.symbol), expected)
+
+    def test_workers_start_on_first_use(self):
+        pool = ParsePool(3, processes=False)
+        self.assertEqual(pool.max_workers, 3)
+        pool.close()  # closing an unused pool is a no-op
+        self.assertIsNone(pool.submit(series_frames(0), "X").result())
+        pool.close()
+
+    @patch('src.stock_data_realtime.connection.create_connection')
+    def test_get_hist_many_with_parse_pool(self, mock_create_conn):
+        """Offloaded decoding returns the same frames and stats as inline decoding."""
+        mock_create_conn.side_effect = lambda *a, **k: FakeWebSocket(errors={"NASDAQ:BAD"})
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        tv = TvDatafeed(symbol_cache=SymbolCache(os.path.join(tmp.name, "symbols.json")))
+        self.addCleanup(tv.close)
+        specs = [(s, "NASDAQ", Interval.in_daily, 5) for s in ["AAPL", "BAD", "MSFT"]]
+        inline = tv.get_hist_many(specs, n_connections=2)
+
+        with ParsePool(2, processes=False) as pool:
+            tv.parse_pool = pool
+            pooled = tv.get_hist_many(specs, n_connections=2)
+
+        self.assertEqual(set(pooled), {specs[0], specs[2]})
+        for spec in pooled:
+            pd.testing.assert_frame_equal(pooled[spec], inline[spec])
+        self.assertEqual(len(tv.batch_stats), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,51 @@
+import unittest
+
+from src.stock_data_realtime.protocol import (
+    FrameDecoder,
+    create_message,
+    is_heartbeat,
+    prepend_header,
+    split_frames,
+)
+
+
+class TestFrameDecoder(unittest.TestCase):
+    def setUp(self):
+        self.decoder = FrameDecoder()
+
+    def test_multiple_frames_per_message(self):
+        message = create_message("a", [1]) + prepend_header("~h~7") + create_message("b", [])
+        frames = self.decoder.feed(message)
+        self.assertEqual(frames, ['{"m":"a","p":[1]}', "~h~7", '{"m":"b","p":[]}'])
+        self.assertTrue(is_heartbeat(frames[1]))
+        self.assertEqual(self.decoder.pending, 0)
+
+    def test_frame_split_across_messages(self):
+        """Partial frames and partial headers wait for the rest of the data."""
+        message = create_message("timescale_update", ["cs", {"s1": {"s": []}}])
+        for cut in (2, 5, 9, len(message) - 1):
+            self.assertEqual(self.decoder.feed(message[:cut]), [])
+            self.assertEqual(self.decoder.feed(message[cut:]), split_frames(message))
+
+    def test_non_ascii_payload(self):
+        """Lengths count characters, so non-ASCII descriptions decode intact."""
+        payload = '{"m":"qsd","p":["qs",{"v":{"description":"Société Générale"}}]}'
+        message = prepend_header(payload) + prepend_header("~h~1")
+        self.assertEqual(self.decoder.feed(message), [payload, "~h~1"])
+
+    def test_buffer_is_bounded(self):
+        """A bogus length prefix cannot make the buffer grow without bound."""
+        decoder = FrameDecoder(max_buffer=100)
+        decoder.feed("~m~999999~m~" + "x" * 50)
+        self.assertEqual(decoder.pending, 62)
+        decoder.feed("x" * 60)
+        self.assertEqual(decoder.pending, 0)
+        self.assertEqual(decoder.feed(create_message("a", [])), ['{"m":"a","p":[]}'])
+
+    def test_garbage_is_dropped(self):
+        self.assertEqual(self.decoder.feed("not a frame"), [])
+        self.assertEqual(self.decoder.pending, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
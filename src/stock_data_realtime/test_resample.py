@@ -0,0 +1,92 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from src.stock_data_realtime.bars import Bars
+from src.stock_data_realtime.resample import Resampler, bucket_starts, resample
+from src.stock_data_realtime.stock_data import Interval
+
+
+def minute_bars(n, start=1625146200):
+    rng = np.random.default_rng(0)
+    close = 100 + rng.standard_normal(n).cumsum()
+    values = np.empty((n, 6))
+    values[:, 0] = start + 60 * np.arange(n)
+    values[:, 1] = close + rng.standard_normal(n)
+    values[:, 2] = np.maximum(values[:, 1], close) + 1
+    values[:, 3] = np.minimum(values[:, 1], close) - 1
+    values[:, 4] = close
+    values[:, 5] = rng.integers(1, 1000, n)
+    return values
+
+
+class TestResample(unittest.TestCase):
+    def test_matches_pandas_resample(self):
+        values = minute_bars(1000)
+        frame = pd.DataFrame(
+            values[:, 1:], columns=["open", "high", "low", "close", "volume"],
+            index=pd.to_datetime(values[:, 0], unit="s"),
+        )
+        expected = frame.resample("15min").agg(
+            {"open": "first", "high": "max", "low": "min", "close": "last", "volume": "sum"}
+        ).dropna()
+
+        result = resample(values, Interval.in_15_minute, base_interval=Interval.in_1_minute)
+        np.testing.assert_array_equal(result[:, 1:], expected.to_numpy())
+        np.testing.assert_array_equal(
+            result[:, 0], expected.index.to_numpy().astype("datetime64[s]").astype(np.int64)
+        )
+
+    def test_session_alignment(self):
+        """1H and daily buckets start at the exchange session open, across DST."""
+        # 2021-03-12 and 2021-03-15, 09:30 New York, before and after the DST change
+        times = [1615559400, 1615559400 + 3599, 1615815000 + 1800]
+        starts = bucket_starts(times, Interval.in_1_hour, "America/New_York", "09:30")
+        self.assertEqual(list(starts), [1615559400, 1615559400, 1615815000])
+        days = bucket_starts(times, Interval.in_daily, "America/New_York", "09:30")
+        self.assertEqual(list(days), [1615559400, 1615559400, 1615815000])
+        weeks = bucket_starts(times, Interval.in_weekly, "America/New_York", "09:30")
+        self.assertEqual(weeks[0], 1615213800)  # Monday 2021-03-08 09:30 EST
+
+    def test_monthly(self):
+        times = [1625097600, 1627689600, 1627776000]  # Jul 1, Jul 31, Aug 1 UTC
+        self.assertEqual(
+            list(bucket_starts(times, Interval.in_monthly)), [1625097600, 1625097600, 1627776000]
+        )
+
+    def test_bars_round_trip(self):
+        bars = Bars.from_values(minute_bars(120), "NASDAQ:AAPL", "1")
+        hourly = resample(bars, Interval.in_1_hour)
+        self.assertEqual((hourly.interval, hourly.symbol), ("1H", "NASDAQ:AAPL"))
+        self.assertEqual(hourly.volume.sum(), bars.volume.sum())
+        with self.assertRaises(ValueError):
+            resample(bars, Interval.in_1_minute)
+        with self.assertRaises(ValueError):
+            resample(hourly, Interval.in_45_minute)
+
+    def test_incremental_matches_batch(self):
+        """Chunked updates, including revised bars, equal one batch resample."""
+        values = minute_bars(500)
+        resampler = Resampler(Interval.in_5_minute, base_interval=Interval.in_1_minute)
+        resampler.update(values[:7])
+        for start in range(7, 500, 13):
+            revised = values[start - 1].copy()
+            revised[4] += 50
+            resampler.update(revised)  # a live update of the last bar ...
+            resampler.update(values[start - 1:start + 13])  # ... then its final value
+        np.testing.assert_array_equal(
+            resampler.values, resample(values, Interval.in_5_minute)
+        )
+
+    def test_update_returns_changed_buckets(self):
+        values = minute_bars(12)
+        resampler = Resampler(Interval.in_5_minute)
+        self.assertEqual(len(resampler.update(values[:3])), 1)
+        changed = resampler.update(values[3:6])
+        self.assertEqual(len(changed), 2)
+        self.assertEqual(changed[1, 0], values[5, 0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,264 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import tracemalloc
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+
+from src.stock_data_realtime.bars import Bars
+from src.stock_data_realtime.cache import SymbolCache
+from src.stock_data_realtime.sinks import (
+    CSVSink, DuckDBSink, ParquetSink, Sink, SQLiteSink, _read_values,
+)
+from src.stock_data_realtime.stock_data import Interval, TvDatafeed
+from src.stock_data_realtime.test_stock_data import PagingWebSocket
+from src.stock_data_realtime.token_store import TokenStore
+
+
+def make_bars(start, n, close=1.0, symbol="NASDAQ:AAPL", interval="1D"):
+    time = 1600000000 + 86400 * np.arange(start, start + n, dtype=np.int64)
+    block = np.tile(np.array([[1.0], [2.0], [0.5], [close], [10.0]]), n)
+    return Bars(symbol, interval, time, block)
+
+
+class RecordingSink(Sink):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.batches = []
+        self.ended = []
+
+    def _write(self, bars):
+        self.batches.append(len(bars))
+
+    def _end(self, symbol, interval):
+        self.ended.append((symbol, interval))
+
+
+class TestSink(unittest.TestCase):
+    def test_rows_are_batched_per_series(self):
+        with RecordingSink(batch_size=4) as sink:
+            sink.write(make_bars(0, 3))
+            sink.write(make_bars(0, 3, symbol="NASDAQ:MSFT"))
+            sink.write(make_bars(3, 7))
+            sink.end("NASDAQ:AAPL", "1D")
+            sink.flush()
+            self.assertEqual(sink.batches, [4, 4, 2, 3])
+            self.assertEqual(sink.ended, [("NASDAQ:AAPL", "1D")])
+        self.assertEqual(sink.rows_written, 13)
+        with self.assertRaises(ValueError):
+            sink.write(make_bars(0, 1))
+
+    def test_write_blocks_while_writer_is_behind(self):
+        release = threading.Event()
+
+        class SlowSink(RecordingSink):
+            def _write(self, bars):
+                release.wait(5)
+                super()._write(bars)
+
+        sink = SlowSink(batch_size=1, max_pending=1)
+        sink.write(make_bars(0, 1))  # taken by the writer, which then stalls
+        sink.write(make_bars(1, 1))  # fills the queue
+        blocked = threading.Thread(target=sink.write, args=(make_bars(2, 1),))
+        blocked.start()
+        blocked.join(0.2)
+        self.assertTrue(blocked.is_alive())
+        release.set()
+        blocked.join(5)
+        sink.close()
+        self.assertEqual(sink.rows_written, 3)
+
+    def test_writer_errors_surface_on_the_producer(self):
+        class FailingSink(Sink):
+            released = False
+
+            def _write(self, bars):
+                raise OSError("disk full")
+
+            def _close(self):
+                self.released = True
+
+        sink = FailingSink(batch_size=1)
+        sink.write(make_bars(0, 1))
+        with self.assertRaises(OSError):
+            sink.flush()
+        sink.close()
+
+        sink = FailingSink(batch_size=1)
+        sink.write(make_bars(0, 1))
+        with self.assertRaises(OSError):
+            sink.close()
+        self.assertTrue(sink.released)
+
+
+class TestFileSinks(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = tmp.name
+
+    def test_csv_rerun_skips_existing_rows(self):
+        for _ in range(2):
+            with CSVSink(self.dir, batch_size=5) as sink:
+                sink.write(make_bars(5, 5))
+                sink.write(make_bars(0, 6))
+        path = CSVSink(self.dir).path("NASDAQ:AAPL", "1D")
+        self.assertTrue(path.endswith("NASDAQ_AAPL_1D.csv"))
+        rows = np.loadtxt(path, delimiter=",", skiprows=1)
+        self.assertEqual(len(rows), 10)
+        self.assertEqual(len(np.unique(rows[:, 0])), 10)
+        self.assertEqual(rows[0, 1:].tolist(), [1.0, 2.0, 0.5, 1.0, 10.0])
+
+    def test_parquet_rerun_upserts(self):
+        import pyarrow.parquet as pq
+
+        with ParquetSink(self.dir, batch_size=4) as sink:
+            sink.write(make_bars(0, 10))
+            sink.end("NASDAQ:AAPL", "1D")
+            sink.flush()
+            self.assertEqual(pq.ParquetFile(sink.path("NASDAQ:AAPL", "1D")).num_row_groups, 3)
+        with ParquetSink(self.dir) as sink:
+            sink.write(make_bars(8, 4, close=3.0))
+        values = _read_values(pq.read_table(sink.path("NASDAQ:AAPL", "1D")))
+        values = values[np.argsort(values[:, 0])]
+        self.assertEqual(values[:, 0].tolist(), make_bars(0, 12).time.tolist())
+        self.assertEqual(values[-5:, 4].tolist(), [1.0, 3.0, 3.0, 3.0, 3.0])
+        with ParquetSink(self.dir, sort=True) as sink:
+            sink.write(make_bars(0, 1, close=5.0))
+        values = _read_values(pq.read_table(sink.path("NASDAQ:AAPL", "1D")))
+        self.assertEqual(values[:, 0].tolist(), make_bars(0, 12).time.tolist())
+        self.assertEqual(values[[0, -1], 4].tolist(), [5.0, 3.0])
+        self.assertFalse(os.path.exists(sink.path("NASDAQ:AAPL", "1D") + ".tmp"))
+
+    def test_sqlite_rerun_upserts(self):
+        path = os.path.join(self.dir, "bars.db")
+        with SQLiteSink(path, batch_size=3) as sink:
+            sink.write(make_bars(0, 10))
+        with SQLiteSink(path) as sink:
+            sink.write(make_bars(8, 4, close=3.0))
+            sink.write(make_bars(0, 2, interval="1W"))
+        with sqlite3.connect(path) as db:
+            rows = db.execute(
+                "SELECT interval, COUNT(*), SUM(close) FROM bars GROUP BY interval ORDER BY interval"
+            ).fetchall()
+        self.assertEqual(rows, [("1D", 12, 8 * 1.0 + 4 * 3.0), ("1W", 2, 2.0)])
+        with self.assertRaises(ValueError):
+            SQLiteSink(path, table="bars; DROP TABLE bars")
+
+    def test_duckdb_rerun_upserts(self):
+        try:
+            import duckdb
+        except ImportError:
+            self.skipTest("duckdb is not installed")
+        path = os.path.join(self.dir, "bars.duckdb")
+        for close in (1.0, 3.0):
+            with DuckDBSink(path) as sink:
+                sink.write(make_bars(0, 5, close=close))
+        with duckdb.connect(path) as db:
+            self.assertEqual(db.execute("SELECT COUNT(*), SUM(close) FROM bars").fetchone(), (5, 15.0))
+
+
+class TestIngest(unittest.TestCase):
+    @patch('src.stock_data_realtime.connection.create_connection')
+    def test_ingest_pages_every_symbol_into_sink(self, mock_create_conn):
+        mock_create_conn.side_effect = lambda *args, **kwargs: PagingWebSocket(available=25)
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        tv = TvDatafeed(
+            token_store=TokenStore(os.path.join(tmp.name, "tv_token.json")),
+            symbol_cache=SymbolCache(os.path.join(tmp.name, "symbols.json")),
+        )
+        self.addCleanup(tv.close)
+        path = os.path.join(tmp.name, "bars.db")
+        specs = [
+            ("AAPL", "NASDAQ", Interval.in_daily, 100),
+            ("MSFT", "NASDAQ", Interval.in_daily, 15),
+        ]
+
+        with SQLiteSink(path) as sink:
+            stats = tv.ingest(specs, sink, n_workers=2, page_size=10)
+        self.assertEqual(stats["bars"].tolist(), [25, 15])
+        self.assertTrue(stats["error"].isna().all())
+        with SQLiteSink(path) as sink:
+            tv.ingest(specs, sink, page_size=10)
+        with sqlite3.connect(path) as db:
+            rows = db.execute(
+                "SELECT symbol, COUNT(*), MIN(time) FROM bars GROUP BY symbol ORDER BY symbol"
+            ).fetchall()
+        self.assertEqual(
+            rows, [("NASDAQ:AAPL", 25, 1600000000), ("NASDAQ:MSFT", 15, 1600000000 + 86400 * 10)]
+        )
+
+    def client(self, tmp):
+        tv = TvDatafeed(
+            token_store=TokenStore(os.path.join(tmp, "tv_token.json")),
+            symbol_cache=SymbolCache(os.path.join(tmp, "symbols.json")),
+        )
+        self.addCleanup(tv.close)
+        return tv
+
+    def read_times(self, sink):
+        import pyarrow.parquet as pq
+
+        path = sink.path("NASDAQ:AAPL", "1D")
+        if isinstance(sink, CSVSink):
+            return np.loadtxt(path, delimiter=",", skiprows=1)[:, 0].astype(np.int64).tolist()
+        return _read_values(pq.read_table(path))[:, 0].astype(np.int64).tolist()
+
+    @patch('src.stock_data_realtime.connection.create_connection')
+    def test_ingested_pages_are_sorted_on_request(self, mock_create_conn):
+        """Pages arrive newest first; batches are sorted, whole files only with sort=True."""
+        mock_create_conn.side_effect = lambda *args, **kwargs: PagingWebSocket(available=25)
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        tv = self.client(tmp.name)
+        specs = [("AAPL", "NASDAQ", Interval.in_daily, 100)]
+        expected = (1600000000 + 86400 * np.arange(25)).tolist()
+        for sink_class in (CSVSink, ParquetSink):
+            for batch_size, sort in ((4, False), (4, True), (10000, False)):
+                directory = os.path.join(tmp.name, f"{sink_class.__name__}{batch_size}{sort}")
+                with sink_class(directory, batch_size=batch_size, sort=sort) as sink:
+                    tv.ingest(specs, sink, page_size=10)
+                times = self.read_times(sink)
+                self.assertEqual(sorted(times), expected)
+                # one batch holds the whole series, so it is sorted either way
+                self.assertEqual(times == expected, sort or batch_size > 25)
+
+    @patch('src.stock_data_realtime.connection.create_connection')
+    def test_ingest_memory_stays_flat(self, mock_create_conn):
+        """Without sort, peak memory grows by the 8-byte time index per bar, not the full rows."""
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        tv = self.client(tmp.name)
+
+        def peak(sink_class, n, directory, runs=2):
+            ws = PagingWebSocket(available=n)
+            mock_create_conn.return_value = ws
+            tv.close()  # the next ingest connects to the new socket
+            peaks = []
+            for _ in range(runs):  # the second run upserts into the existing file
+                ws.served.clear()
+                sink = sink_class(os.path.join(tmp.name, directory), batch_size=1000)
+                tracemalloc.start()
+                try:
+                    with sink:
+                        tv.ingest([("AAPL", "NASDAQ", Interval.in_daily, n)], sink, page_size=1000)
+                    peaks.append(tracemalloc.get_traced_memory()[1])
+                finally:
+                    tracemalloc.stop()
+                self.assertEqual(len(set(self.read_times(sink))), n)
+            # pages queued by the reader thread add noise to a single run
+            return min(peaks)
+
+        for sink_class in (CSVSink, ParquetSink):
+            small = peak(sink_class, 2000, f"{sink_class.__name__}-small")
+            large = peak(sink_class, 16000, f"{sink_class.__name__}-large")
+            # the rows of a series alone are 48 bytes per bar as float64
+            self.assertLess((large - small) / 14000, 24, sink_class.__name__)
+
+
+if __name__ == "__main__":
+    unittest.main()
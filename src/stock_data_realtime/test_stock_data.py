@@ -1,17 +1,78 @@
 import unittest
-from unittest.mock import Mock, patch, mock_open
+from unittest.mock import patch
 import pandas as pd
 import json
 import datetime
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from src.stock_data_realtime.bars import Bars
+from src.stock_data_realtime.cache import SymbolCache
 from src.stock_data_realtime.stock_data import TvDatafeed, Interval
+from src.stock_data_realtime.test_connection import FakeWebSocket
+from src.stock_data_realtime.test_streaming import QuoteWebSocket
+from src.stock_data_realtime.token_store import TokenStore, token_key
+
+class PagingWebSocket(FakeWebSocket):
+    """Holds `available` daily bars and serves them newest first, one overlapping bar per page."""
+
+    def __init__(self, available):
+        super().__init__()
+        self.times = [1600000000 + 86400 * i for i in range(available)]
+        self.served = {}
+
+    def on_message(self, method, params):
+        if method == "create_series":
+            cs, series_id, n_bars = params[0], params[1], params[5]
+            self.served[series_id] = n_bars
+            self.page(cs, series_id, self.times[-n_bars:])
+        elif method == "request_more_data":
+            cs, series_id, n_bars = params
+            served = self.served[series_id]
+            self.served[series_id] += n_bars
+            end = len(self.times) - served + 1  # resend the oldest bar already served
+            self.page(cs, series_id, self.times[max(0, end - n_bars - 1):max(0, end)])
+        else:
+            super().on_message(method, params)
+
+    def page(self, cs, series_id, times):
+        rows = [{"i": i, "v": [t, 1, 2, 0, 1, 10]} for i, t in enumerate(times)]
+        self.push("timescale_update", [cs, {series_id: {"node": "n", "s": rows}}])
+        self.push("series_completed", [cs, series_id, "streaming"])
+
+
+class TokenWebSocket(FakeWebSocket):
+    """Rejects series requested while the socket is authenticated with `rejected`."""
+
+    def __init__(self, rejected):
+        super().__init__()
+        self.rejected = rejected
+        self.token = None
+
+    def on_message(self, method, params):
+        if method == "set_auth_token":
+            self.token = params[0]
+        elif method == "create_series" and self.token == self.rejected:
+            self.push("series_error", [params[0], params[1], "unauthorized_access"])
+        else:
+            super().on_message(method, params)
+
 
 class TestTvDatafeed(unittest.TestCase):
     def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.token_store = TokenStore(os.path.join(tmp.name, "tv_token.json"))
         self.tv_datafeed = TvDatafeed(
             username="test_user",
             password="test_pass",
             sessionid="test_session",
-            sessionid_sign="test_session_sign"
+            sessionid_sign="test_session_sign",
+            token_store=self.token_store,
+            symbol_cache=SymbolCache(os.path.join(tmp.name, "symbols.json")),
         )
         self.mock_config = {
             "username": "test_user",
@@ -29,23 +90,85 @@ class TestTvDatafeed(unittest.TestCase):
         self.assertEqual(self.tv_datafeed.sessionid_sign, "test_session_sign")
 
     # Test token management
-    @patch('os.path.exists', return_value=True)
-    @patch('builtins.open', new_callable=mock_open, 
-           read_data='{"token": "test_token", "expiry": "2025-12-31T00:00:00"}')
-    def test_load_token_valid(self, mock_file, mock_exists):
-        """Mocks a file with working token and verifies load token works."""
-        token = self.tv_datafeed._TvDatafeed__load_token()
-        self.assertEqual(token, "test_token")
-
-    @patch('os.path.exists', return_value=True)
-    @patch('builtins.open', new_callable=mock_open, 
-           read_data='{"token": "test_token", "expiry": "2020-01-01T00:00:00"}')
-    @patch('os.remove')
-    def test_load_token_expired(self, mock_remove, mock_file, mock_exists):
-        """Mocks a file with expired token and tests if token is removed."""
-        token = self.tv_datafeed._TvDatafeed__load_token()
-        self.assertIsNone(token)
-        mock_remove.assert_called_once_with("tv_token.json")
+    def test_load_token_valid(self):
+        """A stored token that has not expired is used without signing in."""
+        key = token_key("test_user", "test_session")
+        self.token_store.put(key, "test_token")
+        with patch.object(TvDatafeed, '_TvDatafeed__auth') as mock_auth:
+            self.assertEqual(self.tv_datafeed.token, "test_token")
+        mock_auth.assert_not_called()
+
+    def test_load_token_expired(self):
+        """An expired stored token is replaced by signing in again."""
+        key = token_key("test_user", "test_session")
+        with patch('time.time', return_value=time.time() - 7200):
+            self.token_store.put(key, "test_token")
+        with patch.object(TvDatafeed, '_TvDatafeed__auth', return_value="new_token") as mock_auth:
+            self.assertEqual(self.tv_datafeed.token, "new_token")
+        mock_auth.assert_called_once()
+        self.assertEqual(TokenStore(self.token_store.path).get(key), "new_token")
+
+    def test_refresh_token_replaces_rejected_token(self):
+        key = token_key("test_user", "test_session")
+        self.token_store.put(key, "rejected_token")
+        self.assertEqual(self.tv_datafeed.token, "rejected_token")
+        with patch.object(TvDatafeed, '_TvDatafeed__auth', return_value="new_token") as mock_auth:
+            self.assertEqual(self.tv_datafeed.refresh_token(), "new_token")
+        mock_auth.assert_called_once()
+        self.assertEqual(self.tv_datafeed.token, "new_token")
+
+    @patch('src.stock_data_realtime.connection.create_connection')
+    def test_rejected_token_is_refreshed_once(self, mock_create_conn):
+        """Concurrent requests rejected for auth sign in once and retry with the new token."""
+        key = token_key("test_user", "test_session")
+        self.token_store.put(key, "rejected_token")
+        sockets = []
+
+        def connect(*args, **kwargs):
+            sockets.append(TokenWebSocket("rejected_token"))
+            return sockets[-1]
+
+        mock_create_conn.side_effect = connect
+        symbols = [f"SYM{i}" for i in range(8)]
+        with patch.object(TvDatafeed, '_TvDatafeed__auth', return_value="new_token") as mock_auth, \
+             ThreadPoolExecutor(max_workers=4) as executor:
+            results = list(executor.map(
+                lambda s: self.tv_datafeed.get_hist(s, "NASDAQ", n_bars=1), symbols
+            ))
+        mock_auth.assert_called_once()
+        self.assertTrue(all(df is not None and len(df) == 1 for df in results))
+        self.assertEqual(self.token_store.get(key), "new_token")
+        self.assertTrue(all(ws.token == "new_token" for ws in sockets))
+        self.tv_datafeed.close()
+
+    # Test lazy authentication
+    def test_auth_deferred_until_token_needed(self):
+        """Construction does no token I/O; the first token access loads or authenticates once."""
+        with patch.object(TokenStore, 'get', return_value=None) as mock_get, \
+             patch.object(TvDatafeed, '_TvDatafeed__auth', return_value="fresh_token") as mock_auth:
+            tv = TvDatafeed(username="lazy_user", password="pw", token_store=self.token_store)
+            mock_get.assert_not_called()
+            mock_auth.assert_not_called()
+            self.assertEqual(tv.token, "fresh_token")
+            self.assertEqual(tv.token, "fresh_token")
+            mock_auth.assert_called_once()
+            mock_get.assert_called_once()
+
+        # Another client with the same credentials reuses the stored token
+        tv = TvDatafeed(username="lazy_user", password="pw", token_store=self.token_store)
+        self.assertEqual(tv.token, "fresh_token")
+
+    def test_import_is_lazy(self):
+        """Importing the package, indicators or live bars does not import pandas, requests or websocket-client."""
+        code = (
+            "import sys, src.stock_data_realtime as m; "
+            "assert 'pandas' not in sys.modules and 'requests' not in sys.modules; "
+            "m.TvDatafeed; assert 'pandas' not in sys.modules and 'websocket' not in sys.modules; "
+            "import src.stock_data_realtime.indicators, src.stock_data_realtime.live_bars; "
+            "assert 'pandas' not in sys.modules"
+        )
+        root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        subprocess.run([sys.executable, "-c", code], cwd=root, check=True)
 
     # Test session generation
     def test_generate_session(self):
@@ -106,31 +229,153 @@ class TestTvDatafeed(unittest.TestCase):
         self.assertEqual(result["Open"].iloc[0], 100.0)
 
     # Test get_hist (mocking WebSocket)
-    @patch('stock_data.create_connection')
+    @patch('src.stock_data_realtime.connection.create_connection')
     def test_get_hist(self, mock_create_conn):
         """Tests if historical data retriveval is working, this is mocked.
             1. Mocks websocket connection and response
-            2. Verifies the method returns a dataframe
+            2. Verifies the bars the socket sent are decoded into a dataframe
             3. Checks the websocket send is called
             
             Basically confirms data is retrieved without network calls."""
-        mock_ws = Mock()
+        mock_ws = FakeWebSocket(bars={"NASDAQ:AAPL": 150.0})
+        mock_create_conn.return_value = mock_ws
+        self.addCleanup(self.tv_datafeed.close)
+
+        df = self.tv_datafeed.get_hist(
+            symbol="AAPL",
+            exchange="NASDAQ",
+            interval=Interval.in_daily,
+            n_bars=10
+        )
+        self.assertIsInstance(df, pd.DataFrame)
+        self.assertEqual(list(df.columns), ["symbol", "Time", "Open", "High", "Low", "Close", "Volume"])
+        self.assertEqual(
+            df.iloc[0].tolist()[2:], [150.0, 151.0, 149.0, 150.0, 1000.0]
+        )
+        self.assertEqual(df["symbol"].iloc[0], "NASDAQ:AAPL")
+        self.assertEqual(df.index[0], pd.Timestamp("2021-07-01"))
+        self.assertIn("create_series", mock_ws.methods())
+
+    @patch('src.stock_data_realtime.connection.create_connection')
+    def test_get_hist_reuses_connection(self, mock_create_conn):
+        """Consecutive get_hist calls share one websocket and one auth."""
+        mock_ws = FakeWebSocket()
         mock_create_conn.return_value = mock_ws
-        mock_ws.recv.side_effect = [
-            'some_data',
-            '"series_completed"',
-        ]
-        
-        with patch.object(self.tv_datafeed, '_TvDatafeed__create_df', 
-                         return_value=pd.DataFrame()):
-            df = self.tv_datafeed.get_hist(
-                symbol="AAPL",
-                exchange="NASDAQ",
-                interval=Interval.in_daily,
-                n_bars=10
-            )
-            self.assertIsInstance(df, pd.DataFrame)
-            mock_ws.send.assert_called()
+        self.addCleanup(self.tv_datafeed.close)
+
+        for symbol in ["AAPL", "MSFT"]:
+            df = self.tv_datafeed.get_hist(symbol, "NASDAQ", n_bars=1)
+            self.assertEqual(df["symbol"].iloc[0], f"NASDAQ:{symbol}")
+        mock_create_conn.assert_called_once()
+        self.assertEqual(mock_ws.methods().count("set_auth_token"), 1)
+
+    # Test get_hist_many (mocking WebSocket)
+    @patch('src.stock_data_realtime.connection.create_connection')
+    def test_get_hist_many_isolates_errors(self, mock_create_conn):
+        """A bad ticker is reported in batch_stats without failing the batch."""
+        sockets = []
+
+        def new_socket(*args, **kwargs):
+            sockets.append(FakeWebSocket(errors={"NASDAQ:BAD"}))
+            return sockets[-1]
+
+        mock_create_conn.side_effect = new_socket
+        self.addCleanup(self.tv_datafeed.close)
+        specs = [(s, "NASDAQ", Interval.in_daily, 5) for s in ["AAPL", "BAD", "MSFT", "NVDA"]]
+
+        result = self.tv_datafeed.get_hist_many(
+            specs, n_connections=2, max_concurrent_series=1
+        )
+        self.assertEqual(len(sockets), 2)
+        self.assertEqual(set(result), {specs[0], specs[2], specs[3]})
+        stats = self.tv_datafeed.batch_stats.set_index("symbol")
+        self.assertIsNotNone(stats.loc["BAD", "error"])
+        self.assertTrue(pd.isna(stats.loc["AAPL", "error"]))
+        self.assertTrue((stats["latency"] >= 0).all())
+
+    @patch('src.stock_data_realtime.connection.create_connection')
+    def test_get_hist_many_concat(self, mock_create_conn):
+        """concat=True returns one long-format frame."""
+        mock_create_conn.return_value = FakeWebSocket()
+        self.addCleanup(self.tv_datafeed.close)
+        specs = [("AAPL", "NASDAQ", Interval.in_daily, 5),
+                 ("AAPL", "NASDAQ", Interval.in_1_hour, 5)]
+
+        df = self.tv_datafeed.get_hist_many(specs, concat=True)
+        self.assertEqual(len(df), 2)
+        self.assertEqual(sorted(df["interval"]), ["1D", "1H"])
+
+    @patch('src.stock_data_realtime.connection.create_connection')
+    def test_get_quotes(self, mock_create_conn):
+        """get_quotes returns one row per valid symbol from a single quote session."""
+        mock_ws = QuoteWebSocket(errors={"NASDAQ:BAD"})
+        mock_create_conn.return_value = mock_ws
+        self.addCleanup(self.tv_datafeed.close)
+        self.tv_datafeed.token = "test_token"
+
+        df = self.tv_datafeed.get_quotes(["AAPL", "NASDAQ:MSFT", "BAD", "AAPL"], "NASDAQ")
+        self.assertEqual(list(df.index), ["NASDAQ:AAPL", "NASDAQ:MSFT"])
+        self.assertEqual(df.index.name, "symbol")
+        self.assertEqual(list(df.columns), ["ch", "lp", "volume"])
+        self.assertEqual(mock_ws.methods().count("quote_add_symbols"), 1)
+        self.assertNotIn("create_series", mock_ws.methods())
+
+    @patch('src.stock_data_realtime.connection.create_connection')
+    def test_get_hist_bars_output(self, mock_create_conn):
+        """output="bars" returns the columnar container instead of a DataFrame."""
+        mock_create_conn.return_value = FakeWebSocket()
+        self.addCleanup(self.tv_datafeed.close)
+
+        bars = self.tv_datafeed.get_hist("AAPL", "NASDAQ", n_bars=1, output="bars")
+        self.assertIsInstance(bars, Bars)
+        self.assertEqual((bars.symbol, bars.interval, len(bars)), ("NASDAQ:AAPL", "1D", 1))
+        with self.assertRaises(ValueError):
+            self.tv_datafeed.get_hist("AAPL", "NASDAQ", output="polars")
+
+    @patch('src.stock_data_realtime.connection.create_connection')
+    def test_get_hist_tz_output(self, mock_create_conn):
+        """output="pandas_tz" indexes bars in the resolved exchange timezone."""
+        mock_create_conn.return_value = FakeWebSocket()
+        self.addCleanup(self.tv_datafeed.close)
+
+        df = self.tv_datafeed.get_hist("AAPL", "NASDAQ", n_bars=1, output="pandas_tz")
+        self.assertEqual(str(df.index.tz), "America/New_York")
+        self.assertEqual(df.index.dtype.unit, "s")
+        self.assertEqual(list(df.columns), ["symbol", "Open", "High", "Low", "Close", "Volume"])
+        self.assertEqual(df.attrs["symbol_info"]["timezone"], "America/New_York")
+
+        specs = [(s, "NASDAQ", Interval.in_daily, 1) for s in ["AAPL", "MSFT"]]
+        df = self.tv_datafeed.get_hist_many(specs, concat=True, output="pandas_tz")
+        self.assertEqual(str(df.index.tz), "America/New_York")
+        self.assertEqual(len(df), 2)
+        with self.assertRaises(ValueError):
+            self.tv_datafeed.get_hist_many(specs, concat=True, output="bars")
+
+    # Test iter_hist pagination (mocking WebSocket)
+    @patch('src.stock_data_realtime.connection.create_connection')
+    def test_iter_hist_pages_back_without_overlap(self, mock_create_conn):
+        """Pages run newest to oldest, skip overlapping bars and stop at the start."""
+        mock_ws = PagingWebSocket(available=25)
+        mock_create_conn.return_value = mock_ws
+        self.addCleanup(self.tv_datafeed.close)
+
+        pages = list(self.tv_datafeed.iter_hist("AAPL", "NASDAQ", n_bars=100, page_size=10))
+        self.assertEqual([len(p) for p in pages], [10, 10, 5])
+        df = pd.concat(reversed(pages))
+        self.assertTrue(df.index.is_monotonic_increasing)
+        self.assertFalse(df.index.duplicated().any())
+        self.assertEqual(mock_ws.methods().count("request_more_data"), 3)
+        self.assertIn("remove_series", mock_ws.methods())
+
+    @patch('src.stock_data_realtime.connection.create_connection')
+    def test_iter_hist_stops_at_n_bars(self, mock_create_conn):
+        mock_ws = PagingWebSocket(available=100)
+        mock_create_conn.return_value = mock_ws
+        self.addCleanup(self.tv_datafeed.close)
+
+        pages = list(self.tv_datafeed.iter_hist("AAPL", "NASDAQ", n_bars=25, page_size=10))
+        self.assertEqual([len(p) for p in pages], [10, 10, 5])
+        self.assertEqual(mock_ws.methods().count("request_more_data"), 2)
 
 if __name__ == '__main__':
     unittest.main(verbosity=9001)
\ No newline at end of file
@@ -0,0 +1,179 @@
+import time
+import unittest
+from unittest.mock import patch
+
+from src.stock_data_realtime.connection import TvConnection
+from src.stock_data_realtime.indicators import ATR, VWAP, IndicatorEngine
+from src.stock_data_realtime.panel import Panel
+from src.stock_data_realtime.stock_data import Interval
+from src.stock_data_realtime.streaming import Subscription
+from src.stock_data_realtime.test_connection import FakeWebSocket
+
+
+class QuoteWebSocket(FakeWebSocket):
+    """Answers quote_add_symbols with one qsd and quote_completed per symbol."""
+
+    def __init__(self, silent=(), **kwargs):
+        super().__init__(**kwargs)
+        self.silent = set(silent)
+
+    def on_message(self, method, params):
+        if method != "quote_add_symbols":
+            return super().on_message(method, params)
+        session, symbols = params[0], [p for p in params[1:] if isinstance(p, str)]
+        for i, symbol in enumerate(symbols):
+            if symbol in self.errors:
+                self.push("qsd", [session, {"n": symbol, "s": "error", "errmsg": "invalid symbol", "v": {}}])
+            elif symbol not in self.silent:
+                fields = {"lp": 100.0 + i, "ch": 1.5, "volume": 1000 + i}
+                self.push("qsd", [session, {"n": symbol, "s": "ok", "v": fields}])
+                self.push("quote_completed", [session, symbol])
+
+
+class TestSubscription(unittest.TestCase):
+    def setUp(self):
+        self.ws = FakeWebSocket()
+        patcher = patch(
+            "src.stock_data_realtime.connection.create_connection", return_value=self.ws
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.conn = TvConnection("token", "qs_test", "cs_test", timeout=1)
+        self.addCleanup(self.conn.close)
+        self.sub = Subscription(self.conn)
+        self.addCleanup(self.sub.close)
+
+    def quote(self, symbol, **fields):
+        self.ws.push("qsd", ["qs_test", {"n": symbol, "s": "ok", "v": fields}])
+
+    def test_quote_ticks_are_merged_and_yielded(self):
+        """qsd updates are merged per symbol and delivered in order."""
+        self.sub.add_quotes(["AAPL", "MSFT"], "NASDAQ")
+        self.assertIn("quote_add_symbols", self.ws.methods())
+        self.quote("NASDAQ:AAPL", lp=190.0, volume=100)
+        self.quote("NASDAQ:AAPL", lp=190.5)
+        self.quote("NASDAQ:TSLA", lp=250.0)
+
+        first, second = self.sub.get(timeout=1), self.sub.get(timeout=1)
+        self.assertEqual(first.kind, "quote")
+        self.assertEqual(first.symbol, "NASDAQ:AAPL")
+        self.assertEqual(second.data, {"lp": 190.5, "volume": 100})
+        self.assertIsNone(self.sub.get(timeout=0.1))
+
+    def test_bar_updates_continue_after_series_completed(self):
+        """A streaming series keeps delivering du updates after the history."""
+        received = []
+        self.sub.on_update(received.append)
+        self.sub.add_bars("AAPL", "NASDAQ", Interval.in_1_minute)
+        request = self.sub._bars[("NASDAQ:AAPL", "1")]
+        self.ws.push(
+            "du",
+            ["cs_test", {request.series_id: {"s": [{"i": 1, "v": [1625097660, 1, 2, 0.5, 1.5, 10]}]}}],
+        )
+        events = [self.sub.get(timeout=1), self.sub.get(timeout=1)]
+        self.assertEqual([e.kind for e in events], ["bar", "bar"])
+        self.assertEqual(events[1].data[0], 1625097660)
+        self.assertEqual(events[1].interval, "1")
+        self.assertEqual(len(received), 2)
+
+    def test_bars_without_volume_are_padded(self):
+        """5-value du bars (no volume) are emitted as 6 floats that panels and indicators accept."""
+        self.sub.add_bars("AAPL", "NASDAQ", Interval.in_1_minute)
+        self.sub.get(timeout=1)  # the history bar
+        request = self.sub._bars[("NASDAQ:AAPL", "1")]
+        self.ws.push(
+            "du",
+            ["cs_test", {request.series_id: {"s": [{"i": 1, "v": [1625097660, 1, 2, 0.5, 1.5]}]}}],
+        )
+        event = self.sub.get(timeout=1)
+        self.assertEqual(event.data, [1625097660.0, 1.0, 2.0, 0.5, 1.5, 0.0])
+
+        panel = Panel(["NASDAQ:AAPL"], "1")
+        panel.on_event(event)
+        self.assertEqual(panel.volume[:, 0].tolist(), [0.0])
+        engine = IndicatorEngine({"vwap": VWAP(), "atr": ATR(3)})
+        engine.on_event(event)
+        self.assertEqual(engine.keys, [("NASDAQ:AAPL", "1")])
+
+    def test_unsubscribe_on_live_session(self):
+        """Removing symbols and series tells the server without reconnecting."""
+        self.sub.add_quotes(["NASDAQ:AAPL"])
+        self.sub.add_bars("AAPL", "NASDAQ", Interval.in_1_minute)
+        self.sub.remove_quotes(["NASDAQ:AAPL"])
+        self.sub.remove_bars("AAPL", "NASDAQ", Interval.in_1_minute)
+        key = self.sub.add_bars("NQ", "CME_MINI", Interval.in_1_minute, fut_contract=1)
+        self.sub.remove_bars("NQ", "CME_MINI", Interval.in_1_minute, fut_contract=1)
+        self.assertNotIn(key, self.sub._bars)
+        self.sub.remove_bars(self.sub.add_bars("MSFT", "NASDAQ", Interval.in_daily))
+        self.assertEqual(self.sub._bars, {})
+        methods = self.ws.methods()
+        self.assertIn("quote_remove_symbols", methods)
+        self.assertIn("remove_series", methods)
+        self.assertEqual(self.sub.symbols, [])
+        self.quote("NASDAQ:AAPL", lp=1.0)
+        self.assertIsNone(self.sub.get(timeout=0.1))
+
+    def test_full_queue_drops_oldest(self):
+        """A slow consumer loses the oldest updates, not the newest."""
+        sub = Subscription(self.conn, maxsize=2)
+        self.addCleanup(sub.close)
+        sub.add_quotes(["NASDAQ:AAPL"])
+        for price in (1.0, 2.0, 3.0):
+            self.quote("NASDAQ:AAPL", lp=price)
+        # frames are dispatched in order, so once this arrives the others have too
+        self.sub.add_quotes(["NASDAQ:MSFT"])
+        self.quote("NASDAQ:MSFT", lp=1.0)
+        self.sub.get(timeout=1)
+        self.assertEqual(sub.dropped, 1)
+        self.assertEqual(sub.get(timeout=1).data["lp"], 2.0)
+
+
+class TestQuoteSnapshot(unittest.TestCase):
+    def connect(self, ws):
+        patcher = patch("src.stock_data_realtime.connection.create_connection", return_value=ws)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        conn = TvConnection("token", "qs_test", "cs_test", timeout=1)
+        self.addCleanup(conn.close)
+        return conn
+
+    def test_snapshot_batches_symbols_and_cleans_up(self):
+        ws = QuoteWebSocket(errors={"NASDAQ:BAD"})
+        conn = self.connect(ws)
+        symbols = [f"NASDAQ:S{i}" for i in range(4)] + ["NASDAQ:BAD"]
+
+        snapshot = conn.snapshot_quotes(symbols, batch_size=2)
+        self.assertEqual(snapshot.pending, set())
+        self.assertEqual(snapshot.errors, {"NASDAQ:BAD": "invalid symbol"})
+        self.assertEqual(snapshot.quotes["NASDAQ:S3"]["lp"], 101.0)  # second of its batch
+        adds = [m["p"] for m in ws.sent if m["m"] == "quote_add_symbols"]
+        self.assertEqual([len(p) - 2 for p in adds], [2, 2, 1])
+        self.assertNotIn("quote_fast_symbols", ws.methods())
+        removed = [s for m in ws.sent if m["m"] == "quote_remove_symbols" for s in m["p"][1:]]
+        self.assertEqual(sorted(removed), sorted(symbols))
+
+    def test_snapshot_times_out_with_pending_symbols(self):
+        conn = self.connect(QuoteWebSocket(silent={"NASDAQ:SLOW"}))
+        started = time.monotonic()
+        snapshot = conn.snapshot_quotes(["NASDAQ:AAPL", "NASDAQ:SLOW"], timeout=0.2)
+        self.assertLess(time.monotonic() - started, 1)
+        self.assertEqual(snapshot.pending, {"NASDAQ:SLOW"})
+        self.assertIn("NASDAQ:AAPL", snapshot.quotes)
+
+    def test_streaming_symbols_are_answered_from_the_session(self):
+        ws = QuoteWebSocket()
+        conn = self.connect(ws)
+        sub = Subscription(conn)
+        self.addCleanup(sub.close)
+        sub.add_quotes(["NASDAQ:AAPL"])
+        sub.get(timeout=1)
+        sent = len(ws.sent)
+
+        snapshot = conn.snapshot_quotes(["NASDAQ:AAPL"])
+        self.assertEqual(snapshot.quotes["NASDAQ:AAPL"]["lp"], 100.0)
+        self.assertEqual(len(ws.sent), sent)  # no add or remove for a live symbol
+        self.assertEqual(sub.symbols, ["NASDAQ:AAPL"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,120 @@
+import base64
+import json
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+from src.stock_data_realtime.token_store import TokenStore, token_expiry, token_key
+
+
+def jwt(exp):
+    payload = base64.urlsafe_b64encode(json.dumps({"exp": exp}).encode()).rstrip(b"=")
+    return f"header.{payload.decode()}.signature"
+
+
+def refresh_in_process(path, counter_path):
+    """Worker for the multi-process test: sign in is slow and counted in a file."""
+    def fetch():
+        with open(counter_path, "a") as f:
+            f.write("x")
+        time.sleep(0.2)
+        return "shared_token"
+
+    return TokenStore(path).refresh("key", fetch)
+
+
+class TestTokenStore(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = tmp.name
+        self.path = os.path.join(tmp.name, "tokens", "tv_token.json")
+        self.store = TokenStore(self.path)
+
+    def test_put_is_visible_to_other_stores(self):
+        self.assertIsNone(self.store.get("key"))
+        self.store.put("key", "token")
+        self.assertEqual(TokenStore(self.path).get("key"), "token")
+        self.assertIsNone(TokenStore(self.path).get("other"))
+        self.assertEqual(os.stat(self.path).st_mode & 0o777, 0o600)
+
+    def test_expiry_comes_from_the_token(self):
+        self.store.put("key", jwt(time.time() + 30))  # inside min_ttl
+        self.assertIsNone(self.store.get("key"))
+        token = jwt(1900000000)
+        self.store.put("key", token)
+        self.assertEqual(TokenStore(self.path).get("key"), token)
+        self.assertEqual(token_expiry(token), 1900000000)
+        self.assertIsNone(token_expiry("opaque"))
+
+    def test_tokens_without_claim_expire_after_max_age(self):
+        store = TokenStore(self.path, max_age=120)
+        store.put("key", "opaque")
+        self.assertEqual(store.get("key"), "opaque")
+        with patch("time.time", return_value=time.time() + 120):
+            self.assertIsNone(store.get("key"))
+
+    def test_unreadable_file_is_ignored(self):
+        os.makedirs(os.path.dirname(self.path))
+        with open(self.path, "w") as f:
+            f.write('{"key": {"token": "t", "expi')
+        self.assertIsNone(self.store.get("key"))
+        self.store.put("key", "token")
+        self.assertEqual(TokenStore(self.path).get("key"), "token")
+
+    def test_invalidate_only_matching_token(self):
+        self.store.put("key", "token")
+        self.store.invalidate("key", "older_token")
+        self.assertEqual(TokenStore(self.path).get("key"), "token")
+        self.store.invalidate("key", "token")
+        self.assertIsNone(self.store.get("key"))
+
+    def test_refresh_signs_in_once_across_threads(self):
+        calls = []
+
+        def fetch():
+            calls.append(1)
+            time.sleep(0.05)
+            return "new_token"
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(TokenStore(self.path).refresh("key", fetch)))
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, ["new_token"] * 8)
+        self.assertEqual(len(calls), 1)
+
+    def test_refresh_replaces_stale_token(self):
+        self.store.put("key", "rejected")
+        self.assertEqual(self.store.refresh("key", lambda: "new", stale="rejected"), "new")
+        self.assertEqual(TokenStore(self.path).get("key"), "new")
+        # a failed sign in stores nothing
+        self.assertIsNone(self.store.refresh("other", lambda: None))
+        self.assertIsNone(TokenStore(self.path).get("other"))
+
+    def test_refresh_signs_in_once_across_processes(self):
+        counter = os.path.join(self.dir, "sign_ins")
+        context = multiprocessing.get_context("spawn")
+        with context.Pool(4) as pool:
+            results = pool.starmap(refresh_in_process, [(self.path, counter)] * 4)
+        self.assertEqual(results, ["shared_token"] * 4)
+        with open(counter) as f:
+            self.assertEqual(f.read(), "x")
+
+    def test_token_key_hides_credentials(self):
+        key = token_key("user", "secret_session")
+        self.assertNotIn("secret", key)
+        self.assertNotEqual(key, token_key("user", None))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,113 @@
+import os
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+
+from websocket import WebSocketTimeoutException
+
+from src.stock_data_realtime.cache import SymbolCache
+from src.stock_data_realtime.protocol import create_message
+from src.stock_data_realtime.stock_data import TvDatafeed
+from src.stock_data_realtime.test_connection import FakeWebSocket
+from src.stock_data_realtime.wire_log import (
+    RECEIVED,
+    SENT,
+    ReplayTransport,
+    ReplayWebSocket,
+    WireLog,
+    WireRecorder,
+)
+
+
+class TestWireLog(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = tmp.name
+        self.path = os.path.join(tmp.name, "wire.log")
+
+    def client(self, **kwargs):
+        tv = TvDatafeed(
+            symbol_cache=SymbolCache(os.path.join(self.dir, "symbols.json")), **kwargs
+        )
+        self.addCleanup(tv.close)
+        return tv
+
+    def test_records_round_trip(self):
+        with WireRecorder(self.path) as recorder:
+            first, second = recorder.open(), recorder.open()
+            recorder.record("~m~5~m~hello", first, SENT)
+            recorder.record("~m~4~m~süß", second)
+            recorder.record(create_message("du", ["cs", {}]) * 2, first)
+        with WireLog(self.path) as log:
+            self.assertEqual(len(log), 3)
+            self.assertEqual(log.n_connections, 2)
+            self.assertEqual(log[1][1:], (1, RECEIVED, "~m~4~m~süß"))
+            self.assertEqual(bytes(log.raw(0)), b"~m~5~m~hello")
+            self.assertTrue((log.times[1:] >= log.times[:-1]).all())
+            self.assertEqual(log.received().tolist(), [1, 2])
+            self.assertEqual(len(list(log.frames(first))), 2)
+
+    def test_truncated_tail_is_ignored(self):
+        with WireRecorder(self.path) as recorder:
+            recorder.record("complete")
+            recorder.record("cut off")
+        with open(self.path, "r+b") as f:
+            f.truncate(os.path.getsize(self.path) - 3)
+        with WireLog(self.path) as log:
+            self.assertEqual([text for _, _, _, text in log], ["complete"])
+        with open(self.path, "wb") as f:
+            f.write(b"not a log")
+        with self.assertRaises(ValueError):
+            WireLog(self.path)
+
+    @patch('src.stock_data_realtime.connection.create_connection')
+    def test_replayed_session_decodes_the_same(self, mock_create_conn):
+        mock_create_conn.side_effect = lambda *args, **kwargs: FakeWebSocket()
+        with WireRecorder(self.path) as recorder:
+            tv = self.client(recorder=recorder)
+            recorded = [tv.get_hist(s, "NASDAQ", n_bars=1) for s in ("AAPL", "MSFT")]
+            tv.close()
+
+        replay = ReplayTransport(self.path)
+        self.addCleanup(replay.close)
+        mock_create_conn.reset_mock()
+        tv = self.client(transport=replay)
+        for symbol, expected in zip(("AAPL", "MSFT"), recorded):
+            df = tv.get_hist(symbol, "NASDAQ", n_bars=1)
+            self.assertTrue(df.equals(expected))
+            self.assertEqual(df.attrs, expected.attrs)
+        mock_create_conn.assert_not_called()
+        self.assertEqual(len(replay.sockets), 1)
+
+    def test_replay_speed(self):
+        with WireRecorder(self.path) as recorder:
+            recorder.record("first")
+            time.sleep(0.2)
+            recorder.record("second")
+        with WireLog(self.path) as log:
+            for speed, slowest in ((None, 0.1), (4.0, 0.2)):
+                ws = ReplayWebSocket(log, speed=speed)
+                started = time.monotonic()
+                self.assertEqual([ws.recv(), ws.recv()], ["first", "second"])
+                self.assertLess(time.monotonic() - started, slowest)
+                if speed:
+                    self.assertGreaterEqual(time.monotonic() - started, 0.2 / speed - 0.01)
+                ws.close()
+
+    def test_replay_waits_for_the_client(self):
+        with WireRecorder(self.path) as recorder:
+            recorder.record("request", direction=SENT)
+            recorder.record("response")
+        with WireLog(self.path) as log:
+            ws = ReplayWebSocket(log, timeout=0.05)
+            with self.assertRaises(WebSocketTimeoutException):
+                ws.recv()
+            ws.send("request")
+            self.assertEqual(ws.recv(), "response")
+            ws.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,233 @@
+import base64
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+logger = logging.getLogger(__name__)
+
+
+def user_cache_dir() -> str:
+    """``stock_data_realtime`` in ``$XDG_CACHE_HOME``, else in ``~/.cache``."""
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "stock_data_realtime")
+
+
+def default_token_path() -> str:
+    """``$TV_TOKEN_FILE``, else ``tv_token.json`` in the user cache directory."""
+    return os.environ.get("TV_TOKEN_FILE") or os.path.join(user_cache_dir(), "tv_token.json")
+
+
+def token_key(username=None, sessionid=None) -> str:
+    """Store key for a set of credentials; a hash, so the file holds no session ids."""
+    return hashlib.sha256(f"{username or ''}\0{sessionid or ''}".encode()).hexdigest()[:32]
+
+
+def token_expiry(token: str):
+    """Expiry (epoch seconds) from the ``exp`` claim of a JWT token, None if there is none."""
+    parts = token.split(".")
+    if len(parts) != 3:
+        return None
+    try:
+        payload = base64.urlsafe_b64decode(parts[1] + "=" * (-len(parts[1]) % 4))
+        exp = json.loads(payload)["exp"]
+    except (ValueError, KeyError, TypeError):
+        return None
+    return float(exp) if isinstance(exp, (int, float)) else None
+
+
+class FileLock:
+    """
+    Exclusive lock on a file, held across processes (``flock``/``msvcrt``)
+    and across threads of this process.
+
+    It may be released from a different thread than the one that acquired it.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.__fd = None
+        self.__thread_lock = threading.Lock()
+
+    def acquire(self):
+        self.__thread_lock.acquire()
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+            try:
+                if fcntl is not None:
+                    fcntl.flock(fd, fcntl.LOCK_EX)
+                else:
+                    while True:
+                        try:
+                            msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+                            break
+                        except OSError:  # LK_LOCK gives up after ~10s
+                            continue
+            except BaseException:
+                os.close(fd)
+                raise
+            self.__fd = fd
+        except BaseException:
+            self.__thread_lock.release()
+            raise
+
+    def release(self):
+        fd, self.__fd = self.__fd, None
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            else:
+                os.lseek(fd, 0, os.SEEK_SET)
+                msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+        finally:
+            os.close(fd)
+            self.__thread_lock.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+
+
+class TokenStore:
+    """
+    Auth tokens shared by every client and process on the machine.
+
+    Tokens are kept in one JSON file keyed by a hash of the credentials,
+    together with their expiry: the token's own ``exp`` claim when it has
+    one, else ``max_age`` seconds after it was stored. Writes take a file
+    lock and replace the file atomically, so readers never see partial
+    JSON and need no lock. Valid tokens are also cached in memory.
+
+    ``refresh`` serializes sign-ins: while one worker fetches a new token
+    the others wait on the lock, then reuse the token it stored.
+
+    Args:
+        path (str, optional): Token file, defaults to ``default_token_path()``
+        max_age (float): Lifetime in seconds of tokens without an expiry claim
+        min_ttl (float): Tokens expiring within this many seconds count as expired
+    """
+
+    def __init__(self, path: str = None, max_age: float = 3600, min_ttl: float = 60):
+        self.path = path or default_token_path()
+        self.max_age = max_age
+        self.min_ttl = min_ttl
+        self.lock = FileLock(self.path + ".lock")
+        self.__tokens = {}
+
+    def get(self, key: str):
+        """Return a valid token for ``key`` from memory or the file, None if there is none."""
+        entry = self.__tokens.get(key)
+        if entry is None or not self.__valid(entry):
+            entry = self.__read().get(key)
+            if entry is None or not self.__valid(entry):
+                self.__tokens.pop(key, None)
+                return None
+            self.__tokens[key] = entry
+        return entry["token"]
+
+    def put(self, key: str, token: str):
+        with self.lock:
+            self.__write(key, token)
+
+    def invalidate(self, key: str, token: str = None):
+        """Forget the token of ``key``, only if it is still ``token`` when given."""
+        with self.lock:
+            entries = self.__read()
+            entry = entries.get(key)
+            if entry is not None and (token is None or entry["token"] == token):
+                del entries[key]
+                self.__dump(entries)
+            self.__tokens.pop(key, None)
+
+    def refresh(self, key: str, fetch, stale: str = None):
+        """
+        Get a token for ``key``, calling ``fetch`` at most once across processes.
+
+        Args:
+            key (str): Store key, see ``token_key``
+            fetch (callable): Signs in and returns a new token, or None on failure
+            stale (str, optional): Token known to be rejected; it is not reused
+
+        Returns:
+            str: A token stored by another worker while waiting, or the
+            result of ``fetch``. None if signing in failed.
+        """
+        with self.lock:
+            entry = self.__read().get(key)
+            if entry is not None and self.__valid(entry) and entry["token"] != stale:
+                self.__tokens[key] = entry
+                logger.debug("Reusing token refreshed by another worker.")
+                return entry["token"]
+            token = fetch()
+            if token:
+                self.__write(key, token)
+            return token
+
+    def clear(self):
+        with self.lock:
+            self.__dump({})
+            self.__tokens.clear()
+
+    def __valid(self, entry):
+        return entry["expires_at"] - self.min_ttl > time.time()
+
+    def __read(self):
+        try:
+            with open(self.path, "r") as f:
+                entries = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable token file {self.path}: {e}")
+            return {}
+        if not isinstance(entries, dict):
+            return {}
+        return {
+            key: entry
+            for key, entry in entries.items()
+            if isinstance(entry, dict) and {"token", "expires_at"} <= entry.keys()
+        }
+
+    def __write(self, key, token):
+        expires_at = token_expiry(token) or time.time() + self.max_age
+        entry = {"token": token, "expires_at": expires_at}
+        entries = self.__read()
+        entries[key] = entry
+        # drop tokens that can no longer be used
+        self.__dump({k: e for k, e in entries.items() if self.__valid(e) or k == key})
+        self.__tokens[key] = entry
+        logger.info("Token saved successfully.")
+
+    def __dump(self, entries):
+        directory = os.path.dirname(self.path) or "."
+        os.makedirs(directory, exist_ok=True)
+        tmp = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w") as f:
+            json.dump(entries, f)
+        os.replace(tmp, self.path)
+
+
+_default_store = None
+_default_lock = threading.Lock()
+
+
+def default_token_store() -> TokenStore:
+    """The process-wide store used by clients created without ``token_store``."""
+    global _default_store
+    with _default_lock:
+        if _default_store is None:
+            _default_store = TokenStore()
+        return _default_store
@@ -0,0 +1,76 @@
+import json
+import re
+
+
+CHART_URL = "https://www.tradingview.com/chart/"
+SIGN_IN_URL = "https://www.tradingview.com/accounts/signin/"
+SEARCH_URL = "https://symbol-search.tradingview.com/symbol_search"
+WS_URL = "wss://data.tradingview.com/socket.io/websocket"
+WS_ORIGIN = "https://data.tradingview.com"
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+SIGNIN_HEADERS = {"Referer": "https://www.tradingview.com"}
+UNAUTHORIZED_TOKEN = "unauthorized_user_token"
+
+_auth_token = re.compile(r'"auth_token":"([^"]+)"')
+
+
+def http_session(pool_size=10):
+    """Keep-alive session shared by authentication and symbol search."""
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.headers["User-Agent"] = USER_AGENT
+    return session
+
+
+def session_headers(sessionid, sessionid_sign):
+    return {
+        "Referer": "https://www.tradingview.com",
+        "User-Agent": USER_AGENT,
+        "Cookie": f"sessionid={sessionid}; sessionid_sign={sessionid_sign}",
+    }
+
+
+def parse_session_token(text):
+    match = _auth_token.search(text)
+    return match.group(1) if match else None
+
+
+def parse_credentials_token(json_response):
+    if "user" in json_response and "auth_token" in json_response["user"]:
+        return json_response["user"]["auth_token"]
+    return None
+
+
+def search_params(text, exchange="", type=None):
+    params = {"text": text}
+    if exchange:
+        params["exchange"] = exchange
+    if type:
+        params["type"] = type
+    return params
+
+
+def search_headers(token):
+    headers = {
+        "User-Agent": USER_AGENT,
+        "Referer": "https://www.tradingview.com",
+        "Origin": "https://www.tradingview.com",
+        "Accept": "application/json",
+    }
+    if token:
+        headers["Authorization"] = f"Bearer {token}"
+    return headers
+
+
+def search_cookies(sessionid, sessionid_sign):
+    if sessionid and sessionid_sign:
+        return {"sessionid": sessionid, "sessionid_sign": sessionid_sign}
+    return {}
+
+
+def parse_search_results(text):
+    return json.loads(text.replace("</em>", "").replace("<em>", ""))
@@ -0,0 +1,312 @@
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+
+import numpy as np
+
+from .protocol import FrameDecoder
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"TVWIRE1\n"
+RECEIVED = 0
+SENT = 1
+
+# seconds since the recorder started (monotonic clock), connection number,
+# direction and payload length, followed by the UTF-8 payload
+_record = struct.Struct("<dHBI")
+
+
+class WireRecorder:
+    """
+    Appends raw websocket messages to a compact binary log.
+
+    Every message received (and, with ``record_sent``, sent) on a wrapped
+    socket becomes one record: a 15-byte header with a monotonic timestamp,
+    the connection number and the direction, then the message text exactly
+    as it went over the wire. Records are appended through a buffered file,
+    so recording costs one memory copy per message. One recorder can be
+    shared by every connection of a client; each wrapped socket gets its
+    own connection number.
+
+    Args:
+        path (str): Log file, created or truncated
+        record_sent (bool): Also log outgoing messages, needed to replay in lockstep
+    """
+
+    def __init__(self, path: str, record_sent: bool = True):
+        self.path = path
+        self.record_sent = record_sent
+        self.records = 0
+        self.__file = open(path, "wb")
+        self.__file.write(MAGIC)
+        self.__started = time.monotonic()
+        self.__connections = 0
+        self.__lock = threading.Lock()
+
+    def open(self) -> int:
+        """Allocate the connection number for a new socket."""
+        with self.__lock:
+            self.__connections += 1
+            return self.__connections - 1
+
+    def record(self, text: str, connection: int = 0, direction: int = RECEIVED):
+        if direction == SENT and not self.record_sent:
+            return
+        payload = text.encode("utf-8")
+        header = _record.pack(time.monotonic() - self.__started, connection, direction, len(payload))
+        with self.__lock:
+            if self.__file.closed:
+                return
+            self.__file.write(header)
+            self.__file.write(payload)
+            self.records += 1
+
+    def wrap(self, ws):
+        """Return ``ws`` with every ``recv``/``send`` recorded."""
+        return RecordingWebSocket(ws, self, self.open())
+
+    def flush(self):
+        with self.__lock:
+            self.__file.flush()
+
+    def close(self):
+        with self.__lock:
+            self.__file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class RecordingWebSocket:
+    """websocket-client socket proxy that copies its traffic to a WireRecorder."""
+
+    def __init__(self, ws, recorder: WireRecorder, connection: int):
+        self.ws = ws
+        self.recorder = recorder
+        self.connection = connection
+
+    def recv(self):
+        message = self.ws.recv()
+        self.recorder.record(message, self.connection, RECEIVED)
+        return message
+
+    def send(self, message):
+        self.ws.send(message)
+        self.recorder.record(message, self.connection, SENT)
+
+    def close(self):
+        self.ws.close()
+
+    def __getattr__(self, name):
+        return getattr(self.ws, name)
+
+
+class WireLog:
+    """
+    Read-only, memory-mapped view of a WireRecorder log.
+
+    The file is indexed once; ``raw`` returns payloads as memoryviews into
+    the map without copying. Records are available as ``(time, connection,
+    direction, text)`` tuples by index or iteration.
+
+    Args:
+        path (str): Log written by ``WireRecorder``
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size < len(MAGIC):
+                raise ValueError(f"{path} is not a wire log")
+            self.__map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.__map[:len(MAGIC)] != MAGIC:
+            self.__map.close()
+            raise ValueError(f"{path} is not a wire log")
+        self.__index()
+
+    def __index(self):
+        times, connections, directions, starts, lengths = [], [], [], [], []
+        data = self.__map
+        pos = len(MAGIC)
+        end = len(data)
+        while pos + _record.size <= end:
+            t, connection, direction, length = _record.unpack_from(data, pos)
+            pos += _record.size
+            if pos + length > end:
+                logger.warning(f"Ignoring truncated record at the end of {self.path}")
+                break
+            times.append(t)
+            connections.append(connection)
+            directions.append(direction)
+            starts.append(pos)
+            lengths.append(length)
+            pos += length
+        self.times = np.array(times, dtype=np.float64)
+        self.connections = np.array(connections, dtype=np.uint16)
+        self.directions = np.array(directions, dtype=np.uint8)
+        self.starts = np.array(starts, dtype=np.int64)
+        self.lengths = np.array(lengths, dtype=np.int64)
+
+    def __len__(self):
+        return len(self.times)
+
+    def raw(self, i: int) -> memoryview:
+        start = int(self.starts[i])
+        return memoryview(self.__map)[start:start + int(self.lengths[i])]
+
+    def text(self, i: int) -> str:
+        return str(self.raw(i), "utf-8")
+
+    def __getitem__(self, i):
+        return (
+            float(self.times[i]),
+            int(self.connections[i]),
+            int(self.directions[i]),
+            self.text(i),
+        )
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    @property
+    def n_connections(self) -> int:
+        return int(self.connections.max()) + 1 if len(self) else 0
+
+    def received(self, connection: int = None):
+        """Indices of received messages, of one connection or all of them."""
+        mask = self.directions == RECEIVED
+        if connection is not None:
+            mask &= self.connections == connection
+        return np.flatnonzero(mask)
+
+    def frames(self, connection: int = None):
+        """
+        Yield the frame payloads of the received messages, split by the
+        same ``FrameDecoder`` the connections use.
+        """
+        decoder = FrameDecoder()
+        for i in self.received(connection):
+            yield from decoder.feed(self.text(i))
+
+    def close(self):
+        self.__map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class ReplayWebSocket:
+    """
+    websocket-client compatible socket that plays back one connection of a log.
+
+    A received message is only returned once the client has sent as many
+    messages as it had when the message was recorded, so the client's
+    requests are registered before their responses arrive and the replay
+    is deterministic at any speed. ``speed`` scales the recorded gaps
+    (1.0 is the original pace); None replays as fast as the client reads.
+    After the last message ``recv`` keeps timing out like an idle server.
+    """
+
+    def __init__(self, log: WireLog, connection: int = 0, speed: float = None, timeout: float = None):
+        self.log = log
+        self.connection = connection
+        self.speed = speed
+        self.timeout = 1.0 if timeout is None else timeout
+        self.sent = []
+        self.connected = True
+        indices = np.flatnonzero(log.connections == connection)
+        sent = np.cumsum(log.directions[indices] == SENT)
+        received = log.directions[indices] == RECEIVED
+        self.__indices = indices[received]
+        # messages the client had sent before each received message
+        self.__required = sent[received]
+        self.__t0 = log.times[indices[0]] if len(indices) else 0.0
+        self.__started = time.monotonic()
+        self.__next = 0
+        self.__condition = threading.Condition()
+
+    def send(self, message):
+        from websocket import WebSocketConnectionClosedException
+
+        if not self.connected:
+            raise WebSocketConnectionClosedException("Replay socket is closed")
+        with self.__condition:
+            self.sent.append(message)
+            self.__condition.notify_all()
+
+    def recv(self):
+        from websocket import WebSocketConnectionClosedException, WebSocketTimeoutException
+
+        if self.__next >= len(self.__indices):
+            with self.__condition:
+                self.__condition.wait_for(lambda: not self.connected, self.timeout)
+            if not self.connected:
+                raise WebSocketConnectionClosedException("Replay socket is closed")
+            raise WebSocketTimeoutException("End of wire log")
+        required = self.__required[self.__next]
+        with self.__condition:
+            if not self.__condition.wait_for(
+                lambda: len(self.sent) >= required or not self.connected, self.timeout
+            ):
+                raise WebSocketTimeoutException("Waiting for the client")
+        if not self.connected:
+            raise WebSocketConnectionClosedException("Replay socket is closed")
+        i = self.__indices[self.__next]
+        if self.speed:
+            delay = self.__started + (self.log.times[i] - self.__t0) / self.speed - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+        self.__next += 1
+        return self.log.text(i)
+
+    def close(self):
+        with self.__condition:
+            self.connected = False
+            self.__condition.notify_all()
+
+
+class ReplayTransport:
+    """
+    Connection factory replaying a wire log instead of dialing TradingView.
+
+    Pass it as ``TvDatafeed(transport=...)``: the n-th websocket the client
+    opens replays the n-th connection of the log, so the client has to
+    repeat the recorded calls in the same order. Frames go through the
+    usual reader, router and decoders.
+
+    Args:
+        path (str): Log written by ``WireRecorder``
+        speed (float, optional): 1.0 for the recorded pace, None for as fast as possible
+    """
+
+    def __init__(self, path: str, speed: float = None):
+        self.log = WireLog(path)
+        self.speed = speed
+        self.sockets = []
+        self.__lock = threading.Lock()
+
+    def __call__(self, url=None, timeout=None, **kwargs) -> ReplayWebSocket:
+        with self.__lock:
+            connection = len(self.sockets)
+            if connection >= max(self.log.n_connections, 1):
+                raise ConnectionError("No more connections in the wire log")
+            ws = ReplayWebSocket(self.log, connection, self.speed, timeout)
+            self.sockets.append(ws)
+            return ws
+
+    def close(self):
+        for ws in self.sockets:
+            ws.close()
+        self.log.close()